@@ -195,7 +195,7 @@ pub async fn proxy_wandb(
     Ok(Json(resp_json))
 }
 
-/// Proxy handler for S3 sample data
+/// Proxy handler for S3 sample data (the latest week, refreshed by every data update)
 #[utoipa::path(
     get,
     path = "/s3-data",
@@ -206,7 +206,7 @@ pub async fn proxy_wandb(
     )
 )]
 pub async fn proxy_s3() -> Result<axum::response::Response, (StatusCode, String)> {
-    let s3_url = "https://metrocast-ai-storage.s3.eu-central-1.amazonaws.com/istanbul_weather.csv";
+    let s3_url = "https://metrocast-ai-storage.s3.eu-central-1.amazonaws.com/istanbul_weather_latest.csv";
     
     let resp = reqwest::get(s3_url)
         .await
@@ -0,0 +1,95 @@
+"""
+torch.compile benchmark for the training step and evaluation forward pass.
+
+For eager and each requested compile backend, reports the first step (which
+includes compilation) and the median steady-state step time on synthetic
+batches shaped like the training data.
+
+Usage:
+    python benchmarks/bench_compile.py [--backends inductor aot_eager] [--mode default] [--batch-size 64]
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import time
+
+import numpy as np
+import torch
+import yaml
+
+root_dir = pathlib.Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+sys.path.append(str(root_dir / 'src' / 'training'))
+
+from model import build_model_from_config
+from src.app.services import NUM_FEATURES, SEQ_LEN
+
+CONFIG_PATH = os.path.join(root_dir, 'config.yaml')
+
+
+def make_batch(batch_size, pred_len):
+    torch.manual_seed(0)
+    x = torch.randn(batch_size, SEQ_LEN, NUM_FEATURES)
+    x[..., -1] = torch.randint(0, 4, (batch_size, SEQ_LEN)).float()
+    return x, torch.randn(batch_size, pred_len)
+
+
+def time_steps(step, steps):
+    """Returns (first step seconds, median of the remaining steps in seconds)."""
+    timings = []
+    for _ in range(steps + 1):
+        start = time.perf_counter()
+        step()
+        timings.append(time.perf_counter() - start)
+    return timings[0], float(np.median(timings[1:]))
+
+
+def bench(config, backend, mode, x, y, steps):
+    torch.manual_seed(0)
+    model = build_model_from_config(config)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-4)
+    if backend != 'eager':
+        torch._dynamo.reset()
+        model = torch.compile(model, backend=backend, mode=None if mode == 'default' else mode)
+
+    def train_step():
+        model.train()
+        optimizer.zero_grad()
+        loss = torch.nn.functional.mse_loss(model(x).squeeze(-1), y)
+        loss.backward()
+        optimizer.step()
+
+    def eval_step():
+        model.eval()
+        with torch.no_grad():
+            model(x)
+
+    return time_steps(train_step, steps), time_steps(eval_step, steps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=['inductor'], help="Compile backends ('eager' is always run)")
+    parser.add_argument('--mode', default='default', help='Compile mode (inductor only)')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--steps', type=int, default=10, help='Steady-state steps after the first one')
+    args = parser.parse_args()
+
+    with open(CONFIG_PATH, 'r') as f:
+        config = yaml.safe_load(f)
+    x, y = make_batch(args.batch_size, config['training']['pred_len'])
+
+    print(f"\nbatch_size={args.batch_size}, {torch.get_num_threads()} threads, mode={args.mode}")
+    print(f"{'backend':<12}{'path':<7}{'first (s)':>11}{'step (ms)':>11}{'speedup':>9}")
+    eager = None
+    for backend in ['eager'] + [b for b in args.backends if b != 'eager']:
+        results = bench(config, backend, args.mode, x, y, args.steps)
+        eager = eager or results
+        for path, (first, step), (_, eager_step) in zip(('train', 'eval'), results, eager):
+            print(f"{backend:<12}{path:<7}{first:>11.2f}{step * 1000:>11.1f}{eager_step / step:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
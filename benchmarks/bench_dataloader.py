@@ -0,0 +1,132 @@
+"""
+DataLoader benchmark for WeatherDataset.
+
+Compares per-epoch data time of the default per-index fetch + default_collate
+path against the batched get_batch path (create_batch_loader) used by
+create_dataloaders.
+
+Usage:
+    python benchmarks/bench_dataloader.py [--rows 175000] [--batch-size 128]
+
+Uses the configured raw data file when present, otherwise a synthetic series.
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import yaml
+from torch.utils.data import DataLoader, Dataset
+
+root_dir = pathlib.Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from src.training.dataset import WeatherDataset, create_batch_loader
+from src.utils.locations import location_paths
+
+CONFIG_PATH = os.path.join(root_dir, 'config.yaml')
+
+
+class PerItemDataset(Dataset):
+    """Per-index fetch with per-sample copies, like the pre-window implementation."""
+
+    def __init__(self, dataset: WeatherDataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, idx):
+        x, y = self.dataset[idx]
+        # The pre-window implementation sliced copies per sample
+        return x.clone(), y.clone()
+
+
+def write_synthetic_data(tmp_dir: str, num_rows: int, input_cols: list) -> tuple:
+    """Write a synthetic raw CSV and statistics file and return their paths."""
+    rng = np.random.default_rng(0)
+    weather_cols = [c for c in input_cols if c != 'weather_code']
+    df = pd.DataFrame({'time': pd.date_range('2006-01-01', periods=num_rows, freq='h')})
+    for col in weather_cols:
+        df[col] = rng.normal(size=num_rows)
+    df['weather_code'] = rng.integers(0, 4, num_rows)
+
+    csv_path = os.path.join(tmp_dir, 'weather.csv')
+    df.to_csv(csv_path, index=False)
+
+    time_cols = ['hour_sin', 'hour_cos', 'day_sin', 'day_cos', 'month_sin', 'month_cos']
+    stats = {
+        'mean': np.zeros(len(weather_cols) + len(time_cols)),
+        'std': np.ones(len(weather_cols) + len(time_cols)),
+        'input_cols': weather_cols + time_cols,
+    }
+    stats_path = os.path.join(tmp_dir, 'statistics.npy')
+    np.save(stats_path, stats)
+    return csv_path, stats_path
+
+
+def time_epoch(loader: DataLoader) -> tuple:
+    """Iterate one full epoch and return (seconds, samples)."""
+    samples = 0
+    start = time.perf_counter()
+    for x, y in loader:
+        samples += x.shape[0]
+    return time.perf_counter() - start, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=175000, help='Synthetic series length')
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--epochs', type=int, default=2, help='Timed epochs per path')
+    args = parser.parse_args()
+
+    with open(CONFIG_PATH, 'r') as f:
+        config = yaml.safe_load(f)
+    training_config = config['training']
+    batch_size = args.batch_size or training_config['batch_size']
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(root_dir, location_paths(config)[1])
+        stats_path = os.path.join(root_dir, 'data/processed/statistics.npy')
+        if not os.path.exists(file_path):
+            print(f"{file_path} not found, using {args.rows} synthetic rows")
+            file_path, stats_path = write_synthetic_data(tmp_dir, args.rows, config['features']['inputs'])
+
+        dataset = WeatherDataset(
+            file_path=file_path,
+            stats_path=stats_path,
+            seq_len=training_config['seq_len'],
+            pred_len=training_config['pred_len'],
+            target_col=config['features']['target'],
+            mode='train',
+            split_ratio=training_config['split_ratio']
+        )
+
+    loaders = {
+        'per-item + default_collate': DataLoader(PerItemDataset(dataset), batch_size=batch_size, shuffle=True),
+        'batched get_batch': create_batch_loader(dataset, batch_size=batch_size, shuffle=True),
+    }
+
+    print(f"\n{len(dataset)} windows, batch_size={batch_size}")
+    print(f"{'path':<30}{'epoch time (s)':>16}{'samples/s':>14}")
+    results = {}
+    for name, loader in loaders.items():
+        time_epoch(loader)  # warmup
+        timings = [time_epoch(loader) for _ in range(args.epochs)]
+        seconds = min(t for t, _ in timings)
+        samples = timings[0][1]
+        results[name] = seconds
+        print(f"{name:<30}{seconds:>16.3f}{samples / seconds:>14.0f}")
+
+    baseline, batched = results.values()
+    print(f"\nSpeedup: {baseline / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Load benchmark for the onnxruntime session pool.
+
+Drives InferenceService with --concurrency closed-loop clients (each sends
+its next request as soon as the previous one returns) and reports p50/p99
+latency and throughput for every (pool size, max batch size) pair.
+
+Usage:
+    python benchmarks/bench_inference_pool.py [--pool-sizes 1 2 4] [--batch-sizes 1 8 32]
+
+Each session gets cores // pool_size intra-op threads unless
+--intra-op-threads is given. Run it on the serving hardware; results on a
+machine with fewer cores than the largest pool are not meaningful.
+If the configured model has a fixed batch dimension, an untrained re-export
+is timed instead (see bench_serving.py).
+"""
+
+import argparse
+import asyncio
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+import numpy as np
+import onnxruntime as ort
+import yaml
+
+root_dir = pathlib.Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from bench_serving import export_untrained, make_samples, supports_batching
+from src.app.services import InferenceService, OnnxForecaster
+
+CONFIG_PATH = os.path.join(root_dir, 'config.yaml')
+
+
+def run_load(service, samples, concurrency, duration):
+    """Closed-loop load for `duration` seconds. Returns (latencies, elapsed)."""
+
+    async def client(i, deadline, latencies):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await service.batcher.submit(samples[i % len(samples)])
+            latencies.append(time.perf_counter() - start)
+            i += concurrency
+
+    async def main():
+        await service.start()
+        # Warmup
+        await asyncio.gather(*(service.batcher.submit(samples[i]) for i in range(concurrency)))
+        latencies = []
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(client(i, deadline, latencies) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        await service.stop()
+        return np.array(latencies), elapsed
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--concurrency', type=int, default=64, help='Closed-loop clients')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per configuration')
+    parser.add_argument('--intra-op-threads', type=int, default=None)
+    parser.add_argument('--max-wait-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    with open(CONFIG_PATH, 'r') as f:
+        config = yaml.safe_load(f)
+    serving_config = config.get('serving', {})
+    max_wait_ms = args.max_wait_ms or serving_config.get('max_wait_ms', 5.0)
+    stats_path = os.path.join(root_dir, serving_config.get('stats_path', 'data/processed/statistics.json'))
+    cores = os.cpu_count()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(root_dir, serving_config.get('model_path', 'models/best_model.onnx'))
+        if not supports_batching(ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])):
+            print(f"{model_path} has a fixed batch dimension, timing an untrained re-export")
+            model_path = os.path.join(tmp_dir, 'model.onnx')
+            export_untrained(config, model_path)
+
+        samples = make_samples(256)
+        print(f"\n{cores} cores, {args.concurrency} concurrent clients, max_wait={max_wait_ms}ms")
+        print(f"{'pool':>6}{'threads':>9}{'batch':>7}{'p50 (ms)':>11}{'p99 (ms)':>11}{'req/s':>10}")
+        for pool_size in args.pool_sizes:
+            intra_op_threads = args.intra_op_threads or max(1, cores // pool_size)
+            model = OnnxForecaster(
+                model_path,
+                stats_path,
+                config['features']['target'],
+                pool_size=pool_size,
+                intra_op_threads=intra_op_threads,
+                inter_op_threads=1,
+            )
+            for batch_size in args.batch_sizes:
+                service = InferenceService(model, max_batch_size=batch_size, max_wait_ms=max_wait_ms)
+                latencies, elapsed = run_load(service, samples, args.concurrency, args.duration)
+                p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+                print(
+                    f"{pool_size:>6}{intra_op_threads:>9}{batch_size:>7}"
+                    f"{p50:>11.1f}{p99:>11.1f}{len(latencies) / elapsed:>10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
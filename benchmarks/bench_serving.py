@@ -0,0 +1,128 @@
+"""
+Inference throughput benchmark for the micro-batching service.
+
+Fires --requests concurrent predictions and compares serialized
+single-sample onnxruntime runs (one request at a time, as the Rust backend
+does behind its session mutex) against MicroBatcher coalescing.
+
+Usage:
+    python benchmarks/bench_serving.py [--requests 256] [--max-batch-size 32]
+
+If the configured model was exported with a fixed batch dimension, an
+untrained model with the same architecture is exported to a temp dir for
+timing (weights do not affect throughput).
+"""
+
+import argparse
+import asyncio
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+import numpy as np
+import onnxruntime as ort
+import torch
+import yaml
+
+root_dir = pathlib.Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+sys.path.append(str(root_dir / 'src' / 'training'))
+
+from model import build_model_from_config
+from src.app.services import NUM_FEATURES, SEQ_LEN, MicroBatcher
+
+CONFIG_PATH = os.path.join(root_dir, 'config.yaml')
+
+
+def export_untrained(config, onnx_path):
+    """Export a randomly initialized model with a dynamic batch axis."""
+    model = build_model_from_config(config).eval().use_explicit_attention()
+    dummy_input = torch.randn(1, SEQ_LEN, NUM_FEATURES)
+    dummy_input[..., -1] = 0
+    torch.onnx.export(
+        model,
+        dummy_input,
+        onnx_path,
+        opset_version=18,
+        input_names=['input'],
+        output_names=['output'],
+        dynamic_axes={'input': {0: 'batch_size'}, 'output': {0: 'batch_size'}}
+    )
+
+
+def supports_batching(session):
+    try:
+        session.run(None, {'input': np.zeros((2, SEQ_LEN, NUM_FEATURES), dtype=np.float32)})
+    except Exception:
+        return False
+    return True
+
+
+def make_samples(num_samples):
+    rng = np.random.default_rng(0)
+    samples = rng.normal(size=(num_samples, SEQ_LEN, NUM_FEATURES)).astype(np.float32)
+    samples[..., -1] = rng.integers(0, 4, size=(num_samples, SEQ_LEN))
+    return samples
+
+
+def time_serialized(run_batch, samples):
+    start = time.perf_counter()
+    for x in samples:
+        run_batch([x])
+    return time.perf_counter() - start
+
+
+def time_batched(run_batch, samples, max_batch_size, max_wait):
+    async def main():
+        batcher = MicroBatcher(run_batch, max_batch_size, max_wait)
+        start = time.perf_counter()
+        await asyncio.gather(*(batcher.submit(x) for x in samples))
+        elapsed = time.perf_counter() - start
+        await batcher.stop()
+        return elapsed
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=256, help='Concurrent requests per run')
+    parser.add_argument('--max-batch-size', type=int, default=None)
+    parser.add_argument('--max-wait-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    with open(CONFIG_PATH, 'r') as f:
+        config = yaml.safe_load(f)
+    serving_config = config.get('serving', {})
+    max_batch_size = args.max_batch_size or serving_config.get('max_batch_size', 32)
+    max_wait = (args.max_wait_ms or serving_config.get('max_wait_ms', 5.0)) / 1000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(root_dir, serving_config.get('model_path', 'models/best_model.onnx'))
+        session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        if not supports_batching(session):
+            print(f"{model_path} has a fixed batch dimension, timing an untrained re-export")
+            model_path = os.path.join(tmp_dir, 'model.onnx')
+            export_untrained(config, model_path)
+            session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+
+        def run_batch(inputs):
+            return session.run(None, {'input': np.stack(inputs)})[0]
+
+        samples = make_samples(args.requests)
+        run_batch([samples[0]])  # warmup
+
+        serialized = time_serialized(run_batch, samples)
+        batched = time_batched(run_batch, samples, max_batch_size, max_wait)
+
+    print(f"\n{args.requests} requests, max_batch_size={max_batch_size}, max_wait={max_wait * 1000:.1f}ms")
+    print(f"{'path':<24}{'total (s)':>12}{'requests/s':>14}")
+    print(f"{'serialized':<24}{serialized:>12.3f}{args.requests / serialized:>14.1f}")
+    print(f"{'micro-batched':<24}{batched:>12.3f}{args.requests / batched:>14.1f}")
+    print(f"\nSpeedup: {serialized / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
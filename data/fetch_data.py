@@ -1,8 +1,11 @@
 import requests
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, date
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
 import os
 import sys
+import time
 import pathlib
 import yaml
 
@@ -14,54 +17,200 @@ CONFIG_PATH = os.path.join(root_dir, 'config.yaml')
 with open(CONFIG_PATH, 'r') as f:
     config = yaml.safe_load(f)
 
+from src.utils.locations import get_locations, location_paths
 from src.utils.logger import setup_logger
-from src.utils.s3_client import upload_to_s3
+from src.utils.s3_client import upload_to_s3, upload_store_partitions
+from src.utils.weather_store import is_store, read_meta, write_partitions, write_store, export_csv
 
 # Setup logger
 logger = setup_logger('fetch_data', 'logs/fetch_data.log')
 
-LAT = config['location']['latitude']
-LON = config['location']['longitude']
-TIME_ZONE=config['location']['timezone']
-START_DATE = config['data']['start_date'] 
+LOCATIONS = get_locations(config)
+START_DATE = config['data']['start_date']
 END_DATE = datetime.now().strftime("%Y-%m-%d")
-FILE_PATH=config['data']['raw_file_path']
 BUCKET_NAME = config['data']['bucket_name']
+ARCHIVE_URL = config['data'].get('archive_url', "https://archive-api.open-meteo.com/v1/archive")
+BACKFILL = config['data'].get('backfill', {})
 
 HOURLY_PARAMS = config['features']['inputs']
 
-def main():
-    logger.info(f"Data Fetching ({START_DATE} - {END_DATE})...")
-    logger.info("This may take 10-20 seconds due to the amount of data if not already downloaded, please wait.")
+# Completed chunks are recorded here so an interrupted backfill can resume
+CHECKPOINT_FILE = "backfill_checkpoint.json"
+
+# Status codes worth retrying (rate limiting and transient server errors)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def year_chunks(start_date, end_date):
+    """Split an inclusive YYYY-MM-DD range into per-year (start, end) chunks."""
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    chunks = []
+    for year in range(start.year, end.year + 1):
+        chunk_start = max(start, date(year, 1, 1))
+        chunk_end = min(end, date(year, 12, 31))
+        chunks.append((chunk_start.isoformat(), chunk_end.isoformat()))
+    return chunks
+
+
+def fetch_chunk(session, url, params, retries=4, backoff=2.0, timeout=60):
+    """
+    Fetch one date range from the archive API, retrying with exponential backoff.
+
+    Returns:
+        DataFrame with the 'hourly' payload
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+            if response.status_code in RETRY_STATUS:
+                raise requests.HTTPError(f"{response.status_code} from archive API", response=response)
+            response.raise_for_status()
+            return pd.DataFrame(response.json()['hourly'])
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            status = getattr(e.response, 'status_code', None)
+            if attempt == retries or (status is not None and status not in RETRY_STATUS):
+                raise
+            delay = backoff * 2 ** attempt
+            logger.warning(f"{params['start_date']} - {params['end_date']} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _load_checkpoint(store_path):
+    path = os.path.join(store_path, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r') as f:
+        return {tuple(chunk) for chunk in json.load(f)['completed']}
+
+
+def _save_checkpoint(store_path, completed):
+    path = os.path.join(store_path, CHECKPOINT_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'completed': sorted(completed)}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def backfill_locations(
+    targets,
+    start_date=START_DATE,
+    end_date=END_DATE,
+    url=ARCHIVE_URL,
+    max_workers=BACKFILL.get('max_workers', 4),
+    retries=BACKFILL.get('retries', 4),
+    backoff=BACKFILL.get('backoff', 2.0),
+    timeout=BACKFILL.get('timeout', 60),
+    session=None,
+):
+    """
+    Download the archive for several locations in yearly chunks.
+
+    All (location, year) chunks share one bounded worker pool and one HTTP
+    session. Each chunk is written to its location's store partition as soon
+    as it arrives, so no full history is ever held in memory. Finished chunks
+    are checkpointed per store, and rerunning after a failure only fetches
+    the missing ones.
+
+    Args:
+        targets: List of (store_path, location) pairs, where location has
+            latitude, longitude and timezone
+
+    Returns:
+        Dict mapping store_path to the partition names written in this run
+    """
+    jobs = []
+    checkpoints = {}
+    for store_path, location in targets:
+        os.makedirs(store_path, exist_ok=True)
+        checkpoints[store_path] = _load_checkpoint(store_path)
+        for chunk_start, chunk_end in year_chunks(start_date, end_date):
+            if (chunk_start, chunk_end) in checkpoints[store_path]:
+                continue
+            params = {
+                "latitude": location['latitude'],
+                "longitude": location['longitude'],
+                "start_date": chunk_start,
+                "end_date": chunk_end,
+                "hourly": HOURLY_PARAMS,
+                "timezone": location['timezone']
+            }
+            jobs.append((store_path, (chunk_start, chunk_end), params))
+    logger.info(f"Backfill: {len(jobs)} chunks to fetch for {len(targets)} locations.")
+
+    own_session = session is None
+    session = session or requests.Session()
+    written = {store_path: [] for store_path, _ in targets}
+    failed = []
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(fetch_chunk, session, url, params, retries, backoff, timeout): (store_path, chunk)
+                for store_path, chunk, params in jobs
+            }
+
+            # Store writes happen on this thread only, one chunk at a time
+            for future in as_completed(futures):
+                store_path, chunk = futures[future]
+                try:
+                    df = future.result()
+                except Exception as e:
+                    logger.error(f"{store_path}: chunk {chunk[0]} - {chunk[1]} failed: {e}")
+                    failed.append((store_path, chunk))
+                    continue
+
+                written[store_path].extend(write_partitions(df, store_path))
+                checkpoints[store_path].add(chunk)
+                _save_checkpoint(store_path, checkpoints[store_path])
+                logger.info(f"{store_path}: chunk {chunk[0]} - {chunk[1]} stored ({len(df)} rows).")
+    finally:
+        if own_session:
+            session.close()
+
+    if failed:
+        raise RuntimeError(f"{len(failed)} chunks failed, rerun to resume: {sorted(failed)}")
+    return {store_path: sorted(names) for store_path, names in written.items()}
+
+
+def backfill(store_path, start_date=START_DATE, end_date=END_DATE, location=None, **kwargs):
+    """
+    Backfill a single location's store (default: the primary location).
+
+    Returns:
+        List of partition names written in this run
+    """
+    location = location or LOCATIONS[0]
+    return backfill_locations([(store_path, location)], start_date, end_date, **kwargs)[store_path]
 
-    url = "https://archive-api.open-meteo.com/v1/archive"
 
-    params = {
-    "latitude": LAT,
-    "longitude": LON,
-    "start_date": START_DATE,
-    "end_date": END_DATE,
-    "hourly": HOURLY_PARAMS,
-    "timezone": TIME_ZONE    
-    }
+def main():
+    logger.info(f"Data Fetching ({START_DATE} - {END_DATE}) for {[l['name'] for l in LOCATIONS]}...")
 
+    paths = {location['name']: location_paths(config, location['name']) for location in LOCATIONS}
+    targets = []
     try:
-        if os.path.exists(FILE_PATH):
-            logger.info("File already exists. Skipping download.")
-            df = pd.read_csv(FILE_PATH)
-        else:
-            # Ensure directory exists before saving
-            os.makedirs(os.path.dirname(FILE_PATH), exist_ok=True)
-            
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            df = pd.DataFrame(data['hourly'])
-            df.to_csv(FILE_PATH, index=False)
+        for location in LOCATIONS:
+            store_path, file_path = paths[location['name']]
+            if is_store(store_path) and not os.path.exists(os.path.join(store_path, CHECKPOINT_FILE)):
+                logger.info(f"{location['name']}: store already exists. Skipping download.")
+            elif not is_store(store_path) and os.path.exists(file_path):
+                logger.info(f"{location['name']}: CSV already exists. Converting it to the columnar store.")
+                write_store(pd.read_csv(file_path), store_path)
+            else:
+                # Fresh or interrupted backfill
+                targets.append((store_path, location))
+
+        if targets:
+            backfill_locations(targets)
+            for store_path, _ in targets:
+                os.remove(os.path.join(store_path, CHECKPOINT_FILE))
+
+        # Keep the CSV exports in sync with the stores
+        for store_path, file_path in paths.values():
+            export_csv(store_path, file_path)
+            logger.info(f"Store: {store_path}, File: {file_path}")
 
         logger.info("Process completed.")
-        logger.info(f"File: {FILE_PATH}")
 
     except Exception as e:
         logger.error(f"Error: {e}")
@@ -69,7 +218,11 @@ def main():
     try:
         logger.info(f"S3'e yükleme başlatılıyor: {BUCKET_NAME}")
 
-        success = upload_to_s3(FILE_PATH, bucket_name=BUCKET_NAME)
+        success = True
+        for store_path, file_path in paths.values():
+            success = upload_to_s3(file_path, bucket_name=BUCKET_NAME) and success
+            partitions = list(read_meta(store_path)['partitions'])
+            success = upload_store_partitions(store_path, partitions, bucket_name=BUCKET_NAME) and success
 
         if success:
             logger.info("Upload Successful")
@@ -79,4 +232,4 @@ def main():
         logger.error(f"Error: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
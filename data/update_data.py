@@ -1,6 +1,8 @@
+import argparse
 import requests
 import pandas as pd
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import os
 import sys
 import pathlib
@@ -10,8 +12,17 @@ import yaml
 root_dir = pathlib.Path(__file__).parent.parent
 sys.path.append(str(root_dir))
 
+from src.utils.locations import get_locations, location_paths
 from src.utils.logger import setup_logger
-from src.utils.s3_client import upload_to_s3, download_from_s3
+from src.utils.s3_client import (
+    create_s3_client, upload_to_s3, download_from_s3, download_store, upload_store_partitions
+)
+from src.training.calculate_std_mean import STREAM_STATS_PATH, update_stream_stats
+from src.app.precompute import precompute_forecasts, table_path
+from src.app.services import SEQ_LEN
+from src.utils.weather_store import (
+    is_store, last_timestamp, append_rows, write_store, export_csv, missing_partitions
+)
 
 # Load Config
 CONFIG_PATH = os.path.join(root_dir, 'config.yaml')
@@ -23,92 +34,208 @@ with open(CONFIG_PATH, 'r') as f:
 logger = setup_logger('update_data', 'logs/update_data.log')
 
 # Constants from Config
-LAT = config['location']['latitude']
-LON = config['location']['longitude']
-TIME_ZONE = config['location']['timezone']
-FILE_PATH = config['data']['raw_file_path']
+LOCATIONS = get_locations(config)
 BUCKET_NAME = config['data']['bucket_name']
 HOURLY_PARAMS = config['features']['inputs']
 
-os.makedirs(os.path.dirname(FILE_PATH), exist_ok=True)
-
-def main():
-    logger.info("Starting data update process...")
-
-    if not os.path.exists(FILE_PATH):
-        logger.info(f"File not found at {FILE_PATH}. Downloading from S3...")
-        download_from_s3(FILE_PATH, BUCKET_NAME, logger)
-
-    try:
-        # Load existing data
-        logger.info(f"Loading existing data from {FILE_PATH}...")
-        df = pd.read_csv(FILE_PATH)
-        
-        # Ensure 'time' column is datetime
-        df['time'] = pd.to_datetime(df['time'])
-        
-        # Find the last recorded date
-        last_date = df['time'].max()
-        logger.info(f"Last recorded timestamp: {last_date}")
-
-        # Calculate start date for new data (next hour)
-        start_date_new = last_date + timedelta(hours=1)
-        end_date_new = datetime.now()
-
-        # Check if update is needed
-        if start_date_new >= end_date_new:
-            logger.info("Data is already up to date.")
+def latest_csv_path(file_path):
+    """Path of the latest-week CSV next to a location's full CSV export."""
+    stem, ext = os.path.splitext(file_path)
+    return f"{stem}_latest{ext}"
+
+def ensure_local_store(store_path, file_path, s3):
+    """
+    Make sure a local store exists to append to.
+
+    Fresh checkouts (e.g. the scheduled workflow) only fetch meta.json and the
+    newest partitions from S3: enough to append and to read the last SEQ_LEN
+    hours for precompute_and_upload. Legacy setups without a store are
+    migrated from the CSV once, and the full migrated store is uploaded.
+
+    Note that such a partial store's meta.json still lists every partition
+    while only the downloaded ones exist locally: appending works, but
+    reading older rows (read_tail past the local partitions, read_store)
+    raises FileNotFoundError. See missing_partitions().
+    """
+    if is_store(store_path):
+        return
+
+    logger.info(f"Store not found at {store_path}. Downloading latest partitions from S3...")
+    if download_store(store_path, BUCKET_NAME, logger, latest_only=True, min_rows=SEQ_LEN, s3=s3):
+        return
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    if not os.path.exists(file_path):
+        logger.info(f"File not found at {file_path}. Downloading from S3...")
+        download_from_s3(file_path, BUCKET_NAME, logger, s3=s3)
+
+    logger.info(f"Converting {file_path} to the columnar store...")
+    partitions = write_store(pd.read_csv(file_path), store_path)
+
+    # Publish the whole migrated store: later runs only upload the partitions
+    # they touch, and S3's meta.json must not list partitions it does not have
+    logger.info(f"Uploading all {len(partitions)} migrated partitions to S3 bucket: {BUCKET_NAME}...")
+    if not upload_store_partitions(store_path, partitions, bucket_name=BUCKET_NAME, s3=s3):
+        raise RuntimeError(f"Could not upload the migrated store {store_path}")
+
+
+def update_location(session, s3, location):
+    """
+    Append the new hours for one location and upload what changed.
+
+    Returns:
+        DataFrame of appended rows (empty if already up to date)
+    """
+    name = location['name']
+    store_path, file_path = location_paths(config, name)
+    ensure_local_store(store_path, file_path, s3)
+
+    # Find the last recorded date from the store index (no data is read)
+    last_date = last_timestamp(store_path)
+    logger.info(f"{name}: last recorded timestamp: {last_date}")
+
+    # Calculate start date for new data (next hour)
+    start_date_new = last_date + timedelta(hours=1)
+    end_date_new = datetime.now()
+
+    # Check if update is needed
+    if start_date_new >= end_date_new:
+        logger.info(f"{name}: data is already up to date.")
+        return pd.DataFrame()
+
+    # Format dates for API (YYYY-MM-DD)
+    # Open-Meteo accepts date range, we might fetch a bit more overlap but we will filter
+    start_date_str = start_date_new.strftime("%Y-%m-%d")
+    end_date_str = end_date_new.strftime("%Y-%m-%d")
+
+    logger.info(f"{name}: fetching new data from {start_date_str} to {end_date_str}...")
+
+    url = config['data'].get('archive_url', "https://archive-api.open-meteo.com/v1/archive")
+    params = {
+        "latitude": location['latitude'],
+        "longitude": location['longitude'],
+        "start_date": start_date_str,
+        "end_date": end_date_str,
+        "hourly": HOURLY_PARAMS,
+        "timezone": location['timezone']
+    }
+
+    response = session.get(url, params=params)
+    response.raise_for_status()
+    new_data = response.json()
+
+    # Append only rows after the last recorded timestamp
+    df_new, touched = append_rows(pd.DataFrame(new_data['hourly']), store_path)
+
+    if df_new.empty:
+        logger.info(f"{name}: no new data points found after filtering.")
+        return df_new
+
+    logger.info(f"{name}: found {len(df_new)} new data points. Updated partitions: {touched}")
+
+    # Upload only the touched partitions and the index
+    logger.info(f"{name}: uploading updated partitions to S3 bucket: {BUCKET_NAME}...")
+    success = upload_store_partitions(store_path, touched, bucket_name=BUCKET_NAME, s3=s3)
+
+    # The dashboard reads the latest week as a small CSV, refreshed every run
+    # (the full-history CSV is rebuilt separately, see export_csv_and_upload)
+    latest_path = latest_csv_path(file_path)
+    export_csv(store_path, latest_path, num_rows=SEQ_LEN)
+    success = upload_to_s3(latest_path, bucket_name=BUCKET_NAME, s3=s3) and success
+
+    if success:
+        logger.info(f"{name}: S3 Upload Successful.")
+    else:
+        logger.error(f"{name}: S3 Upload Failed.")
+    return df_new
+
+
+def export_csv_and_upload(s3, location):
+    """
+    Rebuild a location's full-history CSV export from the store and upload it
+    (the dashboard reads the latest-week CSV that update_location refreshes).
+
+    This reads and uploads the whole history, so it runs on its own schedule
+    (update_data.py --export-csv) rather than after every hourly update.
+    """
+    name = location['name']
+    store_path, file_path = location_paths(config, name)
+    if not is_store(store_path) or missing_partitions(store_path):
+        logger.info(f"{name}: downloading the full store from S3...")
+        if not download_store(store_path, BUCKET_NAME, logger, latest_only=False, s3=s3):
+            raise RuntimeError(f"{name}: could not download the store for the CSV export")
+
+    export_csv(store_path, file_path)
+    if upload_to_s3(file_path, bucket_name=BUCKET_NAME, s3=s3):
+        logger.info(f"{name}: CSV export uploaded.")
+    else:
+        logger.error(f"{name}: CSV export upload failed.")
+
+
+def update_and_upload_stream_stats(s3, df_new):
+    """
+    Fold new rows into the whole-history statistics kept on S3.
+
+    Scheduled runs start from a fresh checkout, so the accumulator is fetched
+    from S3 first and uploaded again after the update. This is a no-op until
+    the stream_statistics.npy written by calculate_std_mean.py has been
+    uploaded to the bucket once.
+    """
+    if not os.path.exists(STREAM_STATS_PATH):
+        os.makedirs(os.path.dirname(STREAM_STATS_PATH), exist_ok=True)
+        if not download_from_s3(STREAM_STATS_PATH, BUCKET_NAME, logger, s3=s3):
             return
 
-        # Format dates for API (YYYY-MM-DD)
-        # Open-Meteo accepts date range, we might fetch a bit more overlap but we will filter
-        start_date_str = start_date_new.strftime("%Y-%m-%d")
-        end_date_str = end_date_new.strftime("%Y-%m-%d")
-
-        logger.info(f"Fetching new data from {start_date_str} to {end_date_str}...")
+    if update_stream_stats(df_new) is None:
+        return
+    logger.info("Streaming statistics updated.")
+    if not upload_to_s3(STREAM_STATS_PATH, bucket_name=BUCKET_NAME, s3=s3):
+        logger.error("Streaming statistics upload failed.")
 
-        url = "https://archive-api.open-meteo.com/v1/archive"
-        params = {
-            "latitude": LAT,
-            "longitude": LON,
-            "start_date": start_date_str,
-            "end_date": end_date_str,
-            "hourly": HOURLY_PARAMS,
-            "timezone": TIME_ZONE
-        }
 
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        new_data = response.json()
-
-        # Create DataFrame for new data
-        df_new = pd.DataFrame(new_data['hourly'])
-        df_new['time'] = pd.to_datetime(df_new['time'])
+def precompute_and_upload(s3):
+    """Refresh the precomputed forecast table from the updated stores and upload it."""
+    try:
+        forecasts = precompute_forecasts(config, root_dir)
+    except Exception as e:
+        # A missing or broken model must not fail the data update itself
+        logger.error(f"Forecast precomputation failed: {e}")
+        return
 
-        # Filter new data to strictly follow the last recorded timestamp
-        df_new = df_new[df_new['time'] > last_date]
+    logger.info(f"Precomputed forecasts for {list(forecasts)}.")
+    if forecasts and upload_to_s3(table_path(config, root_dir), bucket_name=BUCKET_NAME, s3=s3):
+        logger.info("Forecast table uploaded.")
 
-        if df_new.empty:
-            logger.info("No new data points found after filtering.")
-            return
 
-        logger.info(f"Found {len(df_new)} new data points.")
+def main():
+    parser = argparse.ArgumentParser(description="Hourly store update (or CSV export with --export-csv)")
+    parser.add_argument('--export-csv', action='store_true',
+                        help="Rebuild and upload the full CSV exports instead of updating the stores")
+    args = parser.parse_args()
 
-        # Append new data
-        df_updated = pd.concat([df, df_new], ignore_index=True)
+    # One client for all worker threads (creating clients concurrently is not thread-safe)
+    s3 = create_s3_client()
 
-        # Save updated file
-        df_updated.to_csv(FILE_PATH, index=False)
-        logger.info(f"Updated data saved to {FILE_PATH}. Total rows: {len(df_updated)}")
+    if args.export_csv:
+        for location in LOCATIONS:
+            export_csv_and_upload(s3, location)
+        return
 
-        # Upload to S3
-        logger.info(f"Uploading updated file to S3 bucket: {BUCKET_NAME}...")
-        success = upload_to_s3(FILE_PATH, bucket_name=BUCKET_NAME)
+    logger.info(f"Starting data update process for {[l['name'] for l in LOCATIONS]}...")
 
-        if success:
-            logger.info("S3 Upload Successful.")
-        else:
-            logger.error("S3 Upload Failed.")
+    try:
+        # All locations are updated concurrently over one HTTP session
+        with requests.Session() as session, ThreadPoolExecutor(max_workers=len(LOCATIONS)) as executor:
+            futures = {executor.submit(update_location, session, s3, location): location for location in LOCATIONS}
+            appended = {futures[future]['name']: future.result() for future in futures}
+
+        # Fold the primary location's new rows into the whole-history stats without a rescan
+        df_new = appended[LOCATIONS[0]['name']]
+        if not df_new.empty:
+            update_and_upload_stream_stats(s3, df_new)
+
+        if any(not df.empty for df in appended.values()):
+            precompute_and_upload(s3)
 
     except Exception as e:
         logger.error(f"An error occurred: {e}")
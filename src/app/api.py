@@ -0,0 +1,66 @@
+"""
+FastAPI application exposing the micro-batched forecast endpoints.
+"""
+
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+
+from src.app.schemas import LatestForecastResponse, PredictionRequest, PredictionResponse
+from src.app.services import SEQ_LEN, InferenceService
+
+
+def create_app(config=None, service=None, root_dir='.'):
+    """
+    Build the API around an InferenceService.
+
+    Args:
+        config: Parsed config.yaml, used when no service is given
+        service: Pre-built InferenceService (tests, embedding)
+        root_dir: Base directory for the configured model/statistics paths
+    """
+
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.service = service or InferenceService.from_config(config, root_dir)
+        await app.state.service.start()
+        yield
+        await app.state.service.stop()
+
+    app = FastAPI(title="MetroCast-AI", lifespan=lifespan)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/stats")
+    async def stats():
+        cache = app.state.service.cache
+        return {"cache": cache.stats() if cache is not None else None}
+
+    @app.post("/predict", response_model=PredictionResponse)
+    async def predict(payload: PredictionRequest):
+        if len(payload.recent_history) != SEQ_LEN:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Expected {SEQ_LEN} hourly records, got {len(payload.recent_history)}",
+            )
+        try:
+            predictions = await app.state.service.predict(payload.recent_history)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Inference failed: {e}")
+        return PredictionResponse(predictions=predictions)
+
+    @app.get("/forecast/latest", response_model=LatestForecastResponse)
+    async def forecast_latest(location: str | None = None):
+        try:
+            location, last_time, predictions = await app.state.service.predict_latest(location)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=str(e.args[0]))
+        except ValueError as e:
+            raise HTTPException(status_code=503, detail=f"History not available yet: {e}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Inference failed: {e}")
+        return LatestForecastResponse(location=location, last_time=last_time, predictions=predictions)
+
+    return app
@@ -1,5 +1,26 @@
+import os
+import pathlib
+import sys
+
+import uvicorn
+import yaml
+
+ROOT_DIR = pathlib.Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.app.api import create_app
+
+CONFIG_PATH = os.path.join(ROOT_DIR, 'config.yaml')
+
+
 def main():
-    print("Hello World")    
+    with open(CONFIG_PATH, 'r') as f:
+        config = yaml.safe_load(f)
+    serving_config = config.get('serving', {})
+
+    app = create_app(config, root_dir=ROOT_DIR)
+    uvicorn.run(app, host=serving_config.get('host', '0.0.0.0'), port=serving_config.get('port', 8000))
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
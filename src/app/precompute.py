@@ -0,0 +1,83 @@
+"""
+Post-update forecast precomputation.
+
+Runs one batched inference over the latest window of every configured
+location and writes the results to the forecast table, so the serving
+layer can answer /forecast/latest with a lookup. Called by
+data/update_data.py after new hours are appended.
+"""
+
+import logging
+import os
+import pathlib
+import sys
+
+import numpy as np
+import yaml
+
+ROOT_DIR = pathlib.Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.app.services import SEQ_LEN, OnnxForecaster
+from src.utils.forecast_table import write_forecast_table
+from src.utils.locations import get_locations, location_paths
+from src.utils.weather_store import TIME_COL, is_store, read_tail
+
+CONFIG_PATH = os.path.join(ROOT_DIR, 'config.yaml')
+
+logger = logging.getLogger(__name__)
+
+
+def table_path(config, root_dir=ROOT_DIR):
+    return os.path.join(root_dir, config.get('serving', {}).get('forecast_table', 'data/processed/forecasts.npz'))
+
+
+def precompute_forecasts(config, root_dir=ROOT_DIR, model=None):
+    """
+    Forecast every location from its store and write the forecast table.
+
+    Args:
+        config: Parsed config.yaml
+        root_dir: Base directory for configured paths
+        model: Optional OnnxForecaster (default: built from config)
+
+    Returns:
+        Dict of location name -> (last_time, predictions) that was written
+    """
+    model = model or OnnxForecaster.from_config(config, root_dir)
+
+    names, last_times, windows = [], [], []
+    for location in get_locations(config):
+        store_path = os.path.join(root_dir, location_paths(config, location['name'])[0])
+        if not is_store(store_path):
+            logger.warning(f"{location['name']}: no store at {store_path}, skipping.")
+            continue
+        df = read_tail(store_path, SEQ_LEN)
+        if len(df) < SEQ_LEN:
+            logger.warning(f"{location['name']}: only {len(df)} of {SEQ_LEN} hours stored, skipping.")
+            continue
+        names.append(location['name'])
+        last_times.append(df[TIME_COL].iloc[-1])
+        windows.append(model.engine.transform(df, df[TIME_COL].to_numpy()))
+
+    if not names:
+        return {}
+
+    # One batched run for all locations
+    predictions = model.predict(np.stack(windows))
+    forecasts = {name: (last_times[i], predictions[i]) for i, name in enumerate(names)}
+    write_forecast_table(table_path(config, root_dir), forecasts)
+    return forecasts
+
+
+def main():
+    with open(CONFIG_PATH, 'r') as f:
+        config = yaml.safe_load(f)
+    forecasts = precompute_forecasts(config)
+    for name, (last_time, _) in forecasts.items():
+        print(f"{name}: forecast from {last_time}")
+    print(f"Forecast table written to {table_path(config)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Request/response models for the inference API.
+
+Mirrors backend/src/schemas.rs so clients can switch between the Rust and
+Python backends without changes.
+"""
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class WeatherInputRecord(BaseModel):
+    timestamp: datetime
+    temperature_2m: float
+    relative_humidity_2m: float
+    dew_point_2m: float
+    surface_pressure: float
+    precipitation: float
+    cloud_cover: float
+    shortwave_radiation: float
+    wind_speed_10m: float
+    wind_direction_10m: float
+    soil_temperature_0_to_7cm: float
+    # Raw WMO weather code (0-99)
+    weather_code: float
+
+
+class PredictionRequest(BaseModel):
+    # Exactly 168 hourly records of recent history (7 days)
+    recent_history: list[WeatherInputRecord]
+
+
+class PredictionResponse(BaseModel):
+    # 168 predicted hourly temperatures in Celsius (7 days)
+    predictions: list[float]
+
+
+class LatestForecastResponse(BaseModel):
+    location: str
+    # Last observed hour the forecast starts from
+    last_time: datetime
+    # 168 predicted hourly temperatures in Celsius (7 days)
+    predictions: list[float]
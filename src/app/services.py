@@ -0,0 +1,519 @@
+"""
+ONNX inference service with request micro-batching.
+
+Concurrent /predict calls are queued and coalesced into one (B, 168, 17)
+onnxruntime run, so under load the model sees a few large batches instead
+of many single-sample runs.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import onnxruntime as ort
+
+from src.utils.forecast_table import ForecastTable
+from src.utils.locations import get_locations, location_paths
+from src.utils.preprocessing import FeatureEngine, RollingWindow, load_statistics
+from src.utils.weather_store import META_FILE, TIME_COL, is_store, read_tail
+
+logger = logging.getLogger(__name__)
+
+SEQ_LEN = 168
+NUM_FEATURES = 17  # 10 weather + 6 time encodings + 1 weather_code
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-sample requests into batched runs.
+
+    A batch is dispatched once it holds max_batch_size samples or max_wait
+    seconds have passed since its first sample arrived. run_batch is a
+    blocking callable mapping a list of B samples to B outputs, executed
+    off the event loop on up to max_concurrency threads; while all of them
+    are busy, new requests queue up and form the next batch.
+    """
+
+    def __init__(self, run_batch, max_batch_size=32, max_wait=0.005, max_concurrency=1):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrency = max_concurrency
+        self._queue = None
+        self._worker = None
+        self._executor = None
+        self._slots = None
+        self._inflight = set()
+
+    async def start(self):
+        if self._worker is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='inference')
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+            self._executor.shutdown(wait=True)
+
+    async def submit(self, x):
+        """Queue one sample and wait for its row of the batched output."""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((x, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            # Only start collecting once a worker is free to run the batch
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            # Skip callers that went away while queued
+            batch = [(x, future) for x, future in batch if not future.done()]
+            if not batch:
+                return
+
+            inputs = [x for x, _ in batch]
+            loop = asyncio.get_running_loop()
+            try:
+                outputs = await loop.run_in_executor(self._executor, self.run_batch, inputs)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(outputs[i])
+        finally:
+            self._slots.release()
+
+
+def window_key(x):
+    """Fast content hash of a normalized input window."""
+    return hashlib.blake2b(np.ascontiguousarray(x).view(np.uint8), digest_size=16).digest()
+
+
+class ForecastCache:
+    """
+    LRU cache of forecasts that expire at the next period boundary.
+
+    New observations arrive hourly, so a forecast for an unchanged window
+    stays valid until the top of the next hour. Keys are any hashable, e.g.
+    window_key() of the model input or a (location, last timestamp) pair.
+
+    Args:
+        max_entries: Least recently used entries are evicted beyond this
+        period: Entries expire at the next multiple of this many seconds
+        clock: Time source in epoch seconds (injectable for tests)
+    """
+
+    def __init__(self, max_entries=1024, period=3600, clock=time.time):
+        self.max_entries = max_entries
+        self.period = period
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= self.clock():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value):
+        now = self.clock()
+        expires_at = (now // self.period + 1) * self.period
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class HistoryBuffer:
+    """
+    One location's most recent preprocessed hours.
+
+    Fed from the weather store that update_data.py appends to: refresh()
+    checks meta.json and preprocesses only the rows added since the last
+    refresh, appending them to a RollingWindow. A new hour therefore costs
+    one row of preprocessing, and serving a forecast needs no request
+    payload.
+
+    refresh() does file I/O, so async callers run it in an executor; hold
+    lock across refresh() and window() to read a consistent pair.
+
+    Args:
+        store_path: Location's weather store directory
+        engine: FeatureEngine used for training-identical preprocessing
+        seq_len: Number of hours kept (model input length)
+    """
+
+    def __init__(self, store_path, engine, seq_len=SEQ_LEN):
+        self.store_path = store_path
+        self.engine = engine
+        self.seq_len = seq_len
+        self.rows = RollingWindow(seq_len, engine.num_features)
+        self.last_time = None
+        self._meta_mtime = None
+        self.lock = threading.RLock()
+
+    @property
+    def ready(self):
+        return self.rows.full
+
+    def refresh(self):
+        """
+        Pull rows appended to the store since the last refresh.
+
+        Returns:
+            Number of new rows added to the window
+        """
+        with self.lock:
+            mtime = os.stat(os.path.join(self.store_path, META_FILE)).st_mtime_ns
+            if mtime == self._meta_mtime:
+                return 0
+            self._meta_mtime = mtime
+
+            df = read_tail(self.store_path, self.seq_len, after=self.last_time)
+            if len(df) == 0:
+                return 0
+            self.rows.append(self.engine.transform(df, df[TIME_COL].to_numpy()))
+            self.last_time = df[TIME_COL].iloc[-1]
+            return len(df)
+
+    def window(self):
+        """The buffered hours in chronological order, shape (seq_len, features)."""
+        if not self.ready:
+            raise ValueError(f"{self.store_path} holds {self.rows.size} of {self.seq_len} required hours")
+        return self.rows.view()
+
+
+class SessionPool:
+    """
+    Pool of onnxruntime sessions over the same model.
+
+    onnxruntime releases the GIL while running, so several threads can each
+    check out a session and run batches in parallel. Each session gets its
+    own intra-op thread budget; size * intra_op_threads should not exceed
+    the number of physical cores.
+
+    Args:
+        model_path: Path to the ONNX model
+        size: Number of sessions
+        intra_op_threads: Threads per session for a single op (0 = onnxruntime default)
+        inter_op_threads: Threads per session across independent ops (0 = default)
+    """
+
+    def __init__(self, model_path, size=1, intra_op_threads=0, inter_op_threads=0):
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+
+        self.size = size
+        self._sessions = queue.Queue()
+        for _ in range(size):
+            session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+            self._sessions.put(session)
+        self.input_name = session.get_inputs()[0].name
+
+    def run(self, inputs):
+        """Run a batch on the next free session, blocking until one is available."""
+        session = self._sessions.get()
+        try:
+            return session.run(None, {self.input_name: inputs})[0]
+        finally:
+            self._sessions.put(session)
+
+
+class OnnxForecaster:
+    """
+    Synchronous ONNX model wrapper: normalized windows in, forecasts out.
+
+    Shared by the online service and the precompute stage.
+
+    Args:
+        model_path: Path to the exported ONNX model
+        stats_path: statistics.json / statistics.npy used at training time
+        target_col: Predicted column, used to denormalize the output
+        pool_size: Number of onnxruntime sessions (concurrent batches)
+        intra_op_threads: Threads per session (0 = onnxruntime default)
+        inter_op_threads: Inter-op threads per session (0 = onnxruntime default)
+    """
+
+    def __init__(
+        self,
+        model_path,
+        stats_path,
+        target_col='temperature_2m',
+        pool_size=1,
+        intra_op_threads=0,
+        inter_op_threads=0,
+    ):
+        self.model_path = model_path
+        self.pool = SessionPool(model_path, pool_size, intra_op_threads, inter_op_threads)
+        self.engine = FeatureEngine(load_statistics(stats_path))
+
+        target_idx = self.engine.input_cols.index(target_col)
+        self.target_mean = float(self.engine.mean[target_idx])
+        self.target_std = float(self.engine.std[target_idx])
+        self.supports_batching = self._probe_batching()
+
+    @classmethod
+    def from_config(cls, config, root_dir='.'):
+        serving_config = config.get('serving', {})
+        return cls(
+            model_path=os.path.join(root_dir, serving_config.get('model_path', 'models/best_model.onnx')),
+            stats_path=os.path.join(root_dir, serving_config.get('stats_path', 'data/processed/statistics.json')),
+            target_col=config['features']['target'],
+            pool_size=serving_config.get('pool_size', 1),
+            intra_op_threads=serving_config.get('intra_op_threads', 0),
+            inter_op_threads=serving_config.get('inter_op_threads', 0),
+        )
+
+    def _probe_batching(self):
+        try:
+            self.run(np.zeros((2, SEQ_LEN, NUM_FEATURES), dtype=np.float32))
+        except Exception:
+            return False
+        return True
+
+    def run(self, inputs):
+        """Raw model output for a (B, seq_len, features) float32 batch."""
+        return self.pool.run(inputs)
+
+    def predict(self, inputs):
+        """
+        Denormalized forecasts for a (B, seq_len, features) batch.
+
+        Models exported with a fixed batch dimension are run one sample at
+        a time.
+
+        Returns:
+            float32 array of shape (B, pred_len)
+        """
+        if self.supports_batching:
+            outputs = self.run(inputs)
+        else:
+            outputs = np.concatenate([self.run(inputs[i:i + 1]) for i in range(len(inputs))])
+        return outputs.reshape(len(inputs), -1) * self.target_std + self.target_mean
+
+
+class InferenceService:
+    """
+    Serves batched predictions from an OnnxForecaster.
+
+    Args:
+        model: OnnxForecaster to run
+        max_batch_size: Upper bound on samples per onnxruntime run
+        max_wait_ms: How long the first request of a batch waits for company
+        cache: Optional ForecastCache consulted before running the model
+        stores: Optional dict of location name -> weather store path, served
+            by predict_latest(); the first entry is the default location
+        forecast_table: Optional ForecastTable of precomputed forecasts,
+            answered from when it is up to date with the store
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size=32,
+        max_wait_ms=5.0,
+        cache=None,
+        stores=None,
+        forecast_table=None,
+    ):
+        self.model = model
+        self.engine = model.engine
+
+        if max_batch_size > 1 and not model.supports_batching:
+            logger.warning(
+                f"{model.model_path} only accepts batch size 1 (exported with a fixed batch dimension); "
+                "re-export it with export_onnx.py to enable micro-batching."
+            )
+            max_batch_size = 1
+        # One reusable input buffer per concurrently running batch
+        self._buffers = queue.Queue()
+        for _ in range(model.pool.size):
+            self._buffers.put(np.empty((max_batch_size, SEQ_LEN, self.engine.num_features), dtype=np.float32))
+        self.batcher = MicroBatcher(self._predict_batch, max_batch_size, max_wait_ms / 1000, model.pool.size)
+        self.cache = cache
+        self.histories = {name: HistoryBuffer(path, self.engine) for name, path in (stores or {}).items()}
+        self.forecast_table = forecast_table
+
+    @classmethod
+    def from_config(cls, config, root_dir='.'):
+        serving_config = config.get('serving', {})
+        cache_config = serving_config.get('cache', {})
+        cache = None
+        if cache_config.get('enabled', True):
+            cache = ForecastCache(cache_config.get('max_entries', 1024), cache_config.get('period', 3600))
+
+        stores = {}
+        for location in get_locations(config):
+            store_path = os.path.join(root_dir, location_paths(config, location['name'])[0])
+            if is_store(store_path):
+                stores[location['name']] = store_path
+
+        table_path = serving_config.get('forecast_table')
+        return cls(
+            model=OnnxForecaster.from_config(config, root_dir),
+            max_batch_size=serving_config.get('max_batch_size', 32),
+            max_wait_ms=serving_config.get('max_wait_ms', 5.0),
+            cache=cache,
+            stores=stores,
+            forecast_table=ForecastTable(os.path.join(root_dir, table_path)) if table_path else None,
+        )
+
+    def _predict_batch(self, windows):
+        buffer = self._buffers.get()
+        try:
+            return self.model.predict(np.stack(windows, out=buffer[:len(windows)]))
+        finally:
+            self._buffers.put(buffer)
+
+    async def start(self):
+        await self.batcher.start()
+
+    async def stop(self):
+        await self.batcher.stop()
+
+    async def predict(self, records):
+        """
+        Forecast the next 168 hours of the target from 168 hourly records.
+
+        Returns:
+            List of denormalized predictions
+        """
+        if len(records) != SEQ_LEN:
+            raise ValueError(f"Expected {SEQ_LEN} hourly records, got {len(records)}")
+        x = self.engine.transform_records([records])[0]
+        if self.cache is None:
+            return (await self.batcher.submit(x)).tolist()
+
+        key = window_key(x)
+        y = self.cache.get(key)
+        if y is None:
+            y = await self.batcher.submit(x)
+            self.cache.put(key, y)
+        return y.tolist()
+
+    async def predict_latest(self, location=None):
+        """
+        Forecast from the most recent stored hours of a location.
+
+        The precomputed table answers when it covers the store's last hour;
+        otherwise the model runs on the buffered history.
+
+        Args:
+            location: Location name (default: the first configured store)
+
+        Returns:
+            Tuple of (location, last observed timestamp, predictions)
+        """
+        # Table reloads and store refreshes read files; keep them off the event loop
+        loop = asyncio.get_running_loop()
+        location, last_time, precomputed, window = await loop.run_in_executor(None, self._latest_inputs, location)
+        if precomputed is not None:
+            return location, last_time, precomputed.tolist()
+
+        key = (location, last_time)
+        y = self.cache.get(key) if self.cache is not None else None
+        if y is None:
+            y = await self.batcher.submit(window)
+            if self.cache is not None:
+                self.cache.put(key, y)
+        return location, last_time, y.tolist()
+
+    def _latest_inputs(self, location):
+        """
+        Blocking part of predict_latest (forecast table and store reads).
+
+        Returns:
+            Tuple of (location, last_time, precomputed predictions or None,
+            model input window or None)
+        """
+        table_locations = self.forecast_table.locations if self.forecast_table is not None else []
+        served = list(self.histories) + [name for name in table_locations if name not in self.histories]
+        if not served:
+            raise KeyError("No weather stores or precomputed forecasts are configured for serving")
+        location = location or served[0]
+        if location not in served:
+            raise KeyError(f"Unknown location '{location}'. Served: {served}")
+
+        precomputed = self.forecast_table.get(location) if self.forecast_table is not None else None
+        history = self.histories.get(location)
+        if history is None:
+            last_time, y = precomputed
+            return location, last_time, y, None
+
+        with history.lock:
+            history.refresh()
+            if precomputed is not None and precomputed[0] == history.last_time:
+                return location, history.last_time, precomputed[1], None
+            # Copy: the window view changes with the next refresh
+            return location, history.last_time, None, history.window().copy()
@@ -3,60 +3,115 @@ import numpy as np
 import yaml
 import os
 import pathlib
+import sys
 
 root_dir = pathlib.Path(__file__).parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.utils.locations import location_paths
+from src.utils.preprocessing import TIME_COLS, time_features
+from src.utils.running_stats import RunningStats
+from src.utils.weather_store import is_store, count_rows, iter_weather_frames
+
 CONFIG_PATH = os.path.join(root_dir, 'config.yaml')
 with open(CONFIG_PATH, 'r') as f:
     config = yaml.safe_load(f)
 
+STATS_PATH = os.path.join(root_dir, 'data/processed/statistics.npy')
+# Accumulator state over the whole history, refreshed by update_data.py
+STREAM_STATS_PATH = os.path.join(root_dir, 'data/processed/stream_statistics.npy')
+
+# Exclude weather_code from normalization (it's categorical)
+EXCLUDE_FROM_NORM = ['time', 'weather_code']
+
+
+def add_time_features(df):
+    encoded = time_features(df['time'].to_numpy())
+    for j, col in enumerate(TIME_COLS):
+        df[col] = encoded[:, j]
+    return df
+
+
+def feature_columns(df):
+    """Columns that are normalized, in statistics.npy order."""
+    return [c for c in df.columns if c not in EXCLUDE_FROM_NORM]
+
+
+def save_stream_stats(accumulator, input_cols, path=None):
+    np.save(path or STREAM_STATS_PATH, {'input_cols': input_cols, **accumulator.state_dict()})
+
+
+def load_stream_stats(path=None):
+    state = np.load(path or STREAM_STATS_PATH, allow_pickle=True).item()
+    return RunningStats.from_state_dict(state), state['input_cols']
+
+
+def update_stream_stats(df_new, path=None):
+    """
+    Merge freshly appended rows into the saved whole-history accumulator.
+
+    Returns the updated accumulator, or None if no accumulator was saved yet.
+    """
+    path = path or STREAM_STATS_PATH
+    if not os.path.exists(path):
+        return None
+    accumulator, input_cols = load_stream_stats(path)
+    df_new = add_time_features(df_new.assign(time=pd.to_datetime(df_new['time'])))
+    accumulator.update(df_new[input_cols].to_numpy())
+    save_stream_stats(accumulator, input_cols, path)
+    return accumulator
+
+
 def preprocess_and_split():
-    df = pd.read_csv(config['data']['raw_file_path'])
-    df['time'] = pd.to_datetime(df['time'])
-    
-    df['hour_sin'] = np.sin(2 * np.pi * df['time'].dt.hour / 24)
-    df['hour_cos'] = np.cos(2 * np.pi * df['time'].dt.hour / 24)
-    df['day_sin'] = np.sin(2 * np.pi * df['time'].dt.day / 365)
-    df['day_cos'] = np.cos(2 * np.pi * df['time'].dt.day / 365)
-    df['month_sin'] = np.sin(2 * np.pi * (df['time'].dt.month - 1) / 12)
-    df['month_cos'] = np.cos(2 * np.pi * (df['time'].dt.month - 1) / 12)
-    
-    target_col = config['features']['target']
-    # Exclude weather_code from normalization (it's categorical)
-    exclude_from_norm = ['time', 'weather_code']
-    input_cols = [c for c in df.columns if c not in exclude_from_norm]
-    
-    # Keep weather_code separately (not normalized)
-    all_cols = input_cols + ['weather_code'] if 'weather_code' in df.columns else input_cols
-    
-    total_len = len(df)
-    train_ratio = config['training']['split_ratio']['train'] 
+    # Normalization stats come from the primary location
+    store_path, file_path = location_paths(config)
+    data_path = store_path if is_store(store_path) else file_path
+
+    total_len = count_rows(data_path)
+    train_ratio = config['training']['split_ratio']['train']
     val_ratio = config['training']['split_ratio'].get('val', 0.10)
-    
+
     train_end = int(total_len * train_ratio)
     val_end = train_end + int(total_len * val_ratio)
-    
-    train_df = df.iloc[:train_end]
-    val_df = df.iloc[train_end:val_end]
-    test_df = df.iloc[val_end:]
-    
-    mean = train_df[input_cols].mean().values
-    std = train_df[input_cols].std().values
-    std[std == 0] = 1.0 
-    
+
+    # Single streaming pass: train-split stats for normalization and
+    # whole-history stats for incremental refreshes
+    train_stats = RunningStats()
+    history_stats = RunningStats()
+    input_cols = None
+    offset = 0
+    for chunk in iter_weather_frames(data_path):
+        chunk = add_time_features(chunk)
+        if input_cols is None:
+            input_cols = feature_columns(chunk)
+            has_weather_code = 'weather_code' in chunk.columns
+
+        values = chunk[input_cols].to_numpy()
+        history_stats.update(values)
+        train_stats.update(values[:max(0, train_end - offset)])
+        offset += len(chunk)
+
+    # Keep weather_code separately (not normalized)
+    all_cols = input_cols + ['weather_code'] if has_weather_code else input_cols
+
+    mean = train_stats.mean
+    std = train_stats.std()
+    std[std == 0] = 1.0
+
     stats = {
-        'mean': mean, 
-        'std': std, 
+        'mean': mean,
+        'std': std,
         'input_cols': input_cols,  # Columns that are normalized
         'all_cols': all_cols,       # All columns including weather_code
         'exclude_from_norm': ['weather_code']  # Columns not normalized
     }
-    np.save(os.path.join(root_dir, 'data/processed/statistics.npy'), stats)
-    
-    print(f"Split Tamamlandı: Train={len(train_df)}, Val={len(val_df)}, Test={len(test_df)}")
+    np.save(STATS_PATH, stats)
+    save_stream_stats(history_stats, input_cols)
+
+    print(f"Split Tamamlandı: Train={train_end}, Val={val_end - train_end}, Test={total_len - val_end}")
     print(f"Normalize edilen sütunlar: {len(input_cols)}")
     print(f"Normalize edilmeyen: weather_code")
-    return train_df, val_df, test_df
+    return stats
 
 if __name__ == "__main__":
     preprocess_and_split()
-
@@ -0,0 +1,154 @@
+"""
+Non-blocking checkpoint writing.
+
+save() snapshots every tensor to CPU memory on the calling thread (a copy,
+so later optimizer steps cannot change what gets written) and hands the
+snapshot to a background thread, which writes it to a temporary file and
+atomically renames it into place. Readers never see a partial checkpoint.
+
+Checkpoints saved with a history name are also rotated: they are written to
+history_dir/<name>, the last keep_last of them are kept, and the requested
+path is hard-linked to the newest one. Checkpoints already in history_dir
+(from earlier runs) count towards keep_last, oldest first by modification
+time, so they are rotated out too.
+"""
+
+import atexit
+import os
+import queue
+import shutil
+import threading
+from collections import deque
+from typing import Optional
+
+import torch
+
+
+def snapshot(obj):
+    """Copy of a (nested) checkpoint with every tensor cloned to CPU."""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return {key: snapshot(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot(value) for value in obj)
+    return obj
+
+
+def _replace_with_link(src: str, dst: str):
+    """Atomically point dst at src's contents (hard link, copy if unsupported)."""
+    tmp_path = f"{dst}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+class AsyncCheckpointWriter:
+    """
+    Writes checkpoints from a background thread.
+
+    Args:
+        history_dir: Directory for rotated checkpoints (see save's history_name)
+        keep_last: Rotated checkpoints to keep (0 = no history, write path directly)
+        background: Write from a background thread; False writes inline (same
+            atomic write and rotation, useful for debugging)
+
+    Errors raised while writing are re-raised by the next save(), flush() or close().
+    """
+
+    def __init__(self, history_dir: Optional[str] = None, keep_last: int = 3, background: bool = True):
+        self.history_dir = history_dir
+        self.keep_last = keep_last
+        self.background = background
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._error = None
+        self._history = deque(self._existing_history())
+        atexit.register(self.close)
+
+    def save(self, checkpoint: dict, path: str, history_name: Optional[str] = None):
+        """
+        Queue a checkpoint for writing. Returns once it has been copied to CPU.
+
+        Args:
+            checkpoint: Checkpoint dict (state_dicts, metadata)
+            path: Destination path
+            history_name: File name in history_dir; if given (and keep_last > 0)
+                the checkpoint is rotated and path links to it
+        """
+        self._raise_error()
+        job = (snapshot(checkpoint), path, history_name)
+        if not self.background:
+            self._write(*job)
+            return
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+            self._thread.start()
+        self._queue.put(job)
+
+    def flush(self):
+        """Block until every queued checkpoint is on disk."""
+        if self._thread is not None:
+            self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Flush and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self._raise_error()
+
+    def _existing_history(self):
+        """Checkpoints left in history_dir by earlier runs, oldest first."""
+        if self.history_dir is None or not os.path.isdir(self.history_dir):
+            return []
+        paths = [
+            os.path.join(self.history_dir, name) for name in os.listdir(self.history_dir)
+            if name.endswith('.pt') and os.path.isfile(os.path.join(self.history_dir, name))
+        ]
+        return sorted(paths, key=os.path.getmtime)
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Checkpoint write failed") from error
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._write(*job)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, checkpoint: dict, path: str, history_name: Optional[str]):
+        rotate = history_name is not None and self.history_dir is not None and self.keep_last > 0
+        target = os.path.join(self.history_dir, history_name) if rotate else path
+
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        tmp_path = f"{target}.tmp"
+        torch.save(checkpoint, tmp_path)
+        os.replace(tmp_path, target)
+
+        if rotate:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            _replace_with_link(target, path)
+            if target in self._history:
+                self._history.remove(target)
+            self._history.append(target)
+            while len(self._history) > self.keep_last:
+                old_path = self._history.popleft()
+                if os.path.exists(old_path):
+                    os.remove(old_path)
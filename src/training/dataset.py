@@ -4,60 +4,83 @@ Supports chronological train/val/test splitting.
 """
 
 import torch
-from torch.utils.data import Dataset
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler, Sampler, SequentialSampler
 import os
-import pandas as pd
+import sys
+import warnings
+import pathlib
 import numpy as np
-from typing import Literal
+from typing import Literal, Optional
 
+root_dir = pathlib.Path(__file__).parent.parent.parent
+sys.path.append(str(root_dir))
 
-class WeatherDataset(Dataset):
+from src.utils.feature_cache import cache_key, load_or_build_features
+from src.utils.preprocessing import FeatureEngine
+from src.utils.weather_store import load_weather_frame
+
+
+def build_feature_matrix(file_path: str, stats: dict) -> tuple:
     """
-    Weather dataset for ExcelFormer training.
+    Load the raw archive and build the normalized feature matrix.
+    
+    Args:
+        file_path: Path to raw CSV data or a weather store directory
+        stats: Statistics dict from statistics.npy
+        
+    Returns:
+        Tuple of (float32 array of shape (rows, features), column names).
+        Columns are the normalized input_cols followed by the raw weather_code.
+    """
+    df = load_weather_frame(file_path)
+    
+    # Time encodings + normalization in one pass (shared with serving)
+    engine = FeatureEngine(stats, weather_code='weather_code' in df.columns)
+    full_data = engine.transform(df, df['time'].to_numpy())
+    
+    return full_data, engine.columns
+
+
+class WeatherSplits:
+    """
+    Load-once manager for the chronological train/val/test splits.
+    
+    The raw data is parsed and normalized a single time into one buffer, and
+    every split handed out by dataset() is a view into that buffer.
     
     Args:
-        file_path: Path to raw CSV data
+        file_path: Path to raw CSV data or a weather store directory
         stats_path: Path to statistics.npy file
         seq_len: Input sequence length
         pred_len: Prediction length
         target_col: Target column name
-        mode: Dataset mode ('train', 'val', 'test')
         split_ratio: Dict with train/val/test ratios (default: 80/10/10)
+        cache_dir: Optional directory for the preprocessed feature cache
+        verbose: Print a line for every split handed out
     """
     
     def __init__(
-        self, 
-        file_path: str, 
-        stats_path: str, 
-        seq_len: int = 24, 
-        pred_len: int = 24, 
+        self,
+        file_path: str,
+        stats_path: str,
+        seq_len: int = 24,
+        pred_len: int = 24,
         target_col: str = 'temperature_2m',
-        mode: Literal['train', 'val', 'test'] = 'train',
-        split_ratio: dict = None
+        split_ratio: dict = None,
+        cache_dir: Optional[str] = None,
+        verbose: bool = True
     ):
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found at {file_path}")
         
         self.seq_len = seq_len
         self.pred_len = pred_len
-        self.mode = mode
+        self.verbose = verbose
         
         # Default split ratio (chronological)
         if split_ratio is None:
             split_ratio = {'train': 0.80, 'val': 0.10, 'test': 0.10}
         
-        # Load and preprocess data
-        df = pd.read_csv(file_path)
-        df['time'] = pd.to_datetime(df['time'])
-        
-        # Add time features
-        df['hour_sin'] = np.sin(2 * np.pi * df['time'].dt.hour / 24)
-        df['hour_cos'] = np.cos(2 * np.pi * df['time'].dt.hour / 24)
-        df['day_sin'] = np.sin(2 * np.pi * df['time'].dt.day / 365)
-        df['day_cos'] = np.cos(2 * np.pi * df['time'].dt.day / 365)
-        df['month_sin'] = np.sin(2 * np.pi * (df['time'].dt.month - 1) / 12)
-        df['month_cos'] = np.cos(2 * np.pi * (df['time'].dt.month - 1) / 12)
-        
         # Load statistics (computed from training data only)
         stats = np.load(stats_path, allow_pickle=True).item()
         self.mean = stats['mean']
@@ -68,8 +91,16 @@ class WeatherDataset(Dataset):
         self.stats = stats
         self.input_cols = input_cols
         
-        # Get target column index before any processing
-        all_cols_list = list(input_cols) + (['weather_code'] if 'weather_code' in df.columns else [])
+        # Load and preprocess data (from the on-disk cache when enabled)
+        if cache_dir is not None:
+            key = cache_key(file_path, stats_path, {'input_cols': list(input_cols)})
+            full_data, all_cols_list = load_or_build_features(
+                cache_dir, key, lambda: build_feature_matrix(file_path, stats)
+            )
+        else:
+            full_data, all_cols_list = build_feature_matrix(file_path, stats)
+        
+        # Get target column index
         try:
             self.target_idx = all_cols_list.index(target_col)
         except ValueError:
@@ -84,49 +115,135 @@ class WeatherDataset(Dataset):
             self.target_mean = 0.0
             self.target_std = 1.0
         
-        # Handle weather_code separately (not normalized)
-        has_weather_code = 'weather_code' in df.columns
-        weather_code_data = None
-        if has_weather_code:
-            weather_code_data = df['weather_code'].values
-        
-        # Normalize continuous features
-        df_norm = df[input_cols].copy()
-        normalized_values = (df_norm.values - self.mean) / self.std
-        
-        # Combine normalized features with weather_code
-        if has_weather_code:
-            full_data = np.column_stack([normalized_values, weather_code_data])
-        else:
-            full_data = normalized_values
+        # Single shared buffer. A cached matrix stays memory-mapped (read-only),
+        # so pages are loaded lazily and shared through the page cache.
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='The given NumPy array is not writable')
+            self.data = torch.from_numpy(full_data)
         
         # Chronological split (NO random shuffling for time-series!)
         total_len = len(full_data)
         train_end = int(total_len * split_ratio['train'])
         val_end = train_end + int(total_len * split_ratio['val'])
-        
-        if mode == 'train':
-            data_slice = full_data[:train_end]
-        elif mode == 'val':
-            data_slice = full_data[train_end:val_end]
-        elif mode == 'test':
-            data_slice = full_data[val_end:]
-        else:
+        self.bounds = {
+            'train': (0, train_end),
+            'val': (train_end, val_end),
+            'test': (val_end, total_len),
+        }
+    
+    def dataset(self, mode: Literal['train', 'val', 'test']) -> 'WeatherDataset':
+        """Return the dataset for one split, backed by a view of the shared buffer."""
+        return WeatherDataset.from_splits(self, mode)
+
+
+class WeatherDataset(Dataset):
+    """
+    Weather dataset for ExcelFormer training.
+    
+    Args:
+        file_path: Path to raw CSV data or a weather store directory
+        stats_path: Path to statistics.npy file
+        seq_len: Input sequence length
+        pred_len: Prediction length
+        target_col: Target column name
+        mode: Dataset mode ('train', 'val', 'test')
+        split_ratio: Dict with train/val/test ratios (default: 80/10/10)
+        cache_dir: Optional directory for the preprocessed feature cache
+    
+    Note:
+        To build several splits from one load, use WeatherSplits.dataset().
+    """
+    
+    def __init__(
+        self, 
+        file_path: str, 
+        stats_path: str, 
+        seq_len: int = 24, 
+        pred_len: int = 24, 
+        target_col: str = 'temperature_2m',
+        mode: Literal['train', 'val', 'test'] = 'train',
+        split_ratio: dict = None,
+        cache_dir: Optional[str] = None
+    ):
+        splits = WeatherSplits(
+            file_path, stats_path, seq_len, pred_len, target_col, split_ratio, cache_dir
+        )
+        self._init_from_splits(splits, mode)
+    
+    @classmethod
+    def from_splits(cls, splits: WeatherSplits, mode: Literal['train', 'val', 'test']) -> 'WeatherDataset':
+        """Create a dataset for one split without reloading the data."""
+        dataset = cls.__new__(cls)
+        dataset._init_from_splits(splits, mode)
+        return dataset
+    
+    def _init_from_splits(self, splits: WeatherSplits, mode: str):
+        if mode not in splits.bounds:
             raise ValueError(f"Invalid mode: {mode}. Must be 'train', 'val', or 'test'")
         
-        self.data = torch.tensor(data_slice, dtype=torch.float32)
+        self.seq_len = splits.seq_len
+        self.pred_len = splits.pred_len
+        self.mode = mode
+        self.mean = splits.mean
+        self.std = splits.std
+        self.stats = splits.stats
+        self.input_cols = splits.input_cols
+        self.target_idx = splits.target_idx
+        self.target_mean = splits.target_mean
+        self.target_std = splits.target_std
+        
+        start, end = splits.bounds[mode]
+        self.data = splits.data[start:end]
+        self._build_windows()
+        
+        if splits.verbose:
+            print(f"[{mode.upper()}] Loaded {len(self.data)} samples (indices {start} - {end})")
+
+    def _build_windows(self):
+        """
+        Build zero-copy sliding-window views over the contiguous series.
+        
+        x_windows[i] is data[i : i + seq_len] and y_windows[i] is the target
+        column of data[i + seq_len : i + seq_len + pred_len]. Both are strided
+        views, so no window is materialized until it is indexed.
+        """
+        num_windows = len(self)
+        num_features = self.data.shape[1]
+        
+        # Strided view of the target column, no copy
+        self.target_series = self.data[:, self.target_idx]
+        
+        if num_windows == 0:
+            self.x_windows = self.data.new_empty((0, self.seq_len, num_features))
+            self.y_windows = self.data.new_empty((0, self.pred_len))
+            return
         
-        print(f"[{mode.upper()}] Loaded {len(self.data)} samples "
-              f"(indices {train_end if mode == 'val' else (val_end if mode == 'test' else 0)} - "
-              f"{val_end if mode == 'val' else (total_len if mode == 'test' else train_end)})")
+        # (num_windows, seq_len, num_features), overlapping rows share storage
+        self.x_windows = self.data.unfold(0, self.seq_len, 1).transpose(1, 2)[:num_windows]
+        # (num_windows, pred_len)
+        self.y_windows = self.target_series[self.seq_len:].unfold(0, self.pred_len, 1)
 
     def __len__(self):
         return max(0, len(self.data) - self.seq_len - self.pred_len + 1)
 
     def __getitem__(self, idx):
-        x = self.data[idx : idx + self.seq_len]
-        y = self.data[idx + self.seq_len : idx + self.seq_len + self.pred_len, self.target_idx]
-        return x, y
+        """One window, or a stacked batch if idx is a sequence of indices."""
+        if _is_batch_index(idx):
+            return self.get_batch(idx)
+        return self.x_windows[idx], self.y_windows[idx]
+    
+    def get_batch(self, indices) -> tuple:
+        """
+        Gather a whole batch of windows with one vectorized index.
+        
+        Args:
+            indices: Sequence or 1-D tensor of window start indices
+            
+        Returns:
+            Tuple of x (batch, seq_len, features) and y (batch, pred_len)
+        """
+        indices = torch.as_tensor(indices, dtype=torch.long)
+        return self.x_windows[indices], self.y_windows[indices]
     
     def inverse_transform_target(self, normalized_values: torch.Tensor) -> torch.Tensor:
         """
@@ -139,3 +256,97 @@ class WeatherDataset(Dataset):
             Values in original scale (Celsius)
         """
         return normalized_values * self.target_std + self.target_mean
+
+
+class MultiLocationDataset(Dataset):
+    """
+    Windows from several locations behind one index space.
+    
+    Each location keeps its own (memory-mapped) series and window views; global
+    indices are mapped to (location, local index) so windows never cross a
+    location boundary and nothing is concatenated.
+    
+    Args:
+        datasets: Per-location WeatherDataset instances for the same split,
+            sharing seq_len, pred_len and statistics
+    """
+    
+    def __init__(self, datasets: list):
+        if not datasets:
+            raise ValueError("MultiLocationDataset needs at least one dataset")
+        
+        self.datasets = datasets
+        self.seq_len = datasets[0].seq_len
+        self.pred_len = datasets[0].pred_len
+        self.mode = datasets[0].mode
+        self.target_mean = datasets[0].target_mean
+        self.target_std = datasets[0].target_std
+        
+        lengths = torch.tensor([len(d) for d in datasets])
+        self.offsets = torch.cat([torch.zeros(1, dtype=torch.long), torch.cumsum(lengths, 0)])
+    
+    def __len__(self):
+        return int(self.offsets[-1])
+    
+    def _locate(self, indices: torch.Tensor) -> torch.Tensor:
+        return torch.searchsorted(self.offsets[1:], indices, right=True)
+    
+    def __getitem__(self, idx):
+        """One window, or a stacked batch if idx is a sequence of indices."""
+        if _is_batch_index(idx):
+            return self.get_batch(idx)
+        loc = int(self._locate(torch.tensor(idx)))
+        return self.datasets[loc][idx - int(self.offsets[loc])]
+    
+    def get_batch(self, indices) -> tuple:
+        """Gather a batch whose windows may come from different locations."""
+        indices = torch.as_tensor(indices, dtype=torch.long)
+        locations = self._locate(indices)
+        
+        first = self.datasets[0]
+        x = first.data.new_empty((len(indices), self.seq_len, first.data.shape[1]))
+        y = first.data.new_empty((len(indices), self.pred_len))
+        
+        # One vectorized gather per location present in the batch
+        for loc in torch.unique(locations).tolist():
+            mask = locations == loc
+            x[mask], y[mask] = self.datasets[loc].get_batch(indices[mask] - self.offsets[loc])
+        return x, y
+    
+    def inverse_transform_target(self, normalized_values: torch.Tensor) -> torch.Tensor:
+        """Convert normalized target values back to original scale (Celsius)."""
+        return normalized_values * self.target_std + self.target_mean
+
+
+def _is_batch_index(idx) -> bool:
+    return isinstance(idx, (list, tuple)) or (isinstance(idx, torch.Tensor) and idx.dim() > 0)
+
+
+def create_batch_loader(
+    dataset: Dataset,
+    batch_size: int,
+    shuffle: bool = False,
+    sampler: Optional[Sampler] = None,
+    drop_last: bool = False,
+    **kwargs
+) -> DataLoader:
+    """
+    DataLoader that gathers every batch with one vectorized get_batch call.
+    
+    Batches of indices come from a BatchSampler and automatic batching is
+    off (batch_size=None), so each list of indices goes straight to
+    dataset[indices] instead of through per-window __getitem__ + collate.
+    A plain DataLoader(dataset, batch_size=N) works too, just slower.
+    
+    Args:
+        dataset: WeatherDataset or MultiLocationDataset
+        batch_size: Windows per batch
+        shuffle: Random order (ignored if sampler is given)
+        sampler: Optional index sampler, e.g. a ChronologicalDistributedSampler;
+            available as loader.sampler.sampler
+        drop_last: Drop the last incomplete batch
+        **kwargs: Passed to DataLoader (num_workers, pin_memory, ...)
+    """
+    if sampler is None:
+        sampler = RandomSampler(dataset) if shuffle else SequentialSampler(dataset)
+    return DataLoader(dataset, batch_size=None, sampler=BatchSampler(sampler, batch_size, drop_last), **kwargs)
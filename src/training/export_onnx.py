@@ -12,8 +12,12 @@ import sys
 # Proje kök dizinini ekle
 ROOT_DIR = pathlib.Path(__file__).parent.parent.parent
 sys.path.insert(0, str(pathlib.Path(__file__).parent))
+sys.path.append(str(ROOT_DIR))
 
 from model import ExcelFormer
+from dataset import WeatherSplits
+from onnx_variants import build_variants, evaluate_variants, print_report, save_report
+from src.utils.locations import location_paths
 
 CONFIG_PATH = os.path.join(ROOT_DIR, 'config.yaml')
 
@@ -24,7 +28,7 @@ def load_config():
         return yaml.safe_load(f)
 
 
-def export_to_onnx(checkpoint_path: str, onnx_path: str, config: dict):
+def export_to_onnx(checkpoint_path: str, onnx_path: str, config: dict, fold_head: bool = True):
     """
     Export a trained PyTorch model to ONNX format.
     
@@ -32,6 +36,7 @@ def export_to_onnx(checkpoint_path: str, onnx_path: str, config: dict):
         checkpoint_path: Path to PyTorch checkpoint (.pt)
         onnx_path: Output path for ONNX model (.onnx)
         config: Configuration dict
+        fold_head: Export the folded output head (checked against the training graph)
     """
     device = torch.device("cpu")  # Export için CPU yeterli ve güvenli
     
@@ -62,7 +67,8 @@ def export_to_onnx(checkpoint_path: str, onnx_path: str, config: dict):
     # Load weights
     checkpoint = torch.load(checkpoint_path, map_location=device)
     model.load_state_dict(checkpoint['model_state_dict'])
-    model.eval()
+    # Explicit attention so the optimized variant gets fused Attention nodes
+    model.eval().use_explicit_attention()
     print(f"✓ Model loaded from {checkpoint_path}")
     
     # Dummy Input: (batch_size, seq_len, num_continuous_features + 1)
@@ -70,6 +76,12 @@ def export_to_onnx(checkpoint_path: str, onnx_path: str, config: dict):
     total_input_cols = num_continuous_features + 1
     dummy_input = torch.randn(1, training_config['seq_len'], total_input_cols)
     
+    if fold_head:
+        check_input = torch.randn(8, training_config['seq_len'], total_input_cols)
+        check_input[..., -1] = torch.randint(0, model_config['num_weather_codes'], check_input.shape[:2])
+        model.fold_head(check_input)
+        print("✓ Çıkış katmanı birleştirildi (folded head)")
+    
     # Export to ONNX
     torch.onnx.export(
         model,
@@ -88,6 +100,49 @@ def export_to_onnx(checkpoint_path: str, onnx_path: str, config: dict):
     print(f"✓ ONNX export başarılı: {onnx_path}")
 
 
+def load_test_split(config: dict):
+    """Test split of the primary location, or None if its data is not available."""
+    store_path, file_path = (os.path.join(ROOT_DIR, p) for p in location_paths(config))
+    data_path = store_path if os.path.isdir(store_path) else file_path
+    stats_path = os.path.join(ROOT_DIR, 'data/processed/statistics.npy')
+    if not os.path.exists(data_path):
+        return None
+    
+    cache_dir = config['data'].get('cache_dir')
+    if cache_dir is not None:
+        cache_dir = os.path.join(ROOT_DIR, cache_dir)
+    
+    training_config = config['training']
+    splits = WeatherSplits(
+        file_path=data_path,
+        stats_path=stats_path,
+        seq_len=training_config['seq_len'],
+        pred_len=training_config['pred_len'],
+        target_col=config['features']['target'],
+        split_ratio=training_config['split_ratio'],
+        cache_dir=cache_dir,
+    )
+    return splits.dataset('test')
+
+
+def export_variants(onnx_path: str, config: dict, test_dataset=None):
+    """
+    Build the optimized/int8 variants of an export and write the comparison
+    report (models/onnx_report.json) when a test split is available.
+    """
+    variants = build_variants(onnx_path, config)
+    if test_dataset is None:
+        print("⚠ Test verisi bulunamadı, doğruluk raporu atlanıyor...")
+        return variants, None
+    
+    report = evaluate_variants(variants, test_dataset)
+    print_report(report)
+    report_path = os.path.join(os.path.dirname(onnx_path), 'onnx_report.json')
+    save_report(report, report_path)
+    print(f"✓ Rapor kaydedildi: {report_path}")
+    return variants, report
+
+
 def main():
     """Export best_model and final_model to ONNX."""
     config = load_config()
@@ -100,6 +155,8 @@ def main():
     
     if os.path.exists(best_pt):
         export_to_onnx(best_pt, best_onnx, config)
+        # Optimized / int8 variants of the served model
+        export_variants(best_onnx, config, load_test_split(config))
     else:
         print(f"⚠ {best_pt} bulunamadı, atlanıyor...")
     
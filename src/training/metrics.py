@@ -0,0 +1,121 @@
+"""
+Streaming forecast metrics.
+
+Errors are accumulated as running sums on the training device, so memory
+does not grow with the dataset and nothing is copied to the host until
+compute() is called (once per epoch or logging interval). Under
+torch.distributed the sums are all-reduced there, so every rank gets the
+metrics over all ranks' batches. Every rank must call compute(), including
+ranks that added no batches.
+"""
+
+from typing import Dict
+
+import torch
+import torch.distributed as dist
+
+
+class MetricAccumulator:
+    """
+    Running MAE / RMSE over (batch, pred_len) predictions.
+
+    Sums are kept per horizon step in the normalized scale. Celsius metrics
+    follow from them: the error in °C is target_std times the normalized
+    error (the target mean cancels out).
+
+    Args:
+        target_std: Std of target for inverse transform
+        device: Device the batches live on
+    """
+
+    def __init__(self, target_std: float = 1.0, device: torch.device = None):
+        self.target_std = float(target_std)
+        self.device = torch.device('cpu') if device is None else torch.device(device)
+        # MPS has no float64
+        self.dtype = torch.float32 if self.device.type == 'mps' else torch.float64
+        self.reset()
+
+    def reset(self):
+        self.abs_error = None  # (pred_len,)
+        self.squared_error = None  # (pred_len,)
+        self.loss_sum = torch.zeros((), dtype=self.dtype, device=self.device)
+        self.num_samples = 0
+        self.num_batches = 0
+
+    @torch.no_grad()
+    def update(self, preds: torch.Tensor, targets: torch.Tensor, loss: torch.Tensor = None):
+        """
+        Add a batch. Does not synchronize with the device.
+
+        Args:
+            preds: Predictions (batch, pred_len), normalized
+            targets: Ground truth (batch, pred_len), normalized
+            loss: Optional batch loss (averaged over batches in compute())
+        """
+        error = (preds.detach() - targets).to(self.dtype)
+        abs_error = error.abs().sum(dim=0)
+        squared_error = error.square().sum(dim=0)
+        if self.abs_error is None:
+            self.abs_error, self.squared_error = abs_error, squared_error
+        else:
+            self.abs_error += abs_error
+            self.squared_error += squared_error
+
+        if loss is not None:
+            self.loss_sum += loss.detach().to(self.dtype)
+        self.num_samples += preds.shape[0]
+        self.num_batches += 1
+
+    def compute(self, per_horizon: bool = False) -> Dict[str, float]:
+        """
+        Metrics over everything added since the last reset().
+
+        Args:
+            per_horizon: Also return MAE/RMSE in °C for every forecast step
+
+        Returns:
+            Dict with loss, mae, rmse (normalized), mae_celsius, rmse_celsius and
+            num_samples, plus mae_celsius_by_step / rmse_celsius_by_step lists if per_horizon
+        """
+        distributed = dist.is_available() and dist.is_initialized()
+        pred_len = 0 if self.abs_error is None else self.abs_error.numel()
+        if distributed:
+            # A rank with an empty shard still has to join the all-reduces
+            # below; it contributes zero sums of the other ranks' length
+            pred_len_tensor = torch.tensor(pred_len, device=self.device)
+            dist.all_reduce(pred_len_tensor, op=dist.ReduceOp.MAX)
+            pred_len = int(pred_len_tensor.item())
+
+        if self.abs_error is None:
+            sums = torch.zeros(2, pred_len, dtype=self.dtype, device=self.device)
+        else:
+            sums = torch.stack([self.abs_error, self.squared_error])
+        counts = torch.stack([
+            self.loss_sum,
+            self.loss_sum.new_tensor(self.num_samples),
+            self.loss_sum.new_tensor(self.num_batches),
+        ])
+        if distributed:
+            dist.all_reduce(sums)
+            dist.all_reduce(counts)
+
+        abs_error, squared_error = sums.cpu().unbind(0)
+        loss_sum, num_samples, num_batches = counts.tolist()
+        if num_batches == 0:
+            raise ValueError("No batches were added")
+        num_values = num_samples * abs_error.numel()
+
+        mae = abs_error.sum().item() / num_values
+        rmse = (squared_error.sum().item() / num_values) ** 0.5
+        metrics = {
+            'loss': loss_sum / num_batches,
+            'mae': mae,
+            'rmse': rmse,
+            'mae_celsius': mae * self.target_std,
+            'rmse_celsius': rmse * self.target_std,
+            'num_samples': int(num_samples),
+        }
+        if per_horizon:
+            metrics['mae_celsius_by_step'] = (abs_error / num_samples * self.target_std).tolist()
+            metrics['rmse_celsius_by_step'] = ((squared_error / num_samples).sqrt() * self.target_std).tolist()
+        return metrics
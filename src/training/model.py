@@ -41,7 +41,19 @@ class PositionalEncoding(nn.Module):
 
 
 class ExcelFormerAttention(nn.Module):
-    """Multi-head self-attention module for ExcelFormer."""
+    """
+    Multi-head self-attention module for ExcelFormer.
+    
+    Q, K and V come from one packed projection and attention runs through
+    F.scaled_dot_product_attention, which uses a fused kernel where one is
+    available. Checkpoints with the older separate q_proj/k_proj/v_proj
+    weights are packed on load.
+    
+    With explicit=True (set by ExcelFormer.use_explicit_attention for ONNX
+    export) Q, K and V are projected separately and attention is spelled out
+    as matmul/softmax, the pattern onnxruntime's transformer optimizer fuses
+    into its Attention op. Both paths compute the same function.
+    """
     
     def __init__(self, d_model: int, n_heads: int, dropout: float = 0.1):
         super().__init__()
@@ -51,39 +63,67 @@ class ExcelFormerAttention(nn.Module):
         self.n_heads = n_heads
         self.head_dim = d_model // n_heads
         
-        self.q_proj = nn.Linear(d_model, d_model)
-        self.k_proj = nn.Linear(d_model, d_model)
-        self.v_proj = nn.Linear(d_model, d_model)
+        # Rows are [q; k; v]
+        self.qkv_proj = nn.Linear(d_model, 3 * d_model)
         self.out_proj = nn.Linear(d_model, d_model)
         
         self.dropout = nn.Dropout(dropout)
-        self.scale = math.sqrt(self.head_dim)
+        self.explicit = False
+        
+        self.register_load_state_dict_pre_hook(self._pack_qkv)
     
-    def forward(self, x: torch.Tensor, mask: torch.Tensor = None) -> torch.Tensor:
+    @staticmethod
+    def _pack_qkv(module, state_dict, prefix, *args):
+        """Map q_proj/k_proj/v_proj checkpoint keys onto qkv_proj."""
+        for param in ('weight', 'bias'):
+            keys = [f"{prefix}{name}_proj.{param}" for name in ('q', 'k', 'v')]
+            if all(key in state_dict for key in keys):
+                state_dict[f"{prefix}qkv_proj.{param}"] = torch.cat([state_dict.pop(key) for key in keys])
+    
+    def forward(self, x: torch.Tensor, mask: torch.Tensor = None, qkv: torch.Tensor = None) -> torch.Tensor:
         """
         Args:
             x: Input tensor of shape (batch_size, seq_len, d_model)
-            mask: Optional attention mask
+            mask: Optional attention mask (0 = masked out)
+            qkv: Optional precomputed qkv_proj(x) of shape (batch_size, seq_len, 3 * d_model)
         Returns:
             Output tensor of shape (batch_size, seq_len, d_model)
         """
         batch_size, seq_len, _ = x.shape
+        if self.explicit and qkv is None:
+            return self._explicit_forward(x, mask)
+        if qkv is None:
+            qkv = self.qkv_proj(x)
+        
+        # Split into Q, K, V: (3, batch, heads, seq, head_dim)
+        qkv = qkv.view(batch_size, seq_len, 3, self.n_heads, self.head_dim).permute(2, 0, 3, 1, 4)
+        q, k, v = qkv.unbind(0)
+        
+        attn_mask = None if mask is None else mask != 0
+        attn_output = F.scaled_dot_product_attention(
+            q, k, v,
+            attn_mask=attn_mask,
+            dropout_p=self.dropout.p if self.training else 0.0
+        )
+        attn_output = attn_output.transpose(1, 2).reshape(batch_size, seq_len, self.d_model)
         
-        # Project to Q, K, V
-        q = self.q_proj(x).view(batch_size, seq_len, self.n_heads, self.head_dim).transpose(1, 2)
-        k = self.k_proj(x).view(batch_size, seq_len, self.n_heads, self.head_dim).transpose(1, 2)
-        v = self.v_proj(x).view(batch_size, seq_len, self.n_heads, self.head_dim).transpose(1, 2)
-        
-        # Compute attention scores
-        attn_scores = torch.matmul(q, k.transpose(-2, -1)) / self.scale
+        return self.out_proj(attn_output)
+    
+    def _explicit_forward(self, x: torch.Tensor, mask: torch.Tensor = None) -> torch.Tensor:
+        """Separate Q/K/V projections and matmul/softmax attention (ONNX export path)."""
+        batch_size, seq_len, _ = x.shape
+        weights = self.qkv_proj.weight.chunk(3)
+        biases = self.qkv_proj.bias.chunk(3)
+        q, k, v = (
+            F.linear(x, weight, bias).view(batch_size, seq_len, self.n_heads, self.head_dim).transpose(1, 2)
+            for weight, bias in zip(weights, biases)
+        )
         
+        attn_scores = torch.matmul(q, k.transpose(-2, -1)) / math.sqrt(self.head_dim)
         if mask is not None:
             attn_scores = attn_scores.masked_fill(mask == 0, float('-inf'))
+        attn_weights = self.dropout(F.softmax(attn_scores, dim=-1))
         
-        attn_weights = F.softmax(attn_scores, dim=-1)
-        attn_weights = self.dropout(attn_weights)
-        
-        # Apply attention to values
         attn_output = torch.matmul(attn_weights, v)
         attn_output = attn_output.transpose(1, 2).contiguous().view(batch_size, seq_len, self.d_model)
         
@@ -110,16 +150,17 @@ class ExcelFormerBlock(nn.Module):
         
         self.dropout = nn.Dropout(dropout)
     
-    def forward(self, x: torch.Tensor, mask: torch.Tensor = None) -> torch.Tensor:
+    def forward(self, x: torch.Tensor, mask: torch.Tensor = None, qkv: torch.Tensor = None) -> torch.Tensor:
         """
         Args:
             x: Input tensor of shape (batch_size, seq_len, d_model)
             mask: Optional attention mask
+            qkv: Optional precomputed attention projection (see ExcelFormerAttention)
         Returns:
             Output tensor of shape (batch_size, seq_len, d_model)
         """
         # Self-attention with residual connection
-        attn_output = self.attention(x, mask)
+        attn_output = self.attention(x, mask, qkv)
         x = self.norm1(x + self.dropout(attn_output))
         
         # Feed-forward with residual connection
@@ -129,6 +170,49 @@ class ExcelFormerBlock(nn.Module):
         return x
 
 
+class FoldedOutputHead(nn.Module):
+    """
+    Inference-only replacement for output_norm -> output_projection -> temporal_projection.
+    
+    All three layers are affine after normalization, so the LayerNorm scale
+    and shift, the d_model->1 projection and both biases are folded into a
+    feature vector and a (pred_len, seq_len) map:
+    
+        y = temporal_weight @ (normalize(h) @ feature_weight) + bias
+    
+    which runs as two matmuls with no transposes. Built by ExcelFormer.fold_head().
+    """
+    
+    def __init__(self, output_norm: nn.LayerNorm, output_projection: nn.Linear, temporal_projection: nn.Linear):
+        super().__init__()
+        self.normalized_shape = output_norm.normalized_shape
+        self.eps = output_norm.eps
+        
+        with torch.no_grad():
+            w = output_projection.weight[0]  # (d_model,)
+            gamma = output_norm.weight if output_norm.weight is not None else torch.ones_like(w)
+            beta = output_norm.bias if output_norm.bias is not None else torch.zeros_like(w)
+            t = temporal_projection.weight  # (pred_len, seq_len)
+            
+            # Per-position scalar before the temporal projection: normalize(h) @ (w * gamma) + (w @ beta + c)
+            position_bias = w @ beta + output_projection.bias[0]
+            
+            self.register_buffer('feature_weight', (w * gamma).clone())
+            self.register_buffer('temporal_weight', t.clone())
+            self.register_buffer('bias', temporal_projection.bias + position_bias * t.sum(dim=1))
+    
+    def forward(self, h: torch.Tensor) -> torch.Tensor:
+        """
+        Args:
+            h: Encoder output of shape (batch_size, seq_len, d_model)
+        Returns:
+            Predictions of shape (batch_size, pred_len, 1)
+        """
+        z = F.layer_norm(h, self.normalized_shape, eps=self.eps)
+        z = torch.matmul(z, self.feature_weight)  # (batch_size, seq_len)
+        return F.linear(z, self.temporal_weight, self.bias).unsqueeze(-1)
+
+
 class ExcelFormer(nn.Module):
     """
     ExcelFormer: Transformer-based model for time-series forecasting.
@@ -205,6 +289,9 @@ class ExcelFormer(nn.Module):
         # Temporal projection to convert seq_len -> pred_len
         self.temporal_projection = nn.Linear(seq_len, pred_len)
         
+        # Set by fold_head() for inference/export
+        self.folded_head = None
+        
         self._init_weights()
     
     def _init_weights(self):
@@ -212,6 +299,13 @@ class ExcelFormer(nn.Module):
         for p in self.parameters():
             if p.dim() > 1:
                 nn.init.xavier_uniform_(p)
+        # qkv_proj packs three d_model x d_model projections; initialize each
+        # like a separate Linear (the packed shape would give the wrong fan_out)
+        for module in self.modules():
+            if isinstance(module, ExcelFormerAttention):
+                with torch.no_grad():
+                    for weight in module.qkv_proj.weight.chunk(3):
+                        nn.init.xavier_uniform_(weight)
     
     def forward(self, x: torch.Tensor, mask: torch.Tensor = None) -> torch.Tensor:
         """
@@ -225,12 +319,32 @@ class ExcelFormer(nn.Module):
         Returns:
             Predictions of shape (batch_size, pred_len, 1)
         """
-        batch_size = x.shape[0]
+        # Input embedding: -> (batch_size, seq_len, d_model)
+        x = self.embed_inputs(x)
+        
+        # Add positional encoding
+        x = self.pos_encoding(x)
+        
+        # Pass through encoder blocks
+        for block in self.encoder_blocks:
+            x = block(x, mask)
+        
+        return self.output_head(x)
+    
+    def embed_inputs(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Embed input rows independently of their position.
         
+        Args:
+            x: Input tensor of shape (..., num_continuous_features + 1)
+            
+        Returns:
+            Embeddings of shape (..., d_model)
+        """
         # Split continuous features and weather_code
         # weather_code is the last column
-        continuous_features = x[:, :, :-1]  # (batch, seq_len, num_continuous_features)
-        weather_codes = x[:, :, -1].long()   # (batch, seq_len) - integer indices
+        continuous_features = x[..., :-1]  # (batch, seq_len, num_continuous_features)
+        weather_codes = x[..., -1].long()   # (batch, seq_len) - integer indices
         
         # Get weather code embeddings
         weather_code_embed = self.weather_code_embedding(weather_codes)  # (batch, seq_len, embed_dim)
@@ -238,15 +352,14 @@ class ExcelFormer(nn.Module):
         # Concatenate continuous features with weather code embeddings
         combined = torch.cat([continuous_features, weather_code_embed], dim=-1)  # (batch, seq_len, total_input_dim)
         
-        # Input embedding: -> (batch_size, seq_len, d_model)
-        x = self.input_embedding(combined)
-        
-        # Add positional encoding
-        x = self.pos_encoding(x)
-        
-        # Pass through encoder blocks
-        for block in self.encoder_blocks:
-            x = block(x, mask)
+        return self.input_embedding(combined)
+    
+    def output_head(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Map encoder output (batch_size, seq_len, d_model) to predictions (batch_size, pred_len, 1).
+        """
+        if self.folded_head is not None:
+            return self.folded_head(x)
         
         # Output normalization
         x = self.output_norm(x)
@@ -262,6 +375,51 @@ class ExcelFormer(nn.Module):
         
         return x
     
+    @torch.no_grad()
+    def fold_head(self, check_input: torch.Tensor = None, atol: float = 1e-4) -> 'ExcelFormer':
+        """
+        Replace the output head with a FoldedOutputHead for inference.
+        
+        Args:
+            check_input: Optional input batch; if given, the folded output is
+                compared against the training graph on it
+            atol: Absolute tolerance for the check
+            
+        Returns:
+            self (in eval mode)
+            
+        Raises:
+            RuntimeError: If the folded head does not match the training graph
+        """
+        self.eval()
+        self.folded_head = None
+        reference = self(check_input) if check_input is not None else None
+        
+        self.folded_head = FoldedOutputHead(self.output_norm, self.output_projection, self.temporal_projection)
+        
+        if reference is not None:
+            max_diff = (self(check_input) - reference).abs().max().item()
+            if max_diff > atol:
+                self.folded_head = None
+                raise RuntimeError(f"Folded output head differs from the training graph by {max_diff:.2e}")
+        return self
+    
+    def use_explicit_attention(self, enabled: bool = True) -> 'ExcelFormer':
+        """
+        Switch every attention layer to the explicit matmul/softmax path.
+        
+        Used before ONNX export: scaled_dot_product_attention with the packed
+        projection exports to a graph onnxruntime's transformer optimizer
+        cannot fuse into Attention nodes.
+        
+        Returns:
+            self
+        """
+        for module in self.modules():
+            if isinstance(module, ExcelFormerAttention):
+                module.explicit = enabled
+        return self
+    
     def get_num_params(self) -> int:
         """Returns the total number of parameters in the model."""
         return sum(p.numel() for p in self.parameters())
@@ -0,0 +1,164 @@
+"""
+Optimized and quantized variants of the exported ONNX model.
+
+Given the fp32 export (best_model.onnx), builds:
+- <name>_optimized.onnx: onnxruntime transformer optimizer output with
+  Attention, SkipLayerNormalization and BiasGelu fused offline (Attention
+  needs the explicit attention export, see ExcelFormer.use_explicit_attention;
+  the first encoder block is not fused)
+- <name>_int8.onnx: dynamic int8 quantization of the optimized graph
+
+and reports accuracy (MAE in °C against the test targets and against the
+fp32 model) and latency for each variant.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import onnxruntime as ort
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from onnxruntime.transformers import optimizer
+
+
+def variant_paths(onnx_path: str) -> dict:
+    """Output paths of all variants, keyed by variant name."""
+    stem, ext = os.path.splitext(onnx_path)
+    return {
+        'fp32': onnx_path,
+        'optimized': f"{stem}_optimized{ext}",
+        'int8': f"{stem}_int8{ext}",
+    }
+
+
+def optimize_onnx(onnx_path: str, optimized_path: str, config: dict):
+    """
+    Fuse attention, LayerNorm and GELU subgraphs offline.
+
+    Args:
+        onnx_path: fp32 model exported by export_to_onnx
+        optimized_path: Output path (single file, no external data)
+        config: Configuration dict (model.n_heads, model.d_model)
+    """
+    model = optimizer.optimize_model(
+        onnx_path,
+        model_type='bert',
+        num_heads=config['model']['n_heads'],
+        hidden_size=config['model']['d_model'],
+        opt_level=1,
+    )
+    model.save_model_to_file(optimized_path, use_external_data_format=False)
+    return model.get_fused_operator_statistics()
+
+
+def quantize_onnx(onnx_path: str, quantized_path: str):
+    """Dynamic int8 quantization (int8 weights, activations quantized at runtime)."""
+    quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QInt8)
+
+
+def build_variants(onnx_path: str, config: dict) -> dict:
+    """
+    Build the optimized and int8 variants next to an fp32 export.
+
+    Returns:
+        Dict of variant name -> model path (including 'fp32')
+    """
+    paths = variant_paths(onnx_path)
+    fused = optimize_onnx(onnx_path, paths['optimized'], config)
+    print(f"  ✓ Optimized: {os.path.basename(paths['optimized'])} "
+          f"({', '.join(f'{op}={n}' for op, n in fused.items() if n)})")
+    quantize_onnx(paths['optimized'], paths['int8'])
+    print(f"  ✓ Quantized: {os.path.basename(paths['int8'])}")
+    return paths
+
+
+def _predict(session, inputs: np.ndarray) -> np.ndarray:
+    input_name = session.get_inputs()[0].name
+    try:
+        return session.run(None, {input_name: inputs})[0].reshape(len(inputs), -1)
+    except Exception:
+        # Models exported with a fixed batch dimension
+        return np.concatenate([
+            session.run(None, {input_name: inputs[i:i + 1]})[0].reshape(1, -1) for i in range(len(inputs))
+        ])
+
+
+def _latency_ms(session, inputs: np.ndarray, runs: int) -> float:
+    _predict(session, inputs)  # warmup
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _predict(session, inputs)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+def evaluate_variants(
+    variants: dict,
+    dataset,
+    max_samples: int = 2048,
+    batch_size: int = 64,
+    latency_runs: int = 50,
+) -> dict:
+    """
+    Compare variants on the test split.
+
+    Args:
+        variants: Dict of variant name -> model path ('fp32' is the reference)
+        dataset: Test dataset (WeatherDataset or MultiLocationDataset)
+        max_samples: Evenly spaced test windows to evaluate (None = all)
+        batch_size: Batch size for the accuracy pass
+        latency_runs: Timed runs per latency measurement
+
+    Returns:
+        Dict of variant name -> metrics (MAE in °C, median latency in ms)
+    """
+    num_samples = len(dataset) if max_samples is None else min(max_samples, len(dataset))
+    indices = torch.linspace(0, len(dataset) - 1, num_samples).long()
+    target_mean, target_std = float(dataset.target_mean), float(dataset.target_std)
+
+    sessions = {name: ort.InferenceSession(path, providers=['CPUExecutionProvider']) for name, path in variants.items()}
+    preds = {name: [] for name in variants}
+    targets = []
+    for start in range(0, num_samples, batch_size):
+        x, y = dataset.get_batch(indices[start:start + batch_size])
+        x = x.numpy().astype(np.float32)
+        targets.append(y.numpy() * target_std + target_mean)
+        for name, session in sessions.items():
+            preds[name].append(_predict(session, x) * target_std + target_mean)
+
+    targets = np.concatenate(targets)
+    preds = {name: np.concatenate(p) for name, p in preds.items()}
+    sample = dataset.get_batch(indices[:1])[0].numpy().astype(np.float32)
+    batch = dataset.get_batch(indices[:batch_size])[0].numpy().astype(np.float32)
+
+    report = {}
+    for name, session in sessions.items():
+        report[name] = {
+            'mae_celsius': float(np.mean(np.abs(preds[name] - targets))),
+            'mae_vs_fp32_celsius': float(np.mean(np.abs(preds[name] - preds['fp32']))),
+            'max_abs_vs_fp32_celsius': float(np.max(np.abs(preds[name] - preds['fp32']))),
+            'latency_ms_batch1': _latency_ms(session, sample, latency_runs),
+            f'latency_ms_batch{len(batch)}': _latency_ms(session, batch, max(1, latency_runs // 10)),
+            'size_mb': os.path.getsize(variants[name]) / 2**20 + (
+                os.path.getsize(variants[name] + '.data') / 2**20 if os.path.exists(variants[name] + '.data') else 0
+            ),
+        }
+    report['num_samples'] = num_samples
+    return report
+
+
+def print_report(report: dict):
+    names = [name for name in report if name != 'num_samples']
+    keys = list(report[names[0]])
+    print(f"\nONNX variants on {report['num_samples']} test windows")
+    print(f"{'metric':<28}" + ''.join(f"{name:>12}" for name in names))
+    for key in keys:
+        print(f"{key:<28}" + ''.join(f"{report[name][key]:>12.3f}" for name in names))
+
+
+def save_report(report: dict, path: str):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
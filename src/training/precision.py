@@ -0,0 +1,58 @@
+"""
+Training precision modes (config: training.precision).
+
+- fp32: no autocast
+- bf16: autocast to bfloat16 (CPU with AVX512-BF16/AMX, or CUDA with bf16 support)
+- fp16: autocast to float16 with loss scaling (CUDA only)
+
+Parameters, optimizer state and the loss stay in fp32 in every mode.
+"""
+
+import contextlib
+
+import torch
+
+PRECISIONS = ('fp32', 'bf16', 'fp16')
+
+AUTOCAST_DTYPES = {
+    'bf16': torch.bfloat16,
+    'fp16': torch.float16,
+}
+
+
+def resolve_precision(precision: str, device: torch.device) -> str:
+    """
+    Check a precision mode against the device, falling back to fp32 if it is
+    not supported there.
+
+    Raises:
+        ValueError: If precision is not one of PRECISIONS
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+
+    if precision == 'bf16':
+        supported = device.type == 'cpu' or (device.type == 'cuda' and torch.cuda.is_bf16_supported())
+    elif precision == 'fp16':
+        supported = device.type == 'cuda'
+    else:
+        supported = True
+
+    if not supported:
+        print(f"⚠ {precision} is not supported on {device.type}, using fp32")
+        return 'fp32'
+    return precision
+
+
+def autocast(precision: str, device: torch.device):
+    """Autocast context for the forward pass (no-op for fp32)."""
+    if precision == 'fp32':
+        return contextlib.nullcontext()
+    return torch.autocast(device_type=device.type, dtype=AUTOCAST_DTYPES[precision])
+
+
+def create_grad_scaler(precision: str, device: torch.device):
+    """GradScaler for fp16, None otherwise (bf16 has fp32's exponent range)."""
+    if precision != 'fp16':
+        return None
+    return torch.amp.GradScaler(device.type)
@@ -0,0 +1,116 @@
+"""
+Experimental streaming inference for hourly sliding-window forecasts.
+
+Consecutive forecasts share seq_len - 1 input rows, but the absolute
+positional encoding shifts every row by one position, so encoder
+activations cannot simply be reused. What can be reused:
+
+- input_embedding is applied per row before the positional encoding, so
+  row embeddings e(t) are position-independent and computed once per row.
+- The blocks are post-norm, so layer 0 attends over x0 = e + pe directly
+  and its projection splits as
+
+      qkv_proj(e + pe_i) = W e + (W pe_i + b)
+
+  W e is cached per row and W pe_i + b is a fixed (seq_len, 3 * d_model)
+  table, so a new hour costs one row projection instead of seq_len.
+
+Everything after layer 0's projection depends on the whole window through
+softmax and is recomputed. Eval mode only, without attention masks.
+"""
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+class StreamingExcelFormer:
+    """
+    Incremental ExcelFormer evaluation for a batch of rolling windows
+    (e.g. one per location).
+
+    Row caches live in double-length buffers: appending writes one row and
+    shifts the buffer back only once every seq_len steps.
+
+    Args:
+        model: Trained ExcelFormer (put in eval mode)
+    """
+
+    def __init__(self, model: nn.Module):
+        self.model = model.eval()
+        self.seq_len = model.seq_len
+
+        first = model.encoder_blocks[0].attention.qkv_proj
+        self._qkv_weight = first.weight
+        with torch.no_grad():
+            pos = model.pos_encoding.pe[0, :self.seq_len]
+            self._pos = pos
+            self._pos_qkv = F.linear(pos, first.weight, first.bias)  # (seq_len, 3 * d_model)
+
+        self._embeddings = None  # (batch, 2 * seq_len, d_model)
+        self._projections = None  # (batch, 2 * seq_len, 3 * d_model)
+        self._end = 0
+
+    @torch.no_grad()
+    def reset(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Start streaming from full windows.
+
+        Args:
+            x: Input tensor of shape (batch_size, seq_len, num_continuous_features + 1)
+
+        Returns:
+            Predictions of shape (batch_size, pred_len, 1)
+        """
+        batch_size, seq_len, _ = x.shape
+        if seq_len != self.seq_len:
+            raise ValueError(f"Expected windows of {self.seq_len} rows, got {seq_len}")
+
+        embeddings = self.model.embed_inputs(x)
+        projections = F.linear(embeddings, self._qkv_weight)
+
+        self._embeddings = embeddings.new_empty(batch_size, 2 * seq_len, embeddings.shape[-1])
+        self._projections = projections.new_empty(batch_size, 2 * seq_len, projections.shape[-1])
+        self._embeddings[:, :seq_len] = embeddings
+        self._projections[:, :seq_len] = projections
+        self._end = seq_len
+        return self._forward()
+
+    @torch.no_grad()
+    def step(self, rows: torch.Tensor) -> torch.Tensor:
+        """
+        Slide every window forward by one hour.
+
+        Args:
+            rows: Newest input row per window, shape (batch_size, num_continuous_features + 1)
+
+        Returns:
+            Predictions of shape (batch_size, pred_len, 1)
+        """
+        if self._embeddings is None:
+            raise RuntimeError("Call reset() with full windows before step()")
+        if rows.shape[0] != self._embeddings.shape[0]:
+            raise ValueError(f"Expected {self._embeddings.shape[0]} rows, got {rows.shape[0]}")
+
+        if self._end == self._embeddings.shape[1]:
+            keep = self.seq_len - 1
+            self._embeddings[:, :keep] = self._embeddings[:, self._end - keep:self._end]
+            self._projections[:, :keep] = self._projections[:, self._end - keep:self._end]
+            self._end = keep
+
+        embedding = self.model.embed_inputs(rows)
+        self._embeddings[:, self._end] = embedding
+        self._projections[:, self._end] = F.linear(embedding, self._qkv_weight)
+        self._end += 1
+        return self._forward()
+
+    def _forward(self) -> torch.Tensor:
+        start = self._end - self.seq_len
+        x = self._embeddings[:, start:self._end] + self._pos
+        qkv = self._projections[:, start:self._end] + self._pos_qkv
+
+        blocks = self.model.encoder_blocks
+        x = blocks[0](x, qkv=qkv)
+        for block in blocks[1:]:
+            x = block(x)
+        return self.model.output_head(x)
@@ -8,10 +8,12 @@ Features:
 - MAE/RMSE metrics in both normalized and real (Celsius) scales
 - Inverse transform for predictions
 - MPS memory cleanup for Mac M2
+- Multi-process CPU training with DistributedDataParallel (see distributed.py)
 """
 
 import torch
 import torch.nn as nn
+from torch.nn.parallel import DistributedDataParallel
 from torch.utils.data import DataLoader
 import wandb
 import yaml
@@ -19,6 +21,7 @@ import os
 import sys
 import pathlib
 import numpy as np
+import time
 from datetime import datetime
 from tqdm import tqdm
 from typing import Tuple, Dict, Optional
@@ -26,9 +29,18 @@ from typing import Tuple, Dict, Optional
 # Add parent directory to path for imports
 ROOT_DIR = pathlib.Path(__file__).parent.parent.parent
 sys.path.insert(0, str(pathlib.Path(__file__).parent))
+sys.path.append(str(ROOT_DIR))
 
 from model import ExcelFormer
-from dataset import WeatherDataset
+from dataset import WeatherSplits, MultiLocationDataset, create_batch_loader
+from checkpoint import AsyncCheckpointWriter
+from distributed import (
+    ChronologicalDistributedSampler, barrier, cleanup_distributed, is_main_process, setup_distributed
+)
+from metrics import MetricAccumulator
+from precision import autocast, create_grad_scaler, resolve_precision
+from onnx_variants import build_variants, evaluate_variants, print_report, save_report
+from src.utils.locations import get_locations, location_paths
 
 CONFIG_PATH = os.path.join(ROOT_DIR, 'config.yaml')
 
@@ -57,15 +69,21 @@ def get_device() -> torch.device:
     return torch.device('cpu')
 
 
-def create_dataloaders(config: dict) -> Tuple[DataLoader, DataLoader, DataLoader]:
+def create_dataloaders(config: dict, rank: int = 0, world_size: int = 1) -> Tuple[DataLoader, DataLoader, DataLoader]:
     """
     Create train, validation, and test dataloaders with chronological splitting.
     
+    With world_size > 1 the train and validation splits are sharded across
+    ranks (ChronologicalDistributedSampler); the test loader is not sharded
+    since only rank 0 evaluates it.
+    
     Returns:
         Tuple of (train_loader, val_loader, test_loader)
     """
-    data_path = os.path.join(ROOT_DIR, config['data']['raw_file_path'])
     stats_path = os.path.join(ROOT_DIR, 'data/processed/statistics.npy')
+    cache_dir = config['data'].get('cache_dir')
+    if cache_dir is not None:
+        cache_dir = os.path.join(ROOT_DIR, cache_dir)
     
     seq_len = config['training']['seq_len']
     pred_len = config['training']['pred_len']
@@ -73,55 +91,71 @@ def create_dataloaders(config: dict) -> Tuple[DataLoader, DataLoader, DataLoader
     target_col = config['features']['target']
     split_ratio = config['training']['split_ratio']
     
-    # Create datasets with chronological splits
-    train_dataset = WeatherDataset(
-        file_path=data_path,
-        stats_path=stats_path,
-        seq_len=seq_len,
-        pred_len=pred_len,
-        target_col=target_col,
-        mode='train',
-        split_ratio=split_ratio
-    )
+    # Rank 0 builds (and caches) the features first so the other ranks load
+    # them from the cache instead of racing to write it
+    if rank != 0:
+        barrier()
     
-    val_dataset = WeatherDataset(
-        file_path=data_path,
-        stats_path=stats_path,
-        seq_len=seq_len,
-        pred_len=pred_len,
-        target_col=target_col,
-        mode='val',
-        split_ratio=split_ratio
-    )
+    # Load and normalize each location's series once; the three splits are views into it
+    location_datasets = {'train': [], 'val': [], 'test': []}
+    for location in get_locations(config):
+        store_path, file_path = location_paths(config, location['name'])
+        
+        # Prefer the columnar store, fall back to the CSV export
+        data_path = os.path.join(ROOT_DIR, store_path)
+        if not os.path.isdir(data_path):
+            data_path = os.path.join(ROOT_DIR, file_path)
+        
+        splits = WeatherSplits(
+            file_path=data_path,
+            stats_path=stats_path,
+            seq_len=seq_len,
+            pred_len=pred_len,
+            target_col=target_col,
+            split_ratio=split_ratio,
+            cache_dir=cache_dir,
+            verbose=rank == 0
+        )
+        for mode, datasets in location_datasets.items():
+            datasets.append(splits.dataset(mode))
     
-    test_dataset = WeatherDataset(
-        file_path=data_path,
-        stats_path=stats_path,
-        seq_len=seq_len,
-        pred_len=pred_len,
-        target_col=target_col,
-        mode='test',
-        split_ratio=split_ratio
+    if rank == 0:
+        barrier()
+    
+    # Create datasets with chronological splits (windows never cross locations)
+    train_dataset, val_dataset, test_dataset = (
+        datasets[0] if len(datasets) == 1 else MultiLocationDataset(datasets)
+        for datasets in location_datasets.values()
     )
     
+    # Per-rank shards of the train/val splits
+    train_sampler = val_sampler = None
+    if world_size > 1:
+        seed = config['training']['seed']
+        train_sampler = ChronologicalDistributedSampler(train_dataset, world_size, rank, shuffle=True, seed=seed)
+        val_sampler = ChronologicalDistributedSampler(val_dataset, world_size, rank, shuffle=False)
+    
     # Create dataloaders (no shuffle for val/test to maintain temporal order)
-    train_loader = DataLoader(
+    # Each batch is gathered in one op via get_batch (see create_batch_loader)
+    train_loader = create_batch_loader(
         train_dataset,
         batch_size=batch_size,
-        shuffle=True,  # Shuffle only training data
+        shuffle=train_sampler is None,  # Shuffle only training data
+        sampler=train_sampler,
         num_workers=0,
         pin_memory=True
     )
     
-    val_loader = DataLoader(
+    val_loader = create_batch_loader(
         val_dataset,
         batch_size=batch_size,
         shuffle=False,
+        sampler=val_sampler,
         num_workers=0,
         pin_memory=True
     )
     
-    test_loader = DataLoader(
+    test_loader = create_batch_loader(
         test_dataset,
         batch_size=batch_size,
         shuffle=False,
@@ -159,6 +193,58 @@ def create_model(config: dict, device: torch.device) -> ExcelFormer:
     return model.to(device)
 
 
+def unwrap_model(model: nn.Module) -> nn.Module:
+    """Underlying ExcelFormer of a torch.compile and/or DDP wrapper (shares parameters)."""
+    model = getattr(model, '_orig_mod', model)
+    if isinstance(model, DistributedDataParallel):
+        model = model.module
+    return model
+
+
+def compile_model(model: nn.Module, config: dict, device: torch.device, precision: str = 'fp32') -> nn.Module:
+    """
+    Wrap the model with torch.compile if training.compile.enabled is set.
+    
+    One forward/backward pass on a dummy batch forces compilation here, so a
+    missing or failing backend falls back to the eager model instead of
+    crashing the first epoch.
+    
+    Args:
+        model: Eager model
+        config: Configuration dict (training.compile.{enabled, backend, mode})
+        device: Torch device
+        precision: Autocast mode the training step runs under
+        
+    Returns:
+        Compiled model, or the eager model if disabled or compilation failed
+    """
+    compile_config = config['training'].get('compile', {})
+    if not compile_config.get('enabled', False):
+        return model
+    
+    backend = compile_config.get('backend', 'inductor')
+    mode = compile_config.get('mode', 'default')
+    try:
+        compiled = torch.compile(model, backend=backend, mode=None if mode == 'default' else mode)
+        
+        base_model = unwrap_model(model)
+        dummy_input = torch.zeros(
+            config['training']['batch_size'], base_model.seq_len, base_model.num_continuous_features + 1, device=device
+        )
+        start = time.perf_counter()
+        compiled.train()
+        with autocast(precision, device):
+            output = compiled(dummy_input)
+        output.float().sum().backward()
+        model.zero_grad(set_to_none=True)
+        print(f"✓ torch.compile (backend={backend}, mode={mode}) in {time.perf_counter() - start:.1f}s")
+        return compiled
+    except Exception as e:
+        model.zero_grad(set_to_none=True)
+        print(f"⚠ torch.compile failed ({type(e).__name__}: {e}), using eager model")
+        return model
+
+
 def create_optimizer(model: nn.Module, config: dict) -> torch.optim.Optimizer:
     """Create optimizer."""
     optimizer = torch.optim.AdamW(
@@ -247,45 +333,6 @@ class EarlyStopping:
         return self.should_stop
 
 
-def compute_metrics(
-    preds: torch.Tensor, 
-    targets: torch.Tensor,
-    target_mean: float = 0.0,
-    target_std: float = 1.0
-) -> Dict[str, float]:
-    """
-    Compute MAE and RMSE in both normalized and real scales.
-    
-    Args:
-        preds: Predictions (normalized)
-        targets: Ground truth (normalized)
-        target_mean: Mean of target for inverse transform
-        target_std: Std of target for inverse transform
-        
-    Returns:
-        Dict with mae, rmse (normalized) and mae_celsius, rmse_celsius (real)
-    """
-    # Normalized scale metrics
-    mae = torch.mean(torch.abs(preds - targets)).item()
-    mse = torch.mean((preds - targets) ** 2).item()
-    rmse = np.sqrt(mse)
-    
-    # Real scale (Celsius) metrics
-    preds_real = preds * target_std + target_mean
-    targets_real = targets * target_std + target_mean
-    
-    mae_celsius = torch.mean(torch.abs(preds_real - targets_real)).item()
-    mse_celsius = torch.mean((preds_real - targets_real) ** 2).item()
-    rmse_celsius = np.sqrt(mse_celsius)
-    
-    return {
-        'mae': mae,
-        'rmse': rmse,
-        'mae_celsius': mae_celsius,
-        'rmse_celsius': rmse_celsius
-    }
-
-
 def train_epoch(
     model: nn.Module,
     train_loader: DataLoader,
@@ -294,19 +341,24 @@ def train_epoch(
     device: torch.device,
     config: dict,
     epoch: int,
-    target_mean: float,
-    target_std: float
+    target_std: float,
+    precision: str = 'fp32',
+    scaler: Optional[torch.amp.GradScaler] = None
 ) -> Dict[str, float]:
-    """Train for one epoch."""
+    """
+    Train for one epoch.
+    
+    The forward pass runs under autocast for bf16/fp16; with fp16, pass the
+    GradScaler from create_grad_scaler. Also reports samples/sec.
+    """
     model.train()
-    total_loss = 0.0
-    all_preds = []
-    all_targets = []
+    accumulator = MetricAccumulator(target_std, device)
+    start_time = time.perf_counter()
     
     gradient_clip = config['training']['gradient_clip']
     log_freq = config['wandb']['log_freq']
     
-    pbar = tqdm(train_loader, desc=f"Train Epoch {epoch+1}", leave=False)
+    pbar = tqdm(train_loader, desc=f"Train Epoch {epoch+1}", leave=False, disable=not is_main_process())
     
     for batch_idx, (x, y) in enumerate(pbar):
         x = x.to(device)
@@ -315,42 +367,48 @@ def train_epoch(
         optimizer.zero_grad()
         
         # Forward pass
-        output = model(x)
-        output = output.squeeze(-1)  # (batch, pred_len)
+        with autocast(precision, device):
+            output = model(x)
+        output = output.squeeze(-1).float()  # (batch, pred_len)
         
         # Calculate loss
         loss = criterion(output, y)
         
         # Backward pass
-        loss.backward()
+        if scaler is not None:
+            scaler.scale(loss).backward()
+            scaler.unscale_(optimizer)
+        else:
+            loss.backward()
         
         # Gradient clipping
         if gradient_clip > 0:
             torch.nn.utils.clip_grad_norm_(model.parameters(), gradient_clip)
         
-        optimizer.step()
-        
-        total_loss += loss.item()
-        all_preds.append(output.detach())
-        all_targets.append(y.detach())
+        if scaler is not None:
+            scaler.step(optimizer)
+            scaler.update()
+        else:
+            optimizer.step()
         
-        # Update progress bar
-        pbar.set_postfix({'loss': f'{loss.item():.4f}'})
+        # Accumulated on device, no sync per batch
+        accumulator.update(output, y, loss)
         
-        # Log batch metrics to wandb
-        if config['wandb']['enabled'] and (batch_idx + 1) % log_freq == 0:
-            wandb.log({
-                'train/batch_loss': loss.item(),
-                'train/learning_rate': optimizer.param_groups[0]['lr'],
-            })
-    
-    # Compute epoch metrics
-    all_preds = torch.cat(all_preds, dim=0)
-    all_targets = torch.cat(all_targets, dim=0)
-    
-    metrics = compute_metrics(all_preds, all_targets, target_mean, target_std)
-    metrics['loss'] = total_loss / len(train_loader)
-    
+        # Sync only once per logging interval
+        if (batch_idx + 1) % log_freq == 0:
+            batch_loss = loss.item()
+            pbar.set_postfix({'loss': f'{batch_loss:.4f}'})
+            
+            # Log batch metrics to wandb
+            if config['wandb']['enabled']:
+                wandb.log({
+                    'train/batch_loss': batch_loss,
+                    'train/learning_rate': optimizer.param_groups[0]['lr'],
+                })
+    
+    metrics = accumulator.compute()
+    # Over all ranks when distributed
+    metrics['samples_per_sec'] = metrics['num_samples'] / (time.perf_counter() - start_time)
     return metrics
 
 
@@ -360,41 +418,28 @@ def validate(
     criterion: nn.Module,
     device: torch.device,
     epoch: int,
-    target_mean: float,
-    target_std: float
+    target_std: float,
+    precision: str = 'fp32'
 ) -> Dict[str, float]:
     """Validate the model."""
     model.eval()
-    total_loss = 0.0
-    all_preds = []
-    all_targets = []
+    accumulator = MetricAccumulator(target_std, device)
     
-    pbar = tqdm(val_loader, desc=f"Val Epoch {epoch+1}", leave=False)
+    pbar = tqdm(val_loader, desc=f"Val Epoch {epoch+1}", leave=False, disable=not is_main_process())
     
     with torch.no_grad():
         for x, y in pbar:
             x = x.to(device)
             y = y.to(device)
             
-            output = model(x)
-            output = output.squeeze(-1)
+            with autocast(precision, device):
+                output = model(x)
+            output = output.squeeze(-1).float()
             
             loss = criterion(output, y)
-            total_loss += loss.item()
-            
-            all_preds.append(output)
-            all_targets.append(y)
-            
-            pbar.set_postfix({'loss': f'{loss.item():.4f}'})
-    
-    # Compute epoch metrics
-    all_preds = torch.cat(all_preds, dim=0)
-    all_targets = torch.cat(all_targets, dim=0)
+            accumulator.update(output, y, loss)
     
-    metrics = compute_metrics(all_preds, all_targets, target_mean, target_std)
-    metrics['loss'] = total_loss / len(val_loader)
-    
-    return metrics
+    return accumulator.compute(per_horizon=True)
 
 
 def save_checkpoint(
@@ -403,16 +448,27 @@ def save_checkpoint(
     epoch: int, 
     val_loss: float, 
     path: str,
-    config: dict
+    config: dict,
+    writer: Optional[AsyncCheckpointWriter] = None,
+    history_name: Optional[str] = None
 ):
-    """Save model checkpoint."""
+    """
+    Save model checkpoint.
+    
+    With a writer, the state is snapshotted to CPU and written in the
+    background (see checkpoint.py); history_name rotates it. Without one,
+    the checkpoint is written synchronously.
+    """
     checkpoint = {
         'epoch': epoch,
-        'model_state_dict': model.state_dict(),
+        'model_state_dict': unwrap_model(model).state_dict(),
         'optimizer_state_dict': optimizer.state_dict(),
         'val_loss': val_loss,
         'config': config
     }
+    if writer is not None:
+        writer.save(checkpoint, path, history_name)
+        return
     os.makedirs(os.path.dirname(path), exist_ok=True)
     torch.save(checkpoint, path)
 
@@ -422,7 +478,8 @@ def predict(
     data_loader: DataLoader,
     device: torch.device,
     target_mean: float,
-    target_std: float
+    target_std: float,
+    precision: str = 'fp32'
 ) -> Tuple[np.ndarray, np.ndarray]:
     """
     Make predictions and return both normalized and Celsius values.
@@ -433,6 +490,7 @@ def predict(
         device: Torch device
         target_mean: Mean of target for inverse transform
         target_std: Std of target for inverse transform
+        precision: Autocast mode (fp32, bf16, fp16)
         
     Returns:
         Tuple of (predictions_celsius, targets_celsius)
@@ -444,8 +502,9 @@ def predict(
     with torch.no_grad():
         for x, y in tqdm(data_loader, desc="Predicting"):
             x = x.to(device)
-            output = model(x)
-            output = output.squeeze(-1)
+            with autocast(precision, device):
+                output = model(x)
+            output = output.squeeze(-1).float()
             
             all_preds.append(output.cpu())
             all_targets.append(y)
@@ -474,9 +533,23 @@ def train(config: dict):
     # Set seed
     set_seed(config['training']['seed'])
     
+    # Join the process group when launched by torchrun (CPU + gloo)
+    rank, world_size = setup_distributed(config)
+    if rank != 0:
+        # Only rank 0 logs to wandb
+        config = {**config, 'wandb': {**config['wandb'], 'enabled': False}}
+    
     # Get device
-    device = get_device()
-    print(f"Using device: {device}")
+    device = get_device() if world_size == 1 else torch.device('cpu')
+    if world_size > 1:
+        print(f"Rank {rank}/{world_size}, {torch.get_num_threads()} threads")
+    if rank == 0:
+        print(f"Using device: {device}")
+    
+    # Precision mode (falls back to fp32 if the device does not support it)
+    precision = resolve_precision(config['training'].get('precision', 'fp32'), device)
+    if rank == 0:
+        print(f"Precision: {precision}")
     
     # Initialize wandb
     if config['wandb']['enabled']:
@@ -490,16 +563,18 @@ def train(config: dict):
             name=run_name,
             tags=config['wandb']['tags'],
             config={
-                'training': config['training'],
+                'training': {**config['training'], 'precision': precision},
                 'model': config['model'],
                 'features': config['features']
             }
         )
     
     # Create dataloaders
-    print("Loading data...")
-    train_loader, val_loader, test_loader = create_dataloaders(config)
-    print(f"Train batches: {len(train_loader)}, Val batches: {len(val_loader)}, Test batches: {len(test_loader)}")
+    if rank == 0:
+        print("Loading data...")
+    train_loader, val_loader, test_loader = create_dataloaders(config, rank, world_size)
+    if rank == 0:
+        print(f"Train batches: {len(train_loader)}, Val batches: {len(val_loader)}, Test batches: {len(test_loader)}")
     
     # Get target stats for inverse transform
     stats = np.load(os.path.join(ROOT_DIR, 'data/processed/statistics.npy'), allow_pickle=True).item()
@@ -508,17 +583,27 @@ def train(config: dict):
     target_idx = input_cols.index(target_col)
     target_mean = stats['mean'][target_idx]
     target_std = stats['std'][target_idx]
-    print(f"Target stats - Mean: {target_mean:.2f}°C, Std: {target_std:.2f}")
+    if rank == 0:
+        print(f"Target stats - Mean: {target_mean:.2f}°C, Std: {target_std:.2f}")
     
     # Create model
-    print("Creating model...")
+    if rank == 0:
+        print("Creating model...")
     model = create_model(config, device)
-    print(f"Model parameters: {sum(p.numel() for p in model.parameters()):,}")
+    if rank == 0:
+        print(f"Model parameters: {sum(p.numel() for p in model.parameters()):,}")
     
     # Log model to wandb
     if config['wandb']['enabled']:
         wandb.watch(model, log='gradients', log_freq=100)
     
+    # Data parallel across ranks (pos_encoding is the only buffer and is constant)
+    if world_size > 1:
+        model = DistributedDataParallel(model, broadcast_buffers=False)
+    
+    # Optional torch.compile; the eager module keeps the parameters and is what gets saved
+    model = compile_model(model, config, device, precision)
+    
     # Create optimizer and scheduler
     optimizer = create_optimizer(model, config)
     scheduler = create_scheduler(optimizer, config, len(train_loader))
@@ -526,6 +611,9 @@ def train(config: dict):
     # Loss function
     criterion = nn.MSELoss()
     
+    # Loss scaling for fp16
+    scaler = create_grad_scaler(precision, device)
+    
     # Early stopping (based on validation loss)
     early_stopping = None
     if config['training']['early_stopping']['enabled']:
@@ -534,24 +622,41 @@ def train(config: dict):
             min_delta=config['training']['early_stopping']['min_delta']
         )
     
+    # Checkpoints are written in the background so the epoch loop never waits on disk
+    # (history files are stamped per run, so a new run never overwrites an older one's)
+    checkpoint_config = config['training'].get('checkpoint', {})
+    run_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    writer = AsyncCheckpointWriter(
+        history_dir=os.path.join(ROOT_DIR, 'models', 'checkpoints'),
+        keep_last=checkpoint_config.get('keep_last', 3),
+        background=checkpoint_config.get('async', True),
+    )
+    
     # Training loop
     best_val_loss = float('inf')
     epochs = config['training']['epochs']
     
-    print(f"\nStarting training for {epochs} epochs...")
-    print("-" * 60)
+    if rank == 0:
+        print(f"\nStarting training for {epochs} epochs...")
+        print("-" * 60)
     
     for epoch in range(epochs):
+        if world_size > 1:
+            # loader.sampler is the BatchSampler around the distributed sampler
+            train_loader.sampler.sampler.set_epoch(epoch)
+        
         # Train
         train_metrics = train_epoch(
             model, train_loader, optimizer, criterion,
-            device, config, epoch, target_mean, target_std
+            device, config, epoch, target_std,
+            precision, scaler
         )
         
         # Validate
         val_metrics = validate(
             model, val_loader, criterion,
-            device, epoch, target_mean, target_std
+            device, epoch, target_std,
+            precision
         )
         
         # Update scheduler (based on validation loss for ReduceLROnPlateau)
@@ -560,13 +665,15 @@ def train(config: dict):
         else:
             scheduler.step()
         
-        # Log epoch metrics
+        # Log epoch metrics (metrics are already all-reduced across ranks)
         current_lr = optimizer.param_groups[0]['lr']
-        print(f"Epoch {epoch+1}/{epochs} | "
-              f"Train Loss: {train_metrics['loss']:.4f} | "
-              f"Val Loss: {val_metrics['loss']:.4f} | "
-              f"Val MAE: {val_metrics['mae_celsius']:.2f}°C | "
-              f"LR: {current_lr:.6f}")
+        if is_main_process():
+            print(f"Epoch {epoch+1}/{epochs} | "
+                  f"Train Loss: {train_metrics['loss']:.4f} | "
+                  f"Val Loss: {val_metrics['loss']:.4f} | "
+                  f"Val MAE: {val_metrics['mae_celsius']:.2f}°C | "
+                  f"{train_metrics['samples_per_sec']:.0f} samples/s | "
+                  f"LR: {current_lr:.6f}")
         
         if config['wandb']['enabled']:
             wandb.log({
@@ -576,6 +683,7 @@ def train(config: dict):
                 'train/rmse': train_metrics['rmse'],
                 'train/mae_celsius': train_metrics['mae_celsius'],
                 'train/rmse_celsius': train_metrics['rmse_celsius'],
+                'train/samples_per_sec': train_metrics['samples_per_sec'],
                 'val/loss': val_metrics['loss'],
                 'val/mae': val_metrics['mae'],
                 'val/rmse': val_metrics['rmse'],
@@ -584,35 +692,47 @@ def train(config: dict):
                 'learning_rate': current_lr
             })
         
-        # Save best model (based on validation loss!)
+        # Save best model (based on validation loss!), rank 0 only
         if val_metrics['loss'] < best_val_loss:
             best_val_loss = val_metrics['loss']
-            save_path = os.path.join(ROOT_DIR, 'models', 'best_model.pt')
-            save_checkpoint(model, optimizer, epoch, val_metrics['loss'], save_path, config)
-            print(f"  ✓ New best model saved! Val Loss: {best_val_loss:.4f}")
+            if is_main_process():
+                save_path = os.path.join(ROOT_DIR, 'models', 'best_model.pt')
+                save_checkpoint(
+                    model, optimizer, epoch, val_metrics['loss'], save_path, config,
+                    writer, history_name=f'best_{run_stamp}_epoch_{epoch+1:03d}.pt'
+                )
+                print(f"  ✓ New best model saved! Val Loss: {best_val_loss:.4f}")
             
             if config['wandb']['enabled']:
                 wandb.run.summary['best_val_loss'] = best_val_loss
                 wandb.run.summary['best_val_mae_celsius'] = val_metrics['mae_celsius']
+                wandb.run.summary['best_val_mae_celsius_by_step'] = val_metrics['mae_celsius_by_step']
                 wandb.run.summary['best_epoch'] = epoch + 1
         
         # Early stopping (based on validation loss!)
         if early_stopping is not None:
+            # Same all-reduced val loss on every rank, so all ranks stop together
             if early_stopping(val_metrics['loss']):
-                print(f"\n⚠ Early stopping triggered at epoch {epoch+1}")
+                if is_main_process():
+                    print(f"\n⚠ Early stopping triggered at epoch {epoch+1}")
                 break
         
         # MPS memory cleanup (important for Mac M2)
         cleanup_memory(device)
     
+    # Test evaluation, final checkpoint and ONNX export run on rank 0 only
+    if not is_main_process():
+        cleanup_distributed()
+        return model
+    
     # Save final model
     final_path = os.path.join(ROOT_DIR, 'models', 'final_model.pt')
-    save_checkpoint(model, optimizer, epochs, val_metrics['loss'], final_path, config)
+    save_checkpoint(model, optimizer, epochs, val_metrics['loss'], final_path, config, writer)
     
     # Test set evaluation
     print("\n" + "-" * 60)
     print("Evaluating on test set...")
-    test_preds, test_targets = predict(model, test_loader, device, target_mean, target_std)
+    test_preds, test_targets = predict(unwrap_model(model), test_loader, device, target_mean, target_std, precision)
     
     # Compute test metrics
     test_mae = np.mean(np.abs(test_preds - test_targets))
@@ -625,6 +745,9 @@ def train(config: dict):
         wandb.run.summary['test_mae_celsius'] = test_mae
         wandb.run.summary['test_rmse_celsius'] = test_rmse
     
+    # The exports below read the checkpoints from disk
+    writer.close()
+    
     # Export models to ONNX format
     print("\n" + "-" * 60)
     print("Exporting models to ONNX format...")
@@ -634,6 +757,13 @@ def train(config: dict):
     best_onnx_path = os.path.join(ROOT_DIR, 'models', 'best_model.onnx')
     export_to_onnx(best_model_path, best_onnx_path, config, device)
     
+    # Optimized / int8 variants of the best model, compared on the test split
+    variants = build_variants(best_onnx_path, config)
+    onnx_report = evaluate_variants(variants, test_loader.dataset)
+    print_report(onnx_report)
+    report_path = os.path.join(ROOT_DIR, 'models', 'onnx_report.json')
+    save_report(onnx_report, report_path)
+    
     # Export final model to ONNX
     final_onnx_path = os.path.join(ROOT_DIR, 'models', 'final_model.onnx')
     export_to_onnx(final_path, final_onnx_path, config, device)
@@ -642,12 +772,19 @@ def train(config: dict):
         # Log ONNX models as artifacts
         wandb.save(best_onnx_path)
         wandb.save(final_onnx_path)
+        for path in variants.values():
+            wandb.save(path)
+        wandb.save(report_path)
+        for name in variants:
+            wandb.run.summary[f'onnx_{name}_mae_celsius'] = onnx_report[name]['mae_celsius']
+            wandb.run.summary[f'onnx_{name}_latency_ms'] = onnx_report[name]['latency_ms_batch1']
         wandb.finish()
     
     print("-" * 60)
     print(f"Training completed! Best Val Loss: {best_val_loss:.4f}")
     print(f"Models saved: best_model.pt, final_model.pt, best_model.onnx, final_model.onnx")
     
+    cleanup_distributed()
     return model
 
 
@@ -655,7 +792,8 @@ def export_to_onnx(
     checkpoint_path: str, 
     onnx_path: str, 
     config: dict, 
-    device: torch.device
+    device: torch.device,
+    fold_head: bool = True
 ):
     """
     Export a trained PyTorch model to ONNX format.
@@ -665,6 +803,7 @@ def export_to_onnx(
         onnx_path: Output path for ONNX model (.onnx)
         config: Configuration dict
         device: Torch device
+        fold_head: Export the folded output head (checked against the training graph)
     """
     # Load model
     model = load_model_for_inference(checkpoint_path, config, device)
@@ -686,6 +825,14 @@ def export_to_onnx(
     
     dummy_input = torch.randn(batch_size, seq_len, total_input_cols).to(device)
     
+    # Explicit attention so the optimized variant gets fused Attention nodes
+    model.use_explicit_attention()
+    
+    if fold_head:
+        check_input = torch.randn(8, seq_len, total_input_cols, device=device)
+        check_input[..., -1] = torch.randint(0, model.num_weather_codes, (8, seq_len), device=device)
+        model.fold_head(check_input)
+    
     # Export to ONNX
     torch.onnx.export(
         model,
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Bump when the feature engineering in src/utils/preprocessing.py changes
+FEATURE_VERSION = 2
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_digest(path):
+    """SHA-256 of a raw data source, either a single file or a store directory."""
+    if not os.path.isdir(path):
+        return file_digest(path)
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for name in sorted(filenames):
+            file_path = os.path.join(dirpath, name)
+            digest.update(os.path.relpath(file_path, path).encode())
+            digest.update(file_digest(file_path).encode())
+    return digest.hexdigest()
+
+
+def cache_key(source_path, stats_path, feature_config):
+    """
+    Build the cache key for a normalized feature matrix.
+
+    The key changes whenever the raw data (CSV or store directory), the
+    statistics file or the feature configuration changes, so stale caches
+    are never picked up.
+    """
+    digest = hashlib.sha256()
+    digest.update(source_digest(source_path).encode())
+    digest.update(file_digest(stats_path).encode())
+    config = dict(feature_config, version=FEATURE_VERSION)
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    return digest.hexdigest()[:32]
+
+
+def load_or_build_features(cache_dir, key, build_fn):
+    """
+    Return a cached feature matrix, building and caching it on a miss.
+
+    Args:
+        cache_dir: Directory holding <key>.npy and <key>.json files
+        key: Cache key from cache_key()
+        build_fn: Callable returning (features, columns) on a cache miss
+
+    Returns:
+        Tuple of (read-only memory-mapped features, column names)
+    """
+    data_path = os.path.join(cache_dir, f"{key}.npy")
+    meta_path = os.path.join(cache_dir, f"{key}.json")
+
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        features, columns = build_fn()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Write to temp files and rename so readers never see a partial cache
+        tmp_data_path = f"{data_path}.{os.getpid()}.tmp"
+        with open(tmp_data_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(features))
+        tmp_meta_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_meta_path, "w") as f:
+            json.dump({"columns": list(columns), "shape": list(features.shape)}, f)
+        os.replace(tmp_data_path, data_path)
+        os.replace(tmp_meta_path, meta_path)
+
+    with open(meta_path, "r") as f:
+        columns = json.load(f)["columns"]
+    return np.load(data_path, mmap_mode="r"), columns
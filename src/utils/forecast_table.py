@@ -0,0 +1,95 @@
+"""
+Precomputed forecast table, one row per location.
+
+Written after each data update by src/app/precompute.py and read by the
+serving layer. The table is a single .npz file:
+
+    locations   str array (L,)
+    last_time   datetime64[s] array (L,), last observed hour per location
+    forecasts   float32 array (L, pred_len), denormalized predictions
+
+It is replaced atomically, so readers never see a partial write.
+"""
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def write_forecast_table(path, forecasts):
+    """
+    Write the table, replacing any previous one.
+
+    Args:
+        path: Output .npz path
+        forecasts: Dict of location name -> (last_time, predictions)
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    names = list(forecasts)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(
+        tmp_path,
+        locations=np.array(names, dtype=str),
+        last_time=np.array([pd.Timestamp(forecasts[n][0]).to_datetime64() for n in names], dtype='datetime64[s]'),
+        forecasts=np.stack([np.asarray(forecasts[n][1], dtype=np.float32) for n in names]),
+    )
+    os.replace(tmp_path, path)
+
+
+class ForecastTable:
+    """
+    In-memory view of the forecast table with O(1) lookups by location.
+
+    The file is reloaded only when its mtime changes. Safe to use from
+    several threads (the serving layer reads it from executor threads).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mtime = None
+        self._rows = {}  # location -> row index
+        self._last_time = None
+        self._forecasts = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Reload the table if it changed on disk. Returns True if reloaded."""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+
+        with np.load(self.path) as table:
+            self._rows = {str(name): i for i, name in enumerate(table['locations'])}
+            self._last_time = table['last_time']
+            self._forecasts = table['forecasts']
+        self._mtime = mtime
+        return True
+
+    @property
+    def locations(self):
+        with self._lock:
+            self._refresh()
+            return list(self._rows)
+
+    def get(self, location):
+        """
+        Look up a location's precomputed forecast.
+
+        Returns:
+            Tuple of (last_time, predictions) or None if not in the table
+        """
+        with self._lock:
+            self._refresh()
+            row = self._rows.get(location)
+            if row is None:
+                return None
+            return pd.Timestamp(self._last_time[row]), self._forecasts[row]
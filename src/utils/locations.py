@@ -0,0 +1,38 @@
+def get_locations(config):
+    """
+    Configured forecast locations, primary location first.
+
+    Each entry has name, latitude, longitude and timezone. Configs with the
+    older single `location` block are treated as one location.
+    """
+    if 'locations' in config:
+        return config['locations']
+    location = dict(config['location'])
+    location.setdefault('name', 'default')
+    return [location]
+
+
+def get_location(config, name=None):
+    """Look up a location by name (default: the primary location)."""
+    locations = get_locations(config)
+    if name is None:
+        return locations[0]
+    for location in locations:
+        if location['name'] == name:
+            return location
+    raise KeyError(f"Unknown location '{name}'. Configured: {[l['name'] for l in locations]}")
+
+
+def location_paths(config, name=None):
+    """
+    Resolve (store_path, csv_path) for a location.
+
+    data.store_path and data.raw_file_path may contain a {location}
+    placeholder, giving one store directory per location.
+    """
+    name = get_location(config, name)['name']
+    data_config = config['data']
+    return (
+        data_config['store_path'].format(location=name),
+        data_config['raw_file_path'].format(location=name),
+    )
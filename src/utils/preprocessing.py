@@ -0,0 +1,228 @@
+"""
+Vectorized feature engineering shared by training and serving.
+
+Turns raw hourly weather columns (or API records) into the model input
+layout: the normalized input_cols from statistics.npy followed by the raw
+weather_code. WeatherDataset and the src/app inference service both go
+through FeatureEngine, so serving inputs are built exactly like training
+inputs.
+"""
+
+import json
+from datetime import timezone
+
+import numpy as np
+
+WEATHER_COLS = [
+    'temperature_2m',
+    'relative_humidity_2m',
+    'dew_point_2m',
+    'surface_pressure',
+    'precipitation',
+    'cloud_cover',
+    'shortwave_radiation',
+    'wind_speed_10m',
+    'wind_direction_10m',
+    'soil_temperature_0_to_7cm',
+]
+TIME_COLS = ['hour_sin', 'hour_cos', 'day_sin', 'day_cos', 'month_sin', 'month_cos']
+
+
+def _trig_table(values, period):
+    angle = 2 * np.pi * values / period
+    return np.stack([np.sin(angle), np.cos(angle)], axis=1)
+
+
+# Lookup tables for the time encodings, indexed by hour (0-23), day of month
+# (1-31) and month (1-12). Day uses a 365 period and month is shifted to
+# start at 0, as in the original training features.
+HOUR_TABLE = _trig_table(np.arange(24), 24)
+DAY_TABLE = _trig_table(np.arange(32), 365)
+MONTH_TABLE = _trig_table(np.arange(13) - 1, 12)
+
+# Time column -> (calendar field index, table column)
+TIME_TABLES = {
+    'hour_sin': (0, HOUR_TABLE[:, 0]),
+    'hour_cos': (0, HOUR_TABLE[:, 1]),
+    'day_sin': (1, DAY_TABLE[:, 0]),
+    'day_cos': (1, DAY_TABLE[:, 1]),
+    'month_sin': (2, MONTH_TABLE[:, 0]),
+    'month_cos': (2, MONTH_TABLE[:, 1]),
+}
+
+
+def calendar_fields(times):
+    """
+    Split datetime64 timestamps into (hour, day of month, month) int arrays.
+    """
+    times = np.asarray(times, dtype='datetime64[h]')
+    days = times.astype('datetime64[D]')
+    months = days.astype('datetime64[M]')
+    hour = (times - days).astype(np.int64)
+    day = (days - months).astype(np.int64) + 1
+    month = months.astype(np.int64) % 12 + 1
+    return hour, day, month
+
+
+def time_features(times, out=None):
+    """
+    Sin/cos encodings of hour, day and month, in TIME_COLS order.
+
+    Args:
+        times: datetime64 array (wall-clock time of each row)
+        out: Optional (n, 6) array to write into
+
+    Returns:
+        Array of shape (n, 6)
+    """
+    fields = calendar_fields(times)
+    if out is None:
+        out = np.empty((len(fields[0]), len(TIME_COLS)), dtype=np.float64)
+    for j, col in enumerate(TIME_COLS):
+        field, table = TIME_TABLES[col]
+        np.take(table, fields[field], out=out[:, j])
+    return out
+
+
+def load_statistics(stats_path):
+    """Load statistics.npy or its statistics.json export as a dict."""
+    if str(stats_path).endswith('.json'):
+        with open(stats_path, 'r') as f:
+            return json.load(f)
+    return np.load(stats_path, allow_pickle=True).item()
+
+
+def _record_time(timestamp):
+    # API timestamps are timezone-aware; encode them in UTC like the Rust backend
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(timestamp, 'h')
+
+
+class FeatureEngine:
+    """
+    Builds normalized float32 model inputs in one vectorized pass.
+
+    Args:
+        stats: Statistics dict (mean, std, input_cols)
+        weather_code: Append the raw weather_code as the last column
+
+    Attributes:
+        columns: Output column names
+    """
+
+    def __init__(self, stats: dict, weather_code: bool = True):
+        self.input_cols = list(stats['input_cols'])
+        self.mean = np.asarray(stats['mean'], dtype=np.float32)
+        self.std = np.asarray(stats['std'], dtype=np.float32)
+        self.columns = self.input_cols + (['weather_code'] if weather_code else [])
+
+    @property
+    def num_features(self) -> int:
+        return len(self.columns)
+
+    def transform(self, columns, times, out=None) -> np.ndarray:
+        """
+        Build the feature matrix for consecutive rows.
+
+        Args:
+            columns: Mapping of raw column name -> 1D array (weather columns
+                plus weather_code); a DataFrame works as is
+            times: datetime64 array of row timestamps
+            out: Optional float32 (rows, num_features) buffer to fill
+
+        Returns:
+            The filled (rows, num_features) float32 array
+        """
+        num_rows = len(times)
+        if out is None:
+            out = np.empty((num_rows, self.num_features), dtype=np.float32)
+        elif out.shape != (num_rows, self.num_features):
+            raise ValueError(f"Output buffer has shape {out.shape}, expected {(num_rows, self.num_features)}")
+
+        fields = calendar_fields(times)
+        for j, col in enumerate(self.input_cols):
+            if col in TIME_TABLES:
+                field, table = TIME_TABLES[col]
+                np.take(table, fields[field], out=out[:, j])
+            else:
+                out[:, j] = columns[col]
+
+        num_norm = len(self.input_cols)
+        np.subtract(out[:, :num_norm], self.mean, out=out[:, :num_norm])
+        np.divide(out[:, :num_norm], self.std, out=out[:, :num_norm])
+
+        if self.num_features > num_norm:
+            out[:, num_norm] = columns['weather_code']
+        return out
+
+    def transform_records(self, windows, out=None) -> np.ndarray:
+        """
+        Build a (B, seq_len, num_features) batch from API records.
+
+        Args:
+            windows: B sequences of equal length; records expose the raw
+                fields as attributes and a datetime 'timestamp'
+            out: Optional float32 (B, seq_len, num_features) buffer to fill
+
+        Returns:
+            The filled batch array
+        """
+        batch_size, seq_len = len(windows), len(windows[0])
+        if any(len(records) != seq_len for records in windows):
+            raise ValueError("All windows in a batch must have the same length")
+        if out is None:
+            out = np.empty((batch_size, seq_len, self.num_features), dtype=np.float32)
+        elif out.shape != (batch_size, seq_len, self.num_features) or not out.flags.c_contiguous:
+            raise ValueError(f"Output buffer must be C-contiguous with shape {(batch_size, seq_len, self.num_features)}")
+
+        records = [r for window in windows for r in window]
+        raw_cols = [c for c in self.columns if c not in TIME_COLS]
+        columns = {col: np.fromiter((getattr(r, col) for r in records), np.float32, len(records)) for col in raw_cols}
+        times = np.array([_record_time(r.timestamp) for r in records], dtype='datetime64[h]')
+
+        self.transform(columns, times, out=out.reshape(batch_size * seq_len, self.num_features))
+        return out
+
+
+class RollingWindow:
+    """
+    Fixed-length window of preprocessed rows with O(1) appends.
+
+    Rows are written twice into a buffer of length 2 * seq_len (at i and
+    i + seq_len), so the latest seq_len rows are always the contiguous slice
+    starting at the write position and view() never copies.
+
+    Args:
+        seq_len: Number of rows in the window
+        num_features: Row width
+
+    Note:
+        The array returned by view() is overwritten by later appends; copy
+        it if it has to outlive the next append.
+    """
+
+    def __init__(self, seq_len: int, num_features: int):
+        self.seq_len = seq_len
+        self._buffer = np.zeros((2 * seq_len, num_features), dtype=np.float32)
+        self._pos = 0  # Slot of the oldest row (next to be overwritten)
+        self.size = 0
+
+    @property
+    def full(self) -> bool:
+        return self.size == self.seq_len
+
+    def append(self, rows: np.ndarray):
+        """Append rows of shape (k, num_features) or a single row, oldest first."""
+        rows = np.atleast_2d(rows)[-self.seq_len:]
+        idx = (self._pos + np.arange(len(rows))) % self.seq_len
+        self._buffer[idx] = rows
+        self._buffer[idx + self.seq_len] = rows
+        self._pos = (self._pos + len(rows)) % self.seq_len
+        self.size = min(self.size + len(rows), self.seq_len)
+
+    def view(self) -> np.ndarray:
+        """The last seq_len rows in chronological order, as a zero-copy view."""
+        if not self.full:
+            raise ValueError(f"Window holds {self.size} of {self.seq_len} rows")
+        return self._buffer[self._pos:self._pos + self.seq_len]
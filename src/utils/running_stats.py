@@ -0,0 +1,74 @@
+import numpy as np
+
+
+class RunningStats:
+    """
+    Streaming per-column mean/std accumulator.
+
+    Each chunk is reduced with NumPy and folded into the running state with
+    Chan et al.'s parallel update (the batched form of Welford's algorithm),
+    so memory stays bounded by the chunk size. Two accumulators over disjoint
+    rows can be combined with merge(), e.g. to add freshly appended hours to
+    stats computed earlier without rescanning the history.
+
+    NaNs are skipped like pandas does: counts are kept per column, so a
+    missing value only leaves that cell out.
+    """
+
+    def __init__(self, num_features=None):
+        self.count = 0 if num_features is None else np.zeros(num_features, dtype=np.int64)
+        self.mean = None if num_features is None else np.zeros(num_features)
+        self.m2 = None if num_features is None else np.zeros(num_features)
+
+    def update(self, values):
+        """Add a chunk of rows with shape (rows, features)."""
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, None]
+        if len(values) == 0:
+            return self
+
+        chunk = RunningStats()
+        chunk.count = (~np.isnan(values)).sum(axis=0)
+        chunk.mean = np.nansum(values, axis=0) / np.maximum(chunk.count, 1)
+        chunk.m2 = np.nansum((values - chunk.mean) ** 2, axis=0)
+        return self.merge(chunk)
+
+    def merge(self, other):
+        """Fold another accumulator (over disjoint rows) into this one."""
+        if not np.any(other.count):
+            return self
+        if not np.any(self.count):
+            self.count, self.mean, self.m2 = np.copy(other.count), other.mean.copy(), other.m2.copy()
+            return self
+
+        # Per column; columns empty on both sides stay at zero
+        count = self.count + other.count
+        safe_count = np.maximum(count, 1)
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / safe_count)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * (self.count * other.count / safe_count)
+        self.count = count
+        return self
+
+    def variance(self, ddof=1):
+        """Per-column variance (ddof=1 matches pandas' .std())."""
+        dof = self.count - ddof
+        return np.where(dof > 0, self.m2 / np.maximum(dof, 1), np.nan)
+
+    def std(self, ddof=1):
+        """Per-column standard deviation."""
+        return np.sqrt(self.variance(ddof))
+
+    def state_dict(self):
+        """Serializable state, suitable for np.save."""
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+    @classmethod
+    def from_state_dict(cls, state):
+        stats = cls()
+        # Older states have one scalar count for all columns
+        stats.count = np.asarray(state['count'], dtype=np.int64)
+        stats.mean = None if state['mean'] is None else np.asarray(state['mean'], dtype=np.float64)
+        stats.m2 = None if state['m2'] is None else np.asarray(state['m2'], dtype=np.float64)
+        return stats
@@ -3,9 +3,23 @@ import os
 from tqdm import tqdm
 from botocore.exceptions import NoCredentialsError
 import hashlib
+import shutil
 
-def download_from_s3(file_path, bucket_name, logger):
-    s3 = boto3.client('s3')
+from src.utils.weather_store import META_FILE, read_meta, partition_files, tail_partitions
+
+def create_s3_client():
+    """
+    S3 client from its own boto3 session.
+
+    boto3.client() goes through the shared default session, which is not
+    thread-safe. Create one client up front and pass it (s3=...) to the
+    functions below when calling them from worker threads; the client itself
+    can be shared between threads.
+    """
+    return boto3.session.Session().client('s3')
+
+def download_from_s3(file_path, bucket_name, logger, s3=None):
+    s3 = s3 or create_s3_client()
     try:
         logger.info(f"Downloading {file_path} from S3...")
         s3.download_file(bucket_name, os.path.basename(file_path), file_path)
@@ -22,11 +36,11 @@ def get_md5(file_path):
             hash_md5.update(chunk)
     return hash_md5.hexdigest()
 
-def upload_to_s3(file_path, bucket_name, object_name=None):
+def upload_to_s3(file_path, bucket_name, object_name=None, s3=None):
     if object_name is None:
         object_name = os.path.basename(file_path)
 
-    s3 = boto3.client('s3')
+    s3 = s3 or create_s3_client()
     local_md5 = get_md5(file_path)
 
     try:
@@ -73,4 +87,51 @@ def upload_to_s3(file_path, bucket_name, object_name=None):
         except Exception as e:
             print(f"S3 Upload Error: {e}")
             return False
-        
\ No newline at end of file
+        
+def store_object_name(store_dir, file_path):
+    """S3 key for a file inside a weather store, e.g. istanbul_weather/2025/time.npy"""
+    relative = os.path.relpath(file_path, store_dir)
+    return "/".join([os.path.basename(os.path.normpath(store_dir))] + relative.split(os.sep))
+
+def upload_store_partitions(store_dir, partitions, bucket_name, s3=None):
+    """Upload only the given store partitions plus meta.json."""
+    files = [path for name in partitions for path in partition_files(store_dir, name)]
+    files.append(os.path.join(store_dir, META_FILE))
+
+    s3 = s3 or create_s3_client()
+    success = True
+    for file_path in files:
+        success = upload_to_s3(file_path, bucket_name, store_object_name(store_dir, file_path), s3=s3) and success
+    return success
+
+def download_store(store_dir, bucket_name, logger, latest_only=True, min_rows=0, s3=None):
+    """
+    Download a weather store from S3.
+
+    With latest_only, only meta.json and the newest partition are fetched,
+    which is all append_rows needs, plus as many older partitions as it takes
+    to hold min_rows rows (e.g. a full model input window right after New
+    Year, when the newest partition has only a few hours).
+    """
+    s3 = s3 or create_s3_client()
+    try:
+        os.makedirs(store_dir, exist_ok=True)
+        meta_path = os.path.join(store_dir, META_FILE)
+        s3.download_file(bucket_name, store_object_name(store_dir, meta_path), meta_path)
+
+        if latest_only:
+            partitions = tail_partitions(store_dir, min_rows)
+        else:
+            partitions = list(read_meta(store_dir)['partitions'])
+
+        for name in partitions:
+            os.makedirs(os.path.join(store_dir, name), exist_ok=True)
+            for file_path in partition_files(store_dir, name):
+                logger.info(f"Downloading {store_object_name(store_dir, file_path)} from S3...")
+                s3.download_file(bucket_name, store_object_name(store_dir, file_path), file_path)
+        return True
+    except Exception as e:
+        logger.error(f"S3 Download Error: {e}")
+        # Never leave a half-downloaded store behind
+        shutil.rmtree(store_dir, ignore_errors=True)
+        return False
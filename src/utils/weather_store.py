@@ -0,0 +1,319 @@
+"""
+Columnar on-disk store for the hourly weather archive.
+
+Layout (one partition per calendar year, one typed .npy file per column):
+
+    <store_dir>/
+        meta.json
+        2006/time.npy
+        2006/temperature_2m.npy
+        ...
+
+Columns are opened with np.load(mmap_mode='r'), so reading the archive
+needs no text parsing or type inference. The CSV remains available
+through export_csv().
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+META_FILE = "meta.json"
+TIME_COL = "time"
+# Open-Meteo's hourly timestamp format, kept for CSV exports
+TIME_FORMAT = "%Y-%m-%dT%H:%M"
+
+
+def is_store(path):
+    """Return True if path is a weather store directory."""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, META_FILE))
+
+
+def read_meta(store_dir):
+    """Load the store's meta.json."""
+    with open(os.path.join(store_dir, META_FILE), "r") as f:
+        return json.load(f)
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _write_partition(store_dir, name, df):
+    """Write one partition's columns to a fresh directory and swap it in."""
+    part_dir = os.path.join(store_dir, name)
+    tmp_dir = f"{part_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if col == TIME_COL:
+            values = values.astype("datetime64[s]")
+        np.save(os.path.join(tmp_dir, f"{col}.npy"), values)
+
+    shutil.rmtree(part_dir, ignore_errors=True)
+    os.replace(tmp_dir, part_dir)
+
+    times = df[TIME_COL]
+    return {
+        "rows": len(df),
+        "start": times.iloc[0].strftime(TIME_FORMAT),
+        "end": times.iloc[-1].strftime(TIME_FORMAT),
+    }
+
+
+def _prepare_frame(df):
+    df = df.copy()
+    df[TIME_COL] = pd.to_datetime(df[TIME_COL])
+    return df.sort_values(TIME_COL, kind="stable").reset_index(drop=True)
+
+
+def _build_meta(columns, partitions):
+    names = sorted(partitions)
+    return {
+        "columns": list(columns),
+        "partitions": {name: partitions[name] for name in names},
+        "rows": sum(p["rows"] for p in partitions.values()),
+        "last_time": partitions[names[-1]]["end"] if names else None,
+    }
+
+
+def write_partitions(df, store_dir):
+    """
+    Write (or overwrite) the yearly partitions covered by df.
+
+    Partitions that df does not touch are left as they are, so callers can
+    write an archive chunk by chunk.
+
+    Returns:
+        List of partition names that were written
+    """
+    df = _prepare_frame(df)
+    os.makedirs(store_dir, exist_ok=True)
+
+    meta = read_meta(store_dir) if is_store(store_dir) else {"columns": list(df.columns), "partitions": {}}
+    if list(df.columns) != meta["columns"]:
+        raise ValueError(f"Column mismatch: store has {meta['columns']}, got {list(df.columns)}")
+
+    partitions = dict(meta["partitions"])
+    written = []
+    for name, part in df.groupby(df[TIME_COL].dt.year.astype(str), sort=True):
+        partitions[name] = _write_partition(store_dir, name, part)
+        written.append(name)
+
+    _write_json_atomic(os.path.join(store_dir, META_FILE), _build_meta(meta["columns"], partitions))
+    return written
+
+
+def write_store(df, store_dir):
+    """Replace the whole store with the contents of df."""
+    if is_store(store_dir):
+        shutil.rmtree(store_dir)
+    return write_partitions(df, store_dir)
+
+
+def last_timestamp(store_dir):
+    """Last recorded timestamp, read from meta.json without touching any column."""
+    last_time = read_meta(store_dir)["last_time"]
+    return None if last_time is None else pd.Timestamp(last_time)
+
+
+def missing_partitions(store_dir):
+    """
+    Partitions listed in meta.json that are not present locally.
+
+    Stores downloaded with latest_only (see s3_client.download_store) keep
+    the full meta.json but only the newest partitions.
+    """
+    return [name for name in read_meta(store_dir)["partitions"] if not os.path.isdir(os.path.join(store_dir, name))]
+
+
+def tail_partitions(store_dir, num_rows):
+    """
+    Newest partitions that together hold at least num_rows rows (per the row
+    counts in meta.json), oldest first. Always includes the newest partition.
+    """
+    partitions = read_meta(store_dir)["partitions"]
+    names = []
+    for name in reversed(list(partitions)):
+        names.append(name)
+        num_rows -= partitions[name]["rows"]
+        if num_rows <= 0:
+            break
+    return names[::-1]
+
+
+def _partition_dir(store_dir, name):
+    part_dir = os.path.join(store_dir, name)
+    if not os.path.isdir(part_dir):
+        raise FileNotFoundError(
+            f"Partition {name} is listed in {META_FILE} but not present in {store_dir} "
+            f"(partial store, e.g. downloaded with latest_only)"
+        )
+    return part_dir
+
+
+def read_partition(store_dir, name, columns=None):
+    """Read a single partition into a DataFrame."""
+    columns = read_meta(store_dir)["columns"] if columns is None else columns
+    part_dir = _partition_dir(store_dir, name)
+    return pd.DataFrame({col: np.load(os.path.join(part_dir, f"{col}.npy"), mmap_mode="r") for col in columns})
+
+
+def read_tail(store_dir, num_rows, after=None, columns=None):
+    """
+    Read the most recent rows of the store, newest partitions first.
+
+    Args:
+        store_dir: Store directory
+        num_rows: Maximum number of rows to return
+        after: Optional timestamp; only rows strictly after it are returned
+        columns: Optional subset of columns (default: all)
+
+    Returns:
+        DataFrame of at most num_rows rows in chronological order
+    """
+    meta = read_meta(store_dir)
+    columns = meta["columns"] if columns is None else columns
+    after = None if after is None else pd.Timestamp(after)
+
+    parts = []
+    remaining = num_rows
+    for name in reversed(list(meta["partitions"])):
+        if remaining <= 0 or (after is not None and pd.Timestamp(meta["partitions"][name]["end"]) <= after):
+            break
+        part = read_partition(store_dir, name, columns).iloc[-remaining:]
+        if after is not None:
+            part = part[part[TIME_COL] > after]
+        parts.append(part)
+        remaining -= len(part)
+
+    if not parts:
+        return pd.DataFrame({col: [] for col in columns})
+    return pd.concat(parts[::-1], ignore_index=True)
+
+
+def append_rows(df, store_dir):
+    """
+    Append rows newer than the store's last timestamp.
+
+    Only the partitions that receive rows are rewritten (in practice the
+    current year), so an hourly append costs O(partition), not O(history).
+    Only meta.json and the touched partitions need to exist locally.
+
+    Returns:
+        Tuple of (appended rows as a DataFrame, list of touched partition names)
+    """
+    df = _prepare_frame(df)
+    meta = read_meta(store_dir)
+    if list(df.columns) != meta["columns"]:
+        raise ValueError(f"Column mismatch: store has {meta['columns']}, got {list(df.columns)}")
+
+    if meta["last_time"] is not None:
+        df = df[df[TIME_COL] > pd.Timestamp(meta["last_time"])].reset_index(drop=True)
+    if df.empty:
+        return df, []
+
+    partitions = dict(meta["partitions"])
+    touched = []
+    for name, part in df.groupby(df[TIME_COL].dt.year.astype(str), sort=True):
+        if name in partitions:
+            part = pd.concat([read_partition(store_dir, name), part], ignore_index=True)
+        partitions[name] = _write_partition(store_dir, name, part)
+        touched.append(name)
+
+    _write_json_atomic(os.path.join(store_dir, META_FILE), _build_meta(meta["columns"], partitions))
+    return df, touched
+
+
+def partition_files(store_dir, name):
+    """Paths of a partition's column files."""
+    return [os.path.join(store_dir, name, f"{col}.npy") for col in read_meta(store_dir)["columns"]]
+
+
+def iter_partitions(store_dir, columns=None):
+    """
+    Yield each partition as a dict of memory-mapped column arrays, oldest first.
+
+    Args:
+        store_dir: Store directory
+        columns: Optional subset of columns to open (default: all)
+    """
+    meta = read_meta(store_dir)
+    columns = meta["columns"] if columns is None else columns
+    for name in meta["partitions"]:
+        part_dir = _partition_dir(store_dir, name)
+        yield {col: np.load(os.path.join(part_dir, f"{col}.npy"), mmap_mode="r") for col in columns}
+
+
+def read_store(store_dir, columns=None):
+    """Read the store (or a subset of its columns) into a DataFrame."""
+    meta = read_meta(store_dir)
+    columns = meta["columns"] if columns is None else columns
+    parts = list(iter_partitions(store_dir, columns))
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    return pd.DataFrame({col: np.concatenate([p[col] for p in parts]) for col in columns})
+
+
+def export_csv(store_dir, csv_path, num_rows=None):
+    """
+    Export the store as a CSV in the original Open-Meteo layout.
+
+    With num_rows, only the most recent rows are exported (read_tail), which
+    also works on a partial store that holds them.
+    """
+    df = read_store(store_dir) if num_rows is None else read_tail(store_dir, num_rows)
+    df[TIME_COL] = df[TIME_COL].dt.strftime(TIME_FORMAT)
+    os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+    df.to_csv(csv_path, index=False)
+
+
+def count_rows(path):
+    """Number of data rows in a store (from meta.json) or a CSV (newline count)."""
+    if is_store(path):
+        return read_meta(path)["rows"]
+    with open(path, "rb") as f:
+        lines = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                lines += 1
+    return max(0, lines - 1)
+
+
+def iter_weather_frames(path, chunksize=100_000):
+    """
+    Yield the archive chunk by chunk as DataFrames, oldest first.
+
+    Store partitions are yielded one at a time; CSVs are read in chunksize
+    rows. The 'time' column is always datetime64.
+    """
+    if is_store(path):
+        for name in read_meta(path)["partitions"]:
+            yield read_partition(path, name)
+        return
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk[TIME_COL] = pd.to_datetime(chunk[TIME_COL])
+        yield chunk
+
+
+def load_weather_frame(path):
+    """
+    Load the hourly archive from a store directory or a CSV file.
+
+    The 'time' column is always returned as datetime64.
+    """
+    if is_store(path):
+        return read_store(path)
+    df = pd.read_csv(path)
+    df[TIME_COL] = pd.to_datetime(df[TIME_COL])
+    return df
@@ -0,0 +1,46 @@
+import sys
+import pathlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add src to path
+root_dir = pathlib.Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+WEATHER_COLS = [
+    'temperature_2m', 'relative_humidity_2m', 'dew_point_2m', 'surface_pressure',
+    'precipitation', 'cloud_cover', 'shortwave_radiation', 'wind_speed_10m',
+    'wind_direction_10m', 'soil_temperature_0_to_7cm'
+]
+TIME_COLS = ['hour_sin', 'hour_cos', 'day_sin', 'day_cos', 'month_sin', 'month_cos']
+
+
+def make_weather_frame(num_rows: int = 600, start: str = '2020-01-01T00:00', seed: int = 0) -> pd.DataFrame:
+    """Synthetic hourly frame with the same columns as the Open-Meteo CSV."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'time': pd.date_range(start, periods=num_rows, freq='h').strftime('%Y-%m-%dT%H:%M')})
+    for i, col in enumerate(WEATHER_COLS):
+        df[col] = np.round(rng.normal(10 * (i + 1), i + 1, num_rows), 1)
+    df['weather_code'] = rng.integers(0, 4, num_rows).astype(float)
+    return df
+
+
+@pytest.fixture
+def weather_csv(tmp_path):
+    """Write a synthetic raw CSV plus matching statistics.npy and return both paths."""
+    df = make_weather_frame()
+    csv_path = tmp_path / 'weather.csv'
+    df.to_csv(csv_path, index=False)
+
+    stats = {
+        'mean': np.array([10.0 * (i + 1) for i in range(len(WEATHER_COLS))] + [0.0] * len(TIME_COLS)),
+        'std': np.array([float(i + 1) for i in range(len(WEATHER_COLS))] + [0.7] * len(TIME_COLS)),
+        'input_cols': WEATHER_COLS + TIME_COLS,
+        'all_cols': WEATHER_COLS + TIME_COLS + ['weather_code'],
+        'exclude_from_norm': ['weather_code'],
+    }
+    stats_path = tmp_path / 'statistics.npy'
+    np.save(stats_path, stats)
+    return str(csv_path), str(stats_path)
@@ -0,0 +1,248 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from conftest import make_weather_frame
+from src.app.api import create_app
+from src.app.precompute import precompute_forecasts
+from src.app.services import ForecastCache, HistoryBuffer, InferenceService, MicroBatcher, OnnxForecaster
+from src.utils.forecast_table import ForecastTable
+from src.utils.preprocessing import FeatureEngine, load_statistics
+from src.utils.weather_store import append_rows, write_store
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(ROOT_DIR, 'models', 'best_model.onnx')
+STATS_PATH = os.path.join(ROOT_DIR, 'data', 'processed', 'statistics.json')
+
+
+def make_history(num_records=168):
+    start = datetime(2024, 7, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'timestamp': (start + timedelta(hours=i)).isoformat(),
+            'temperature_2m': 20.0 + np.sin(i / 24 * 2 * np.pi) * 5,
+            'relative_humidity_2m': 60.0,
+            'dew_point_2m': 12.0,
+            'surface_pressure': 1010.0,
+            'precipitation': 0.0,
+            'cloud_cover': 20.0,
+            'shortwave_radiation': 300.0,
+            'wind_speed_10m': 10.0,
+            'wind_direction_10m': 180.0,
+            'soil_temperature_0_to_7cm': 22.0,
+            'weather_code': 1.0,
+        }
+        for i in range(num_records)
+    ]
+
+
+def test_micro_batcher_coalesces_requests():
+    batch_sizes = []
+
+    def run_batch(inputs):
+        batch_sizes.append(len(inputs))
+        return [x * 2 for x in inputs]
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait=0.05)
+        samples = [np.full(3, i, dtype=np.float32) for i in range(10)]
+        results = await asyncio.gather(*(batcher.submit(x) for x in samples))
+        await batcher.stop()
+        return samples, results
+
+    samples, results = asyncio.run(main())
+    assert batch_sizes == [8, 2]
+    for x, y in zip(samples, results):
+        np.testing.assert_array_equal(y, x * 2)
+
+
+def test_micro_batcher_propagates_errors():
+    def run_batch(inputs):
+        raise RuntimeError("boom")
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait=0.01)
+        results = await asyncio.gather(*(batcher.submit(np.zeros(2)) for _ in range(3)), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(main()))
+
+
+def test_predict_endpoint():
+    service = InferenceService(OnnxForecaster(MODEL_PATH, STATS_PATH), max_batch_size=4, max_wait_ms=1)
+    with TestClient(create_app(service=service)) as client:
+        response = client.post('/predict', json={'recent_history': make_history()})
+        assert response.status_code == 200
+        predictions = response.json()['predictions']
+        assert len(predictions) == 168
+        assert all(np.isfinite(predictions))
+
+        response = client.post('/predict', json={'recent_history': make_history(24)})
+        assert response.status_code == 400
+
+
+def test_forecast_cache_lru_and_hour_expiry():
+    now = [3600 * 10 + 1200]  # 20 minutes past the hour
+    cache = ForecastCache(max_entries=2, clock=lambda: now[0])
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)  # evicts 'b', the least recently used
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+    now[0] = 3600 * 11  # next hour boundary
+    assert cache.get('a') is None
+    assert cache.stats() == {'hits': 2, 'misses': 2, 'size': 1, 'hit_rate': 0.5}
+
+
+def test_predict_cache_skips_inference():
+    service = InferenceService(OnnxForecaster(MODEL_PATH, STATS_PATH), max_batch_size=1, cache=ForecastCache())
+    runs = []
+    run = service.model.run
+    service.model.run = lambda inputs: runs.append(len(inputs)) or run(inputs)
+
+    with TestClient(create_app(service=service)) as client:
+        history = make_history()
+        first = client.post('/predict', json={'recent_history': history}).json()
+        second = client.post('/predict', json={'recent_history': history}).json()
+        history[-1]['temperature_2m'] += 1.0
+        client.post('/predict', json={'recent_history': history})
+
+        assert first == second
+        assert runs == [1, 1]
+        assert client.get('/stats').json()['cache']['hits'] == 1
+
+
+def test_history_buffer_refreshes_incrementally(tmp_path):
+    store_dir = str(tmp_path / 'store')
+    df = make_weather_frame(num_rows=400)
+    write_store(df.iloc[:300], store_dir)
+
+    engine = FeatureEngine(load_statistics(STATS_PATH))
+    history = HistoryBuffer(store_dir, engine)
+    assert history.refresh() == 168
+    assert history.refresh() == 0
+
+    append_rows(df.iloc[300:350], store_dir)
+    assert history.refresh() == 50
+
+    tail = df.iloc[350 - 168:350]
+    expected = engine.transform(tail, pd.to_datetime(tail['time']).to_numpy())
+    np.testing.assert_array_equal(history.window(), expected)
+    assert history.last_time == pd.Timestamp(df['time'].iloc[349])
+
+
+def test_forecast_latest_reads_store_off_the_event_loop(tmp_path):
+    store_dir = str(tmp_path / 'istanbul')
+    write_store(make_weather_frame(num_rows=200), store_dir)
+    service = InferenceService(OnnxForecaster(MODEL_PATH, STATS_PATH), max_batch_size=1, stores={'istanbul': store_dir})
+
+    history = service.histories['istanbul']
+    refresh = history.refresh
+    loops = []
+
+    def recording_refresh():
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return refresh()
+
+    history.refresh = recording_refresh
+    with TestClient(create_app(service=service)) as client:
+        assert client.get('/forecast/latest').status_code == 200
+    assert loops == [None]
+
+
+def test_forecast_latest_endpoint(tmp_path):
+    store_dir = str(tmp_path / 'istanbul')
+    write_store(make_weather_frame(num_rows=200), store_dir)
+    service = InferenceService(
+        OnnxForecaster(MODEL_PATH, STATS_PATH), max_batch_size=1, cache=ForecastCache(), stores={'istanbul': store_dir}
+    )
+
+    with TestClient(create_app(service=service)) as client:
+        response = client.get('/forecast/latest')
+        assert response.status_code == 200
+        body = response.json()
+        assert body['location'] == 'istanbul'
+        assert len(body['predictions']) == 168
+
+        assert client.get('/forecast/latest', params={'location': 'ankara'}).status_code == 404
+        client.get('/forecast/latest')
+        assert client.get('/stats').json()['cache']['hits'] == 1
+
+
+def test_precomputed_forecasts_are_served(tmp_path):
+    config = {
+        'locations': [{'name': 'istanbul'}, {'name': 'ankara'}, {'name': 'izmir'}],
+        'data': {'store_path': 'stores/{location}', 'raw_file_path': 'raw/{location}.csv'},
+        'features': {'target': 'temperature_2m'},
+        'serving': {'forecast_table': 'forecasts.npz'},
+    }
+    write_store(make_weather_frame(num_rows=200, seed=1), str(tmp_path / 'stores' / 'istanbul'))
+    write_store(make_weather_frame(num_rows=300, seed=2), str(tmp_path / 'stores' / 'ankara'))
+
+    model = OnnxForecaster(MODEL_PATH, STATS_PATH)
+    forecasts = precompute_forecasts(config, root_dir=str(tmp_path), model=model)
+    assert list(forecasts) == ['istanbul', 'ankara']  # izmir has no store
+
+    table = ForecastTable(str(tmp_path / 'forecasts.npz'))
+    last_time, predictions = table.get('ankara')
+    assert predictions.shape == (168,)
+    assert table.get('izmir') is None
+
+    runs = []
+    run = model.run
+    model.run = lambda inputs: runs.append(len(inputs)) or run(inputs)
+    service = InferenceService(
+        model, max_batch_size=1, stores={'ankara': str(tmp_path / 'stores' / 'ankara')}, forecast_table=table
+    )
+    with TestClient(create_app(service=service)) as client:
+        body = client.get('/forecast/latest').json()
+        assert runs == []
+        assert pd.Timestamp(body['last_time']) == last_time
+        np.testing.assert_allclose(body['predictions'], predictions, rtol=1e-6)
+
+        # Locations only in the table are served from it as well
+        assert client.get('/forecast/latest', params={'location': 'istanbul'}).status_code == 200
+
+
+def test_micro_batcher_runs_batches_concurrently():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def run_batch(inputs):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+        return inputs
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait=0.001, max_concurrency=3)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(main()) == list(range(6))
+    assert max(peak) == 3
+
+
+def test_session_pool_matches_single_session():
+    x = np.zeros((1, 168, 17), dtype=np.float32)
+    single = OnnxForecaster(MODEL_PATH, STATS_PATH)
+    pooled = OnnxForecaster(MODEL_PATH, STATS_PATH, pool_size=3, intra_op_threads=1, inter_op_threads=1)
+    assert pooled.pool.size == 3
+    np.testing.assert_allclose(pooled.predict(x), single.predict(x), rtol=1e-5)
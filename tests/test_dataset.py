@@ -8,7 +8,11 @@ import pathlib
 root_dir = pathlib.Path(__file__).parent.parent
 sys.path.append(str(root_dir))
 
-from src.training.dataset import WeatherDataset
+from torch.utils.data import DataLoader
+
+from src.training import dataset as dataset_module
+from conftest import make_weather_frame
+from src.training.dataset import MultiLocationDataset, WeatherDataset, WeatherSplits, create_batch_loader
 
 def test_weather_dataset():
     # Use real data path
@@ -43,5 +47,107 @@ def test_weather_dataset():
     
     print("\nTest Passed: Shapes and Types are correct.")
 
+
+
+def test_window_views_match_slicing(weather_csv):
+    file_path, stats_path = weather_csv
+    seq_len, pred_len = 24, 12
+    dataset = WeatherDataset(file_path, stats_path, seq_len=seq_len, pred_len=pred_len, mode='train')
+
+    # Windows are views over the series, not copies
+    assert dataset.x_windows.untyped_storage().data_ptr() == dataset.data.untyped_storage().data_ptr()
+
+    for idx in [0, 7, len(dataset) - 1]:
+        x, y = dataset[idx]
+        assert torch.equal(x, dataset.data[idx : idx + seq_len])
+        assert torch.equal(y, dataset.data[idx + seq_len : idx + seq_len + pred_len, dataset.target_idx])
+
+    indices = torch.tensor([3, 0, len(dataset) - 1])
+    x_batch, y_batch = dataset.get_batch(indices)
+    assert x_batch.shape == (3, seq_len, dataset.data.shape[1])
+    assert y_batch.shape == (3, pred_len)
+    for row, idx in enumerate(indices.tolist()):
+        x, y = dataset[idx]
+        assert torch.equal(x_batch[row], x)
+        assert torch.equal(y_batch[row], y)
+
+    # The batch loader gathers whole batches through get_batch
+    loader = create_batch_loader(dataset, batch_size=16)
+    assert len(loader) == -(-len(dataset) // 16)
+    x_first, y_first = next(iter(loader))
+    assert torch.equal(x_first, dataset.x_windows[:16])
+    assert torch.equal(y_first, dataset.y_windows[:16])
+
+def test_feature_cache_roundtrip(weather_csv, tmp_path, monkeypatch):
+    file_path, stats_path = weather_csv
+    cache_dir = str(tmp_path / 'cache')
+
+    uncached = WeatherDataset(file_path, stats_path, mode='val')
+    cached = WeatherDataset(file_path, stats_path, mode='val', cache_dir=cache_dir)
+    assert torch.equal(cached.data, uncached.data)
+    assert len(os.listdir(cache_dir)) == 2
+
+    # A cache hit must not re-parse the CSV
+    def fail(*args, **kwargs):
+        raise AssertionError("CSV was parsed despite a warm cache")
+
+    monkeypatch.setattr(dataset_module, 'build_feature_matrix', fail)
+    warm = WeatherDataset(file_path, stats_path, mode='val', cache_dir=cache_dir)
+    assert torch.equal(warm.data, uncached.data)
+
+
+def test_splits_share_one_buffer(weather_csv):
+    file_path, stats_path = weather_csv
+    splits = WeatherSplits(file_path, stats_path, seq_len=24, pred_len=12)
+    datasets = {mode: splits.dataset(mode) for mode in ['train', 'val', 'test']}
+
+    storage_ptr = splits.data.untyped_storage().data_ptr()
+    for mode, dataset in datasets.items():
+        assert dataset.data.untyped_storage().data_ptr() == storage_ptr
+        standalone = WeatherDataset(file_path, stats_path, seq_len=24, pred_len=12, mode=mode)
+        assert torch.equal(dataset.data, standalone.data)
+
+    assert sum(len(d.data) for d in datasets.values()) == len(splits.data)
+
+
+def test_multi_location_batches(weather_csv, tmp_path):
+    file_path, stats_path = weather_csv
+    other_path = str(tmp_path / 'other.csv')
+    make_weather_frame(num_rows=400, seed=1).to_csv(other_path, index=False)
+
+    first = WeatherSplits(file_path, stats_path, seq_len=24, pred_len=12).dataset('train')
+    second = WeatherSplits(other_path, stats_path, seq_len=24, pred_len=12).dataset('train')
+    dataset = MultiLocationDataset([first, second])
+    assert len(dataset) == len(first) + len(second)
+
+    # Indices straddling the location boundary map to each location's own windows
+    boundary = len(first)
+    indices = [boundary + 5, 0, boundary - 1, boundary]
+    x, y = dataset.get_batch(indices)
+    expected = [second[5], first[0], first[boundary - 1], second[0]]
+    for row, (x_expected, y_expected) in enumerate(expected):
+        assert torch.equal(x[row], x_expected)
+        assert torch.equal(y[row], y_expected)
+    assert torch.equal(dataset[boundary + 5][0], second[5][0])
+
+    batched = next(iter(create_batch_loader(dataset, batch_size=len(dataset))))
+    assert torch.equal(batched[0], dataset.get_batch(range(len(dataset)))[0])
+
+
+def test_plain_dataloader_default_collate(weather_csv, tmp_path):
+    file_path, stats_path = weather_csv
+    other_path = str(tmp_path / 'other.csv')
+    make_weather_frame(num_rows=400, seed=1).to_csv(other_path, index=False)
+    first = WeatherSplits(file_path, stats_path, seq_len=24, pred_len=12).dataset('train')
+    second = WeatherSplits(other_path, stats_path, seq_len=24, pred_len=12).dataset('train')
+
+    # Datasets keep the per-sample contract, so default_collate stacks them
+    for dataset in (first, MultiLocationDataset([first, second])):
+        x, y = next(iter(DataLoader(dataset, batch_size=4)))
+        x_expected, y_expected = dataset.get_batch(range(4))
+        assert torch.equal(x, x_expected)
+        assert torch.equal(y, y_expected)
+
+
 if __name__ == "__main__":
     test_weather_dataset()
@@ -0,0 +1,85 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+from data import fetch_data
+from src.utils.weather_store import load_weather_frame, read_meta
+
+
+class StubArchiveHandler(BaseHTTPRequestHandler):
+    """Minimal Open-Meteo archive stub serving synthetic hourly data."""
+
+    failures = {}  # start_date -> number of 503s still to return
+    requests_seen = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        start, end = query['start_date'][0], query['end_date'][0]
+        self.requests_seen.append(start)
+
+        if self.failures.get(start, 0) > 0:
+            self.failures[start] -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        times = pd.date_range(start, pd.Timestamp(end) + pd.Timedelta(hours=23), freq='h')
+        hourly = {'time': times.strftime('%Y-%m-%dT%H:%M').tolist()}
+        for i, col in enumerate(query['hourly']):
+            hourly[col] = [float(i + t.hour) for t in times]
+
+        body = json.dumps({'hourly': hourly}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_archive():
+    StubArchiveHandler.failures = {}
+    StubArchiveHandler.requests_seen = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubArchiveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/archive"
+    server.shutdown()
+    server.server_close()
+
+
+def test_year_chunks():
+    assert fetch_data.year_chunks('2006-03-01', '2008-02-10') == [
+        ('2006-03-01', '2006-12-31'),
+        ('2007-01-01', '2007-12-31'),
+        ('2008-01-01', '2008-02-10'),
+    ]
+
+
+def test_backfill_retries_and_resumes(stub_archive, tmp_path):
+    store_dir = str(tmp_path / 'store')
+    kwargs = dict(url=stub_archive, max_workers=3, backoff=0.0)
+
+    # 2019 keeps failing past the retry budget, 2020 recovers after one 503
+    StubArchiveHandler.failures = {'2019-01-01': 10, '2020-01-01': 1}
+    with pytest.raises(RuntimeError, match='rerun to resume'):
+        fetch_data.backfill(store_dir, '2018-06-01', '2020-01-15', retries=2, **kwargs)
+    assert list(read_meta(store_dir)['partitions']) == ['2018', '2020']
+
+    # Resuming only fetches the missing chunk
+    StubArchiveHandler.failures = {}
+    StubArchiveHandler.requests_seen = []
+    written = fetch_data.backfill(store_dir, '2018-06-01', '2020-01-15', **kwargs)
+    assert written == ['2019']
+    assert StubArchiveHandler.requests_seen == ['2019-01-01']
+
+    df = load_weather_frame(store_dir)
+    expected = pd.date_range('2018-06-01', '2020-01-15 23:00', freq='h')
+    assert (df['time'].values == expected.values).all()
@@ -0,0 +1,31 @@
+import pytest
+import torch
+
+from src.training.metrics import MetricAccumulator
+
+
+def test_accumulator_matches_full_tensor_metrics():
+    torch.manual_seed(0)
+    target_mean, target_std = 15.0, 8.0
+    batches = [(torch.randn(n, 12), torch.randn(n, 12)) for n in (32, 32, 7)]
+
+    accumulator = MetricAccumulator(target_std)
+    for i, (preds, targets) in enumerate(batches):
+        accumulator.update(preds, targets, loss=torch.tensor(float(i)))
+    metrics = accumulator.compute(per_horizon=True)
+
+    preds = torch.cat([p for p, _ in batches]).double()
+    targets = torch.cat([t for _, t in batches]).double()
+    preds_real = preds * target_std + target_mean
+    targets_real = targets * target_std + target_mean
+
+    assert metrics['loss'] == pytest.approx(1.0)
+    assert metrics['mae'] == pytest.approx((preds - targets).abs().mean().item())
+    assert metrics['rmse'] == pytest.approx((preds - targets).square().mean().sqrt().item())
+    assert metrics['mae_celsius'] == pytest.approx((preds_real - targets_real).abs().mean().item())
+    assert metrics['rmse_celsius'] == pytest.approx((preds_real - targets_real).square().mean().sqrt().item())
+    assert metrics['mae_celsius_by_step'] == pytest.approx((preds_real - targets_real).abs().mean(dim=0).tolist())
+
+    accumulator.reset()
+    with pytest.raises(ValueError):
+        accumulator.compute()
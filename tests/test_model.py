@@ -0,0 +1,118 @@
+import math
+
+import torch
+import torch.nn.functional as F
+
+from src.training.model import ExcelFormer
+from src.training.streaming import StreamingExcelFormer
+
+
+def make_model():
+    torch.manual_seed(0)
+    return ExcelFormer(
+        num_continuous_features=16, num_weather_codes=100, weather_code_embed_dim=4,
+        d_model=32, n_heads=4, n_layers=2, d_ff=64, seq_len=24, pred_len=12, dropout=0.0
+    ).eval()
+
+
+def legacy_attention(attention, x):
+    """Reference: the original separate-projection attention."""
+    batch_size, seq_len, _ = x.shape
+    heads = [
+        getattr(attention, f'{name}_proj_legacy')(x).view(batch_size, seq_len, attention.n_heads, attention.head_dim).transpose(1, 2)
+        for name in ('q', 'k', 'v')
+    ]
+    q, k, v = heads
+    weights = F.softmax(torch.matmul(q, k.transpose(-2, -1)) / math.sqrt(attention.head_dim), dim=-1)
+    output = torch.matmul(weights, v).transpose(1, 2).contiguous().view(batch_size, seq_len, attention.d_model)
+    return attention.out_proj(output)
+
+
+def test_legacy_checkpoint_loads_into_packed_qkv():
+    source = make_model()
+    legacy_state = {}
+    for key, value in source.state_dict().items():
+        if 'qkv_proj' in key:
+            for name, part in zip('qkv', value.chunk(3)):
+                legacy_state[key.replace('qkv_proj', f'{name}_proj')] = part.clone()
+        else:
+            legacy_state[key] = value.clone()
+
+    model = make_model()
+    torch.nn.init.zeros_(model.encoder_blocks[0].attention.qkv_proj.weight)
+    model.load_state_dict(legacy_state)
+
+    x = torch.randn(3, 24, 17)
+    x[..., -1] = torch.randint(0, 4, (3, 24)).float()
+    with torch.no_grad():
+        torch.testing.assert_close(model(x), source(x))
+
+        # Packed attention matches the original per-projection computation
+        attention = model.encoder_blocks[0].attention
+        for name in ('q', 'k', 'v'):
+            linear = torch.nn.Linear(32, 32)
+            linear.load_state_dict({
+                'weight': legacy_state[f'encoder_blocks.0.attention.{name}_proj.weight'],
+                'bias': legacy_state[f'encoder_blocks.0.attention.{name}_proj.bias'],
+            })
+            setattr(attention, f'{name}_proj_legacy', linear)
+        h = torch.randn(3, 24, 32)
+        torch.testing.assert_close(attention(h), legacy_attention(attention, h), rtol=1e-5, atol=1e-5)
+
+
+def test_folded_head_matches_training_graph():
+    model = make_model()
+    with torch.no_grad():
+        model.output_norm.weight.uniform_(0.5, 1.5)
+        model.output_norm.bias.uniform_(-0.5, 0.5)
+    x = torch.randn(4, 24, 17)
+    x[..., -1] = torch.randint(0, 100, (4, 24)).float()
+    with torch.no_grad():
+        reference = model(x)
+
+    model.fold_head(check_input=x)
+    assert model.folded_head is not None
+    with torch.no_grad():
+        torch.testing.assert_close(model(x), reference, rtol=1e-5, atol=1e-5)
+
+
+def test_streaming_matches_full_forward():
+    model = make_model().double()
+    stream = StreamingExcelFormer(model)
+    rows = torch.randn(3, 24 + 60, 17, dtype=torch.float64)
+    rows[..., -1] = torch.randint(0, 100, (3, 24 + 60)).double()
+
+    with torch.no_grad():
+        torch.testing.assert_close(stream.reset(rows[:, :24]), model(rows[:, :24]), rtol=0, atol=1e-10)
+        # Crosses the buffer wrap-around twice
+        for t in range(1, 61):
+            torch.testing.assert_close(stream.step(rows[:, 23 + t]), model(rows[:, t:t + 24]), rtol=0, atol=1e-10)
+
+
+def test_packed_qkv_init_matches_separate_projections():
+    torch.manual_seed(0)
+    model = ExcelFormer(
+        num_continuous_features=16, num_weather_codes=100, weather_code_embed_dim=4,
+        d_model=256, n_heads=4, n_layers=1, d_ff=64, seq_len=24, pred_len=12, dropout=0.0
+    )
+    reference = torch.nn.Linear(256, 256).weight.detach().clone()
+    torch.nn.init.xavier_uniform_(reference)
+    bound = math.sqrt(6 / (256 + 256))
+
+    for chunk in model.encoder_blocks[0].attention.qkv_proj.weight.detach().chunk(3):
+        assert chunk.abs().max() <= bound
+        assert abs(chunk.std().item() - reference.std().item()) < 0.02 * reference.std().item()
+        assert chunk.abs().max() > 0.99 * bound
+
+
+def test_explicit_attention_matches_sdpa():
+    model = make_model()
+    x = torch.randn(4, 24, 17)
+    x[..., -1] = torch.randint(0, 100, (4, 24)).float()
+    with torch.no_grad():
+        expected = model(x)
+        actual = model.use_explicit_attention()(x)
+        assert all(block.attention.explicit for block in model.encoder_blocks)
+        torch.testing.assert_close(actual, expected, rtol=1e-5, atol=1e-5)
+        model.use_explicit_attention(False)
+        torch.testing.assert_close(model(x), expected)
@@ -0,0 +1,50 @@
+from collections import Counter
+
+import numpy as np
+import onnx
+import torch
+
+from src.training.dataset import WeatherDataset
+from src.training.model import ExcelFormer
+from src.training.onnx_variants import build_variants, evaluate_variants
+
+SEQ_LEN = 24
+CONFIG = {'model': {'n_heads': 2, 'd_model': 16}}
+
+
+def export_small_model(onnx_path):
+    torch.manual_seed(0)
+    model = ExcelFormer(
+        num_continuous_features=16, num_weather_codes=100, weather_code_embed_dim=4,
+        d_model=16, n_heads=2, n_layers=2, d_ff=32, seq_len=SEQ_LEN, pred_len=SEQ_LEN, dropout=0.0
+    ).eval().use_explicit_attention().fold_head()
+    dummy_input = torch.randn(1, SEQ_LEN, 17)
+    dummy_input[..., -1] = 1
+    torch.onnx.export(
+        model, dummy_input, onnx_path, opset_version=18, input_names=['input'], output_names=['output'],
+        dynamic_axes={'input': {0: 'batch_size'}, 'output': {0: 'batch_size'}}
+    )
+
+
+def test_variants_report(weather_csv, tmp_path):
+    csv_path, stats_path = weather_csv
+    onnx_path = str(tmp_path / 'model.onnx')
+    export_small_model(onnx_path)
+
+    variants = build_variants(onnx_path, CONFIG)
+    assert list(variants) == ['fp32', 'optimized', 'int8']
+
+    # Every block but the first gets a fused Attention; LayerNorms and GELUs fuse in all blocks
+    op_counts = Counter(node.op_type for node in onnx.load(variants['optimized']).graph.node)
+    assert op_counts['Attention'] == 1
+    assert op_counts['SkipLayerNormalization'] == 4
+    assert op_counts['BiasGelu'] == 2
+
+    dataset = WeatherDataset(csv_path, stats_path, seq_len=SEQ_LEN, pred_len=SEQ_LEN, mode='test')
+    report = evaluate_variants(variants, dataset, max_samples=8, batch_size=4, latency_runs=2)
+
+    assert report['num_samples'] == 8
+    assert report['fp32']['mae_vs_fp32_celsius'] == 0.0
+    assert report['optimized']['mae_vs_fp32_celsius'] < 1e-3
+    assert np.isfinite(report['int8']['mae_celsius'])
+    assert report['int8']['size_mb'] < report['fp32']['size_mb']
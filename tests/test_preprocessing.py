@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from conftest import TIME_COLS, WEATHER_COLS, make_weather_frame
+from src.utils.preprocessing import FeatureEngine, RollingWindow, time_features
+
+
+def make_stats():
+    return {
+        'mean': np.array([10.0 * (i + 1) for i in range(len(WEATHER_COLS))] + [0.1] * len(TIME_COLS)),
+        'std': np.array([float(i + 1) for i in range(len(WEATHER_COLS))] + [0.7] * len(TIME_COLS)),
+        'input_cols': WEATHER_COLS + TIME_COLS,
+    }
+
+
+def reference_features(df, stats):
+    """Original pandas feature engineering from WeatherDataset."""
+    df = df.copy()
+    df['hour_sin'] = np.sin(2 * np.pi * df['time'].dt.hour / 24)
+    df['hour_cos'] = np.cos(2 * np.pi * df['time'].dt.hour / 24)
+    df['day_sin'] = np.sin(2 * np.pi * df['time'].dt.day / 365)
+    df['day_cos'] = np.cos(2 * np.pi * df['time'].dt.day / 365)
+    df['month_sin'] = np.sin(2 * np.pi * (df['time'].dt.month - 1) / 12)
+    df['month_cos'] = np.cos(2 * np.pi * (df['time'].dt.month - 1) / 12)
+    normalized = (df[stats['input_cols']].values - stats['mean']) / stats['std']
+    return np.column_stack([normalized, df['weather_code'].values])
+
+
+def test_time_features_match_formulas():
+    times = pd.date_range('2023-12-30', '2024-03-02', freq='h')
+    encoded = time_features(times.to_numpy())
+    np.testing.assert_array_equal(encoded[:, 0], np.sin(2 * np.pi * times.hour / 24))
+    np.testing.assert_array_equal(encoded[:, 3], np.cos(2 * np.pi * times.day / 365))
+    np.testing.assert_array_equal(encoded[:, 4], np.sin(2 * np.pi * (times.month - 1) / 12))
+
+
+def test_engine_matches_reference():
+    stats = make_stats()
+    df = make_weather_frame(num_rows=2000, start='2023-11-15T00:00')
+    df['time'] = pd.to_datetime(df['time'])
+
+    engine = FeatureEngine(stats)
+    out = np.empty((len(df), engine.num_features), dtype=np.float32)
+    result = engine.transform(df, df['time'].to_numpy(), out=out)
+
+    assert result is out
+    assert engine.columns == stats['input_cols'] + ['weather_code']
+    np.testing.assert_allclose(out, reference_features(df, stats), rtol=1e-5, atol=1e-5)
+
+
+def test_records_match_columns():
+    stats = make_stats()
+    df = make_weather_frame(num_rows=48)
+    df['time'] = pd.to_datetime(df['time'])
+    records = [
+        SimpleNamespace(timestamp=row.time.to_pydatetime(), **{c: getattr(row, c) for c in WEATHER_COLS + ['weather_code']})
+        for row in df.itertuples()
+    ]
+
+    engine = FeatureEngine(stats)
+    batch = engine.transform_records([records[:24], records[24:]])
+    expected = engine.transform(df, df['time'].to_numpy())
+    np.testing.assert_array_equal(batch.reshape(48, -1), expected)
+
+
+def test_rolling_window_view_is_contiguous_and_ordered():
+    window = RollingWindow(seq_len=5, num_features=2)
+    rows = np.arange(26, dtype=np.float32).reshape(13, 2)
+
+    window.append(rows[:4])
+    assert not window.full
+    for row in rows[4:]:
+        window.append(row)
+        view = window.view()
+        assert view.flags.c_contiguous
+        assert np.shares_memory(view, window._buffer)
+
+    np.testing.assert_array_equal(window.view(), rows[-5:])
+    window.append(rows[:7])  # more rows than the window keeps
+    np.testing.assert_array_equal(window.view(), rows[2:7])
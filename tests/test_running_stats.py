@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_weather_frame
+from src.utils.running_stats import RunningStats
+
+
+def test_running_stats_matches_pandas():
+    df = make_weather_frame(num_rows=1000)
+    values = df.drop(columns=['time']).to_numpy()
+
+    accumulator = RunningStats()
+    for chunk in np.array_split(values, 7):
+        accumulator.update(chunk)
+
+    expected = pd.DataFrame(values)
+    np.testing.assert_allclose(accumulator.mean, expected.mean().values, rtol=1e-12)
+    np.testing.assert_allclose(accumulator.std(), expected.std().values, rtol=1e-10)
+
+
+def test_running_stats_merge_and_state():
+    values = np.random.default_rng(1).normal(5.0, 3.0, size=(500, 4))
+    head = RunningStats().update(values[:321])
+    tail = RunningStats().update(values[321:])
+
+    # Round-trip through the saved state, then add the appended rows
+    restored = RunningStats.from_state_dict(head.state_dict()).merge(tail)
+    full = RunningStats().update(values)
+
+    np.testing.assert_array_equal(restored.count, full.count)
+    np.testing.assert_array_equal(full.count, [500] * 4)
+    np.testing.assert_allclose(restored.mean, full.mean, rtol=1e-12)
+    np.testing.assert_allclose(restored.std(), values.std(axis=0, ddof=1), rtol=1e-10)
+
+
+def test_running_stats_skip_nan_like_pandas():
+    df = make_weather_frame(num_rows=1000)
+    values = df.drop(columns=['time']).to_numpy()
+    rng = np.random.default_rng(2)
+    values[rng.random(values.shape) < 0.05] = np.nan
+    # Trailing nulls, as in the archive's most recent days, and an all-NaN chunk
+    values[-30:, 0] = np.nan
+    values[100:150] = np.nan
+
+    accumulator = RunningStats()
+    for chunk in np.array_split(values, 7) + [np.full((3, values.shape[1]), np.nan)]:
+        accumulator.update(chunk)
+
+    expected = pd.DataFrame(values)
+    np.testing.assert_array_equal(accumulator.count, expected.count().values)
+    np.testing.assert_allclose(accumulator.mean, expected.mean().values, rtol=1e-12)
+    np.testing.assert_allclose(accumulator.std(), expected.std().values, rtol=1e-10)
+    assert np.isfinite(accumulator.std()).all()
+
+
+def test_running_stats_legacy_scalar_count():
+    values = np.random.default_rng(3).normal(size=(50, 3))
+    state = RunningStats().update(values[:20]).state_dict()
+    state['count'] = 20
+    restored = RunningStats.from_state_dict(state).update(values[20:])
+    np.testing.assert_array_equal(restored.count, [50] * 3)
+    np.testing.assert_allclose(restored.std(), values.std(axis=0, ddof=1), rtol=1e-10)
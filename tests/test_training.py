@@ -0,0 +1,244 @@
+import pytest
+import torch
+
+from src.training.model import ExcelFormer
+from src.training.precision import autocast, create_grad_scaler, resolve_precision
+
+
+def test_resolve_precision():
+    cpu = torch.device('cpu')
+    assert resolve_precision('fp32', cpu) == 'fp32'
+    assert resolve_precision('bf16', cpu) == 'bf16'
+    # fp16 needs CUDA
+    assert resolve_precision('fp16', cpu) == 'fp32'
+    assert create_grad_scaler('bf16', cpu) is None
+    with pytest.raises(ValueError):
+        resolve_precision('int8', cpu)
+
+
+def test_bf16_autocast_training_step():
+    torch.manual_seed(0)
+    model = ExcelFormer(d_model=16, n_heads=2, n_layers=1, d_ff=32, seq_len=24, pred_len=12, dropout=0.0)
+    x = torch.randn(4, 24, 17)
+    x[..., -1] = 1
+    y = torch.randn(4, 12)
+
+    with autocast('bf16', torch.device('cpu')):
+        output = model(x)
+    assert output.dtype == torch.bfloat16
+
+    loss = torch.nn.functional.mse_loss(output.squeeze(-1).float(), y)
+    loss.backward()
+    # Master weights and gradients stay fp32
+    assert all(p.grad.dtype == torch.float32 for p in model.parameters() if p.grad is not None)
+
+
+def compile_config(backend):
+    return {'training': {'batch_size': 2, 'compile': {'enabled': True, 'backend': backend, 'mode': 'default'}}}
+
+
+def test_compiled_model_saves_eager_state_dict(tmp_path):
+    from src.training.train import compile_model, save_checkpoint
+
+    model = ExcelFormer(d_model=16, n_heads=2, n_layers=1, d_ff=32, seq_len=24, pred_len=12)
+    compiled = compile_model(model, compile_config('eager'), torch.device('cpu'))
+    assert compiled is not model
+
+    path = str(tmp_path / 'model.pt')
+    save_checkpoint(compiled, torch.optim.AdamW(compiled.parameters()), 0, 1.0, path, {})
+    state_dict = torch.load(path)['model_state_dict']
+    assert not any(key.startswith('_orig_mod.') for key in state_dict)
+    ExcelFormer(d_model=16, n_heads=2, n_layers=1, d_ff=32, seq_len=24, pred_len=12).load_state_dict(state_dict)
+
+
+def test_compile_falls_back_to_eager():
+    from src.training.train import compile_model
+
+    model = ExcelFormer(d_model=16, n_heads=2, n_layers=1, d_ff=32, seq_len=24, pred_len=12)
+    assert compile_model(model, compile_config('no_such_backend'), torch.device('cpu')) is model
+
+
+def make_batch(num_samples, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(num_samples, 24, 17, generator=generator)
+    x[..., -1] = 1
+    return x, torch.randn(num_samples, 12, generator=generator)
+
+
+def small_model():
+    torch.manual_seed(0)
+    return ExcelFormer(d_model=16, n_heads=2, n_layers=1, d_ff=32, seq_len=24, pred_len=12, dropout=0.0)
+
+
+def ddp_worker(rank, world_size, init_file, out_dir):
+    import torch.distributed as dist
+    from torch.nn.parallel import DistributedDataParallel
+
+    from src.training.distributed import ChronologicalDistributedSampler
+    from src.training.metrics import MetricAccumulator
+
+    dist.init_process_group('gloo', init_method=f'file://{init_file}', rank=rank, world_size=world_size)
+    try:
+        # One SGD step on this rank's half of the batch
+        model = DistributedDataParallel(small_model(), broadcast_buffers=False)
+        optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+        x, y = make_batch(8)
+        shard = slice(rank * 4, (rank + 1) * 4)
+        torch.nn.functional.mse_loss(model(x[shard]).squeeze(-1), y[shard]).backward()
+        optimizer.step()
+
+        # Metrics over this rank's contiguous validation shard
+        val_x, val_y = make_batch(11, seed=1)
+        indices = list(ChronologicalDistributedSampler(range(11), world_size, rank, shuffle=False))
+        train_indices = list(ChronologicalDistributedSampler(range(11), world_size, rank, shuffle=True))
+        accumulator = MetricAccumulator(target_std=8.0)
+        with torch.no_grad():
+            accumulator.update(model(val_x[indices]).squeeze(-1), val_y[indices])
+        metrics = accumulator.compute()
+
+        torch.save({
+            'state_dict': model.module.state_dict(),
+            'val_indices': indices,
+            'train_indices': train_indices,
+            'metrics': metrics,
+        }, f'{out_dir}/{rank}.pt')
+    finally:
+        dist.destroy_process_group()
+
+
+def test_ddp_matches_single_process(tmp_path):
+    import torch.multiprocessing as mp
+
+    from src.training.metrics import MetricAccumulator
+
+    mp.spawn(ddp_worker, args=(2, str(tmp_path / 'init'), str(tmp_path)), nprocs=2)
+    results = [torch.load(tmp_path / f'{rank}.pt') for rank in range(2)]
+
+    # Same step on the full batch in one process
+    model = small_model()
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    x, y = make_batch(8)
+    torch.nn.functional.mse_loss(model(x).squeeze(-1), y).backward()
+    optimizer.step()
+    for result in results:
+        for key, value in model.state_dict().items():
+            torch.testing.assert_close(result['state_dict'][key], value, rtol=1e-5, atol=1e-6)
+
+    # Validation shards are contiguous, disjoint and cover every window once
+    assert results[0]['val_indices'] == list(range(6))
+    assert results[1]['val_indices'] == list(range(6, 11))
+    # Training shards are padded to the same length
+    assert len(results[0]['train_indices']) == len(results[1]['train_indices']) == 6
+
+    val_x, val_y = make_batch(11, seed=1)
+    accumulator = MetricAccumulator(target_std=8.0)
+    with torch.no_grad():
+        accumulator.update(model(val_x).squeeze(-1), val_y)
+    expected = accumulator.compute()
+    for result in results:
+        assert result['metrics']['num_samples'] == 11
+        assert result['metrics']['mae_celsius'] == pytest.approx(expected['mae_celsius'])
+        assert result['metrics']['rmse'] == pytest.approx(expected['rmse'])
+
+
+def test_chronological_sampler_never_leaves_a_rank_empty():
+    from src.training.distributed import ChronologicalDistributedSampler
+
+    # ceil-sized shards of 3 would give the last of 4 ranks nothing
+    shards = [list(ChronologicalDistributedSampler(range(9), 4, rank, shuffle=False)) for rank in range(4)]
+    assert shards == [[0, 1, 2], [3, 4], [5, 6], [7, 8]]
+    assert [len(ChronologicalDistributedSampler(range(9), 4, rank, shuffle=False)) for rank in range(4)] == [3, 2, 2, 2]
+
+
+def empty_shard_worker(rank, world_size, init_file, out_dir):
+    import torch.distributed as dist
+
+    from src.training.distributed import ChronologicalDistributedSampler
+    from src.training.metrics import MetricAccumulator
+
+    dist.init_process_group('gloo', init_method=f'file://{init_file}', rank=rank, world_size=world_size)
+    try:
+        # Fewer windows than ranks: the last rank has no batches
+        preds, targets = make_batch(world_size - 1)
+        indices = list(ChronologicalDistributedSampler(range(world_size - 1), world_size, rank, shuffle=False))
+        accumulator = MetricAccumulator()
+        if indices:
+            accumulator.update(preds[indices, 0, :12], targets[indices])
+        torch.save({'val_indices': indices, 'metrics': accumulator.compute()}, f'{out_dir}/{rank}.pt')
+    finally:
+        dist.destroy_process_group()
+
+
+def test_metrics_all_reduce_with_empty_shard(tmp_path):
+    import torch.multiprocessing as mp
+
+    from src.training.metrics import MetricAccumulator
+
+    mp.spawn(empty_shard_worker, args=(3, str(tmp_path / 'init'), str(tmp_path)), nprocs=3)
+    results = [torch.load(tmp_path / f'{rank}.pt') for rank in range(3)]
+    assert results[2]['val_indices'] == []
+
+    preds, targets = make_batch(2)
+    accumulator = MetricAccumulator()
+    accumulator.update(preds[:, 0, :12], targets)
+    expected = accumulator.compute()
+    for result in results:
+        assert result['metrics']['num_samples'] == 2
+        assert result['metrics']['mae'] == pytest.approx(expected['mae'])
+        assert result['metrics']['rmse'] == pytest.approx(expected['rmse'])
+
+
+def test_async_checkpoint_writer_rotates_and_snapshots(tmp_path):
+    from src.training.checkpoint import AsyncCheckpointWriter
+
+    writer = AsyncCheckpointWriter(history_dir=str(tmp_path / 'checkpoints'), keep_last=2)
+    best_path = str(tmp_path / 'best_model.pt')
+    weight = torch.zeros(3)
+    for epoch in range(4):
+        weight.fill_(epoch)
+        writer.save({'epoch': epoch, 'state': {'weight': weight}}, best_path, f'best_epoch_{epoch:03d}.pt')
+    # Changes after save() are not written
+    weight.fill_(-1)
+    writer.close()
+
+    assert sorted(p.name for p in (tmp_path / 'checkpoints').iterdir()) == ['best_epoch_002.pt', 'best_epoch_003.pt']
+    checkpoint = torch.load(best_path)
+    assert checkpoint['epoch'] == 3
+    assert torch.equal(checkpoint['state']['weight'], torch.full((3,), 3.0))
+    assert not any(p.name.endswith('.tmp') for p in tmp_path.rglob('*'))
+
+
+def test_async_checkpoint_writer_rotates_across_runs(tmp_path):
+    import os
+
+    from src.training.checkpoint import AsyncCheckpointWriter
+
+    history_dir = tmp_path / 'checkpoints'
+    best_path = str(tmp_path / 'best_model.pt')
+    first_run = AsyncCheckpointWriter(history_dir=str(history_dir), keep_last=2, background=False)
+    for epoch in (5, 9):
+        first_run.save({'run': 1, 'epoch': epoch}, best_path, f'best_epoch_{epoch:03d}.pt')
+        # Distinct modification times regardless of filesystem timestamp resolution
+        os.utime(history_dir / f'best_epoch_{epoch:03d}.pt', (epoch, epoch))
+    first_run.close()
+
+    # A new run starts counting epochs from 1 again
+    second_run = AsyncCheckpointWriter(history_dir=str(history_dir), keep_last=2, background=False)
+    second_run.save({'run': 2, 'epoch': 1}, best_path, 'best_epoch_001.pt')
+    second_run.close()
+
+    assert sorted(p.name for p in history_dir.iterdir()) == ['best_epoch_001.pt', 'best_epoch_009.pt']
+    assert torch.load(history_dir / 'best_epoch_009.pt')['run'] == 1
+    assert torch.load(best_path)['run'] == 2
+
+
+def test_async_checkpoint_writer_reports_errors(tmp_path):
+    from src.training.checkpoint import AsyncCheckpointWriter
+
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    writer = AsyncCheckpointWriter()
+    writer.save({'x': torch.zeros(1)}, str(blocker / 'model.pt'))
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    writer.close()
@@ -0,0 +1,117 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from conftest import make_weather_frame
+from src.training.dataset import WeatherDataset
+from src.utils.weather_store import (
+    append_rows,
+    export_csv,
+    iter_partitions,
+    last_timestamp,
+    load_weather_frame,
+    missing_partitions,
+    read_meta,
+    read_tail,
+    tail_partitions,
+    write_store,
+)
+
+
+def test_store_roundtrip(tmp_path):
+    # Spans a year boundary so the data lands in two partitions
+    df = make_weather_frame(num_rows=500, start='2020-12-25T00:00')
+    store_dir = str(tmp_path / 'store')
+    write_store(df, store_dir)
+
+    meta = read_meta(store_dir)
+    assert list(meta['partitions']) == ['2020', '2021']
+    assert meta['rows'] == len(df)
+    assert meta['last_time'] == df['time'].iloc[-1]
+
+    # Columns are memory-mapped, not parsed
+    partition = next(iter_partitions(store_dir))
+    assert isinstance(partition['temperature_2m'], np.memmap)
+
+    restored = load_weather_frame(store_dir)
+    expected = df.assign(time=pd.to_datetime(df['time']))
+    pd.testing.assert_frame_equal(restored, expected, check_dtype=False)
+
+    # The CSV export matches the original file byte for byte
+    csv_path = tmp_path / 'export.csv'
+    export_csv(store_dir, str(csv_path))
+    original_path = tmp_path / 'original.csv'
+    df.to_csv(original_path, index=False)
+    assert csv_path.read_text() == original_path.read_text()
+
+
+def test_dataset_reads_store(weather_csv, tmp_path):
+    file_path, stats_path = weather_csv
+    store_dir = str(tmp_path / 'store')
+    write_store(pd.read_csv(file_path), store_dir)
+
+    from_csv = WeatherDataset(file_path, stats_path, mode='test')
+    from_store = WeatherDataset(store_dir, stats_path, mode='test')
+    assert torch.equal(from_csv.data, from_store.data)
+
+
+def test_append_rows_touches_only_new_partitions(tmp_path):
+    df = make_weather_frame(num_rows=500, start='2020-12-25T00:00')
+    store_dir = str(tmp_path / 'store')
+    write_store(df.iloc[:400], store_dir)
+    old_partition = tmp_path / 'store' / '2020' / 'time.npy'
+    old_mtime = old_partition.stat().st_mtime_ns
+
+    # Overlapping rows are filtered by timestamp, only the 2021 partition is rewritten
+    appended, touched = append_rows(df.iloc[350:], store_dir)
+    assert len(appended) == 100
+    assert touched == ['2021']
+    assert old_partition.stat().st_mtime_ns == old_mtime
+    assert last_timestamp(store_dir) == pd.Timestamp(df['time'].iloc[-1])
+
+    restored = load_weather_frame(store_dir)
+    pd.testing.assert_frame_equal(restored, df.assign(time=pd.to_datetime(df['time'])), check_dtype=False)
+
+    # Nothing new to append
+    appended, touched = append_rows(df.iloc[-10:], store_dir)
+    assert appended.empty and touched == []
+
+    # Exporting only the latest rows matches the tail of the original file
+    csv_path = tmp_path / 'latest.csv'
+    export_csv(store_dir, str(csv_path), num_rows=168)
+    tail_path = tmp_path / 'tail.csv'
+    df.iloc[-168:].to_csv(tail_path, index=False)
+    assert csv_path.read_text() == tail_path.read_text()
+
+
+def test_partial_store_reports_missing_partitions(tmp_path):
+    df = make_weather_frame(num_rows=500, start='2020-12-25T00:00')
+    store_dir = str(tmp_path / 'store')
+    write_store(df, store_dir)
+    assert missing_partitions(store_dir) == []
+
+    # A latest_only download keeps meta.json but only the newest partition
+    shutil.rmtree(tmp_path / 'store' / '2020')
+    assert missing_partitions(store_dir) == ['2020']
+    assert len(read_tail(store_dir, 100)) == 100
+    with pytest.raises(FileNotFoundError, match='2020'):
+        read_tail(store_dir, 400)
+
+
+def test_tail_partitions_cover_window_after_new_year(tmp_path):
+    # Newest partition (2021) holds only 30 hours, fewer than a 168-hour window
+    df = make_weather_frame(num_rows=24 + 8784 + 30, start='2019-12-31T00:00')
+    store_dir = str(tmp_path / 'store')
+    write_store(df, store_dir)
+    expected = read_tail(store_dir, 168)
+
+    assert tail_partitions(store_dir, 1) == ['2021']
+    assert tail_partitions(store_dir, 168) == ['2020', '2021']
+    assert tail_partitions(store_dir, 10**6) == ['2019', '2020', '2021']
+
+    # Keep only what a latest_only download with min_rows=168 fetches
+    shutil.rmtree(tmp_path / 'store' / '2019')
+    pd.testing.assert_frame_equal(read_tail(store_dir, 168), expected)